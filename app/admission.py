@@ -0,0 +1,137 @@
+"""
+Adaptive admission control for LLM generations.
+
+Without a limit every request is accepted and queues behind slow LLM calls
+until clients time out. The controller keeps a concurrency limit that adapts
+to observed latency (AIMD):
+
+- additive increase: +1 per `limit` generations completed at normal latency
+- multiplicative decrease: x0.9 when a generation is slower than
+  LATENCY_TOLERANCE x the baseline latency, or fell back to templates
+  (rate limits, timeouts); at most once per baseline latency so a burst of
+  slow completions does not collapse the limit
+
+Requests above the limit wait in a bounded queue for up to
+ADMISSION_QUEUE_TIMEOUT seconds; the rest are shed with Overloaded, which the
+route turns into a fast 503 or a template-mode response.
+"""
+
+import asyncio
+import time
+from collections import deque
+from typing import Deque
+from .config import settings
+from .metrics import ADMISSION_LIMIT, ADMISSION_QUEUE_DEPTH
+
+LATENCY_TOLERANCE = 2.0
+DECREASE_FACTOR = 0.9
+MIN_LIMIT = 1
+INITIAL_LIMIT = 16
+# Weight of a new sample when the baseline drifts upwards; lower samples reset it
+BASELINE_DRIFT = 0.01
+
+
+class Overloaded(Exception):
+    """Raised when a request cannot be admitted (queue full or wait timed out)."""
+
+    def __init__(self, message: str, retry_after: float):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+    """AIMD concurrency limiter with a bounded FIFO wait queue (single event loop)."""
+
+    def __init__(self, mode: str, lane: str, max_limit: int, max_queue: int, queue_timeout: float):
+        self.mode = mode
+        self.lane = lane
+        self.max_limit = max_limit
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.limit = float(min(INITIAL_LIMIT, max_limit))
+        self.in_flight = 0
+        self.baseline = 0.0  # seconds; 0 until the first sample
+        self._last_decrease = 0.0
+        self._waiters: Deque[asyncio.Future] = deque()
+        self._export()
+
+    def _export(self) -> None:
+        ADMISSION_LIMIT.set(int(self.limit), self.mode, self.lane)
+        ADMISSION_QUEUE_DEPTH.set(len(self._waiters), self.mode, self.lane)
+
+    def _retry_after(self) -> float:
+        return max(1.0, round(self.baseline))
+
+    async def acquire(self) -> None:
+        """Wait for a slot; raise Overloaded when the queue is full or the wait times out."""
+        if self.in_flight < int(self.limit) and not self._waiters:
+            self.in_flight += 1
+            return
+        if len(self._waiters) >= self.max_queue:
+            raise Overloaded(f"{self.mode} generation queue is full", self._retry_after())
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        self._export()
+        try:
+            # asyncio.wait, not wait_for: wait_for (before 3.12) swallows a
+            # cancellation that arrives once the slot was granted
+            await asyncio.wait((waiter,), timeout=self.queue_timeout)
+            if not waiter.done():
+                raise Overloaded(f"no {self.mode} generation slot within {self.queue_timeout:g}s", self._retry_after())
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # Granted just as the client went away: pass the slot on
+                self.in_flight -= 1
+                self._wake()
+            raise
+        finally:
+            if waiter in self._waiters:
+                self._waiters.remove(waiter)
+            self._export()
+
+    def release(self, latency: float, degraded: bool) -> None:
+        """Return a slot and adapt the limit to the latency of the finished generation."""
+        self.in_flight -= 1
+        now = time.monotonic()
+        if degraded:
+            pass  # fallback latency says nothing about the backend's normal speed
+        elif self.baseline == 0.0 or latency < self.baseline:
+            self.baseline = latency
+        else:
+            self.baseline += (latency - self.baseline) * BASELINE_DRIFT
+
+        if degraded or latency > self.baseline * LATENCY_TOLERANCE:
+            if now - self._last_decrease >= self.baseline:
+                self.limit = max(MIN_LIMIT, self.limit * DECREASE_FACTOR)
+                self._last_decrease = now
+        else:
+            self.limit = min(self.max_limit, self.limit + 1.0 / self.limit)
+
+        self._wake()
+        self._export()
+
+    def _wake(self) -> None:
+        """Hand free slots to waiters in arrival order."""
+        while self._waiters and self.in_flight < int(self.limit):
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                self.in_flight += 1
+                waiter.set_result(None)
+
+
+_controllers = {}
+
+
+def get_controller(mode: str, lane: str = "interactive") -> AdmissionController:
+    """
+    Controller for a generation mode and priority lane, created from the
+    current settings on first use. Lanes are admitted separately so a bulk
+    job filling its queue never makes interactive requests wait or get shed.
+    """
+    controller = _controllers.get((mode, lane))
+    if controller is None:
+        controller = AdmissionController(mode, lane, settings.ADMISSION_MAX_LIMIT, settings.ADMISSION_MAX_QUEUE,
+                                         settings.ADMISSION_QUEUE_TIMEOUT)
+        _controllers[(mode, lane)] = controller
+    return controller
@@ -0,0 +1,106 @@
+"""
+Bulk validation of listings from raw JSON bytes.
+
+Validating a large batch one `PropertyInput(**item)` at a time costs a JSON
+parse into Python dicts plus one validator call per listing. Here the whole
+batch goes through a cached `TypeAdapter(List[PropertyInput])`, which parses
+and validates the raw bytes in one pass inside pydantic-core; no
+intermediate dicts are built.
+
+One invalid listing must not reject the rest. When the batch fails, the
+errors carry the position of each offending item; only then are the bytes
+decoded once more, and the valid items are validated on their own. The
+result lists the valid listings with their positions and the errors per
+position, in the same shape for the HTTP batch endpoint (JSON array body)
+and the offline feed CLI (JSON Lines).
+"""
+
+from functools import lru_cache
+from typing import Any, Dict, List, Sequence, Tuple, Type
+from pydantic import BaseModel, TypeAdapter, ValidationError
+from .schemas import PropertyInput
+from .serialization import loads
+
+
+class BatchValidation:
+    """Outcome of validating a batch: valid items and errors, both by position in the batch."""
+
+    __slots__ = ("items", "errors")
+
+    def __init__(self, items: List[Tuple[int, Any]], errors: List[Dict[str, Any]]):
+        self.items = items    # (position, validated item), in batch order
+        self.errors = errors  # {"index": position, "errors": [{"loc", "msg", "type"}, ...]}, in batch order
+
+    def __len__(self) -> int:
+        return len(self.items) + len(self.errors)
+
+
+@lru_cache(maxsize=None)
+def _list_adapter(model: Type[BaseModel]) -> TypeAdapter:
+    # Building an adapter compiles a validator; do it once per model
+    return TypeAdapter(List[model])
+
+
+@lru_cache(maxsize=None)
+def _item_adapter(model: Type[BaseModel]) -> TypeAdapter:
+    return TypeAdapter(model)
+
+
+def _describe(error: Dict[str, Any], skip: int) -> Dict[str, Any]:
+    return {"loc": list(error["loc"][skip:]), "msg": error["msg"], "type": error["type"]}
+
+
+def validate_batch(raw: bytes, model: Type[BaseModel] = PropertyInput) -> BatchValidation:
+    """
+    Validate a JSON array of listings (or other `model` items) from raw bytes.
+
+    Raises ValueError when `raw` is not a JSON array; invalid items are
+    reported in the result and do not affect the others.
+    """
+    adapter = _list_adapter(model)
+    try:
+        return BatchValidation(list(enumerate(adapter.validate_json(raw))), [])
+    except ValidationError as e:
+        failures: Dict[int, List[Dict[str, Any]]] = {}
+        for error in e.errors(include_url=False, include_context=False, include_input=False):
+            if not error["loc"]:
+                # Malformed JSON or not an array: there are no items to report on
+                raise ValueError(f"expected a JSON array of listings: {error['msg']}") from None
+            failures.setdefault(error["loc"][0], []).append(_describe(error, 1))
+    values = loads(raw)
+    valid = [index for index in range(len(values)) if index not in failures]
+    items = adapter.validate_python([values[index] for index in valid])
+    errors = [{"index": index, "errors": failures[index]} for index in sorted(failures)]
+    return BatchValidation(list(zip(valid, items)), errors)
+
+
+def validate_lines(lines: Sequence[bytes], model: Type[BaseModel] = PropertyInput) -> BatchValidation:
+    """
+    Validate JSON Lines (one item per entry of `lines`, blank lines removed by the caller).
+
+    The lines are validated as one JSON array; a line that is not valid JSON
+    on its own (or holds more than one value) makes the chunk fall back to
+    validating line by line, so it is reported without affecting the others.
+    """
+    if not lines:
+        return BatchValidation([], [])
+    try:
+        batch = validate_batch(b"[" + b",".join(lines) + b"]", model)
+        if len(batch) == len(lines):
+            return batch
+    except ValueError:
+        pass
+    adapter = _item_adapter(model)
+    items, errors = [], []
+    for index, line in enumerate(lines):
+        try:
+            items.append((index, adapter.validate_json(line)))
+        except ValidationError as e:
+            described = [_describe(error, 0) for error in e.errors(include_url=False, include_context=False, include_input=False)]
+            errors.append({"index": index, "errors": described})
+    return BatchValidation(items, errors)
+
+
+def format_errors(errors: List[Dict[str, Any]]) -> str:
+    """One-line summary of an item's errors, e.g. "features.area_sqm: Field required"."""
+    return "; ".join(f"{'.'.join(map(str, error['loc'])) or 'item'}: {error['msg']}" for error in errors)
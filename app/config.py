@@ -14,19 +14,104 @@ class Settings:
     # OpenAI Configuration
     OPENAI_API_KEY: str = os.getenv("OPENAI_API_KEY", "")
     OPENAI_MODEL: str = os.getenv("OPENAI_MODEL", "gpt-4o-mini")
+    OPENAI_BASE_URL: str = os.getenv("OPENAI_BASE_URL", "")  # Empty uses the official API endpoint
+    OPENAI_SECTION_MODELS: str = os.getenv("OPENAI_SECTION_MODELS", "")  # "section=model,..."; unlisted sections use OPENAI_MODEL
+    OPENAI_SAMPLING_PROFILE: str = os.getenv("OPENAI_SAMPLING_PROFILE", "balanced")  # "balanced", "creative" or "deterministic"
+    OPENAI_SECTION_PROFILES: str = os.getenv("OPENAI_SECTION_PROFILES", "")  # "section=profile,..."; overrides the profile above
+    OPENAI_SECTION_TEMPERATURES: str = os.getenv("OPENAI_SECTION_TEMPERATURES", "")  # "section=temperature,..."; default: the profile's
+    OPENAI_ESCALATION_MODEL: str = os.getenv("OPENAI_ESCALATION_MODEL", "")  # Retry model for answers failing validation; empty disables
     
     # Ollama Configuration
     OLLAMA_BASE_URL: str = os.getenv("OLLAMA_BASE_URL", "http://localhost:11434")
     OLLAMA_MODEL: str = os.getenv("OLLAMA_MODEL", "llama3.2")
+    OLLAMA_SECTION_MODELS: str = os.getenv("OLLAMA_SECTION_MODELS", "")  # Same format as OPENAI_SECTION_MODELS
+    OLLAMA_SAMPLING_PROFILE: str = os.getenv("OLLAMA_SAMPLING_PROFILE", "balanced")
+    OLLAMA_SECTION_PROFILES: str = os.getenv("OLLAMA_SECTION_PROFILES", "")
+    OLLAMA_SECTION_TEMPERATURES: str = os.getenv("OLLAMA_SECTION_TEMPERATURES", "")
+    OLLAMA_ESCALATION_MODEL: str = os.getenv("OLLAMA_ESCALATION_MODEL", "")
+    
+    # Output Limits: "reask" (one targeted re-ask, then truncate), "truncate", or "off"
+    LIMIT_ENFORCEMENT: Literal["reask", "truncate", "off"] = os.getenv("LIMIT_ENFORCEMENT", "reask")
+    
+    # Language Configuration
+    DEFAULT_LANGUAGE: str = os.getenv("DEFAULT_LANGUAGE", "en")  # Used for unknown language codes
+    TEMPLATE_LANGUAGES: str = os.getenv("TEMPLATE_LANGUAGES", "")  # Comma-separated languages to preload; empty = all in app/templates
     
     # API Configuration
     API_HOST: str = os.getenv("API_HOST", "0.0.0.0")
     API_PORT: int = int(os.getenv("API_PORT", "8000"))
     
+    # Worker Configuration
+    WORKER_MODE: Literal["thread", "process"] = os.getenv("WORKER_MODE", "thread")
+    WORKER_PROCESSES: int = int(os.getenv("WORKER_PROCESSES", "0"))  # 0 = one per CPU core
+    
+    # Request Deduplication: concurrent identical listings share one generation
+    SINGLE_FLIGHT: bool = os.getenv("SINGLE_FLIGHT", "true").lower() == "true"
+    
+    # Semantic Cache: reuse LLM sections across near-duplicate listings (requires NumPy)
+    SEMANTIC_CACHE: bool = os.getenv("SEMANTIC_CACHE", "false").lower() == "true"
+    SEMANTIC_CACHE_THRESHOLD: float = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.95"))  # Minimum cosine similarity
+    SEMANTIC_CACHE_MAX_ENTRIES: int = int(os.getenv("SEMANTIC_CACHE_MAX_ENTRIES", "10000"))  # Per section, language and backend
+    SEMANTIC_CACHE_SECTIONS: str = os.getenv("SEMANTIC_CACHE_SECTIONS", "neighborhood,call_to_action,key_features")
+    
+    # Incremental Regeneration: per-listing store used by `python -m app.incremental`
+    INCREMENTAL_STORE_PATH: str = os.getenv("INCREMENTAL_STORE_PATH", "listings.sqlite3")
+    # Pre-generated content (mmap store written by `python -m app.incremental --content-store`);
+    # empty disables lookups from /generate?listing_id=...
+    CONTENT_STORE_PATH: str = os.getenv("CONTENT_STORE_PATH", "")
+    
+    # Warm Pre-generation: fill the semantic cache for the busiest neighborhoods and shapes in idle hours
+    PREWARM_ENABLED: bool = os.getenv("PREWARM_ENABLED", "false").lower() == "true"  # Requires SEMANTIC_CACHE
+    PREWARM_HOURS: str = os.getenv("PREWARM_HOURS", "1-6")  # Local hours "start-end" (end exclusive, may wrap); empty = any hour
+    PREWARM_INTERVAL_SECONDS: float = float(os.getenv("PREWARM_INTERVAL_SECONDS", "300"))  # Time between warm-up runs
+    PREWARM_TOP: int = int(os.getenv("PREWARM_TOP", "50"))  # Busiest (city, neighborhood, language, listing_type) combinations
+    PREWARM_SHAPES: int = int(os.getenv("PREWARM_SHAPES", "2"))  # Most requested listing shapes warmed per combination
+    PREWARM_HALF_LIFE_HOURS: float = float(os.getenv("PREWARM_HALF_LIFE_HOURS", "24"))  # Request counts halve after this long
+    PREWARM_REFRESH_HOURS: float = float(os.getenv("PREWARM_REFRESH_HOURS", "24"))  # Warmed shapes are generated again after this long
+    PREWARM_MAX_INTERACTIVE: int = int(os.getenv("PREWARM_MAX_INTERACTIVE", "0"))  # Warm only while interactive LLM calls <= this
+    
+    # Batch Endpoint: POST /generate/batch with a JSON array of listings
+    BATCH_MAX_ITEMS: int = int(os.getenv("BATCH_MAX_ITEMS", "1000"))  # Larger batches are rejected with 413
+    BATCH_MAX_ITEM_BYTES: int = int(os.getenv("BATCH_MAX_ITEM_BYTES", "16384"))  # Bodies over BATCH_MAX_ITEMS x this are rejected unread
+    BATCH_CONCURRENCY: int = int(os.getenv("BATCH_CONCURRENCY", "8"))  # Listings of one batch generated at a time
+    
+    # Admission Control: adaptive limit on concurrent LLM generations
+    ADMISSION_CONTROL: bool = os.getenv("ADMISSION_CONTROL", "true").lower() == "true"
+    ADMISSION_MAX_LIMIT: int = int(os.getenv("ADMISSION_MAX_LIMIT", "64"))  # Upper bound of the adaptive limit
+    ADMISSION_MAX_QUEUE: int = int(os.getenv("ADMISSION_MAX_QUEUE", "64"))  # Waiting requests beyond this are shed immediately
+    ADMISSION_QUEUE_TIMEOUT: float = float(os.getenv("ADMISSION_QUEUE_TIMEOUT", "2.0"))  # Seconds a request may wait for a slot
+    ADMISSION_OVERLOAD_ACTION: Literal["reject", "template"] = os.getenv("ADMISSION_OVERLOAD_ACTION", "reject")
+    
+    # LLM Call Scheduling: priority lanes (interactive, bulk, background) per backend
+    LLM_MAX_CONCURRENCY: int = int(os.getenv("LLM_MAX_CONCURRENCY", "16"))  # Concurrent calls per backend
+    LLM_LANE_WEIGHTS: str = os.getenv("LLM_LANE_WEIGHTS", "interactive=16,bulk=3,background=1")
+    LLM_INTERACTIVE_RESERVE: int = int(os.getenv("LLM_INTERACTIVE_RESERVE", "4"))  # Slots only interactive calls may use
+    LLM_TENANT_MAX_CONCURRENCY: int = int(os.getenv("LLM_TENANT_MAX_CONCURRENCY", "0"))  # Per-tenant slot quota, 0 = unlimited
+    LLM_SLOT_TIMEOUT: float = float(os.getenv("LLM_SLOT_TIMEOUT", "60"))  # Seconds a call may wait for a slot (like the HTTP timeout)
+    
+    # Reproducible LLM Output: seed of the deterministic sampling profile, and recorded answers
+    LLM_SEED: int = int(os.getenv("LLM_SEED", "42"))
+    LLM_REPLAY: Literal["off", "record", "replay"] = os.getenv("LLM_REPLAY", "off")  # Record answers to / serve them from LLM_REPLAY_FILE
+    LLM_REPLAY_FILE: str = os.getenv("LLM_REPLAY_FILE", "llm_recording.jsonl")  # ".gz" writes a compressed cassette
+    LLM_REPLAY_LATENCY_SCALE: float = float(os.getenv("LLM_REPLAY_LATENCY_SCALE", "0"))  # Replayed latency = recorded x scale
+    LLM_REPLAY_STRICT: bool = os.getenv("LLM_REPLAY_STRICT", "false").lower() == "true"  # A call missing from the cassette fails the request
+    
+    # Circuit Breaker per LLM backend: open on errors/slow calls, serve templates while open
+    BREAKER_ENABLED: bool = os.getenv("BREAKER_ENABLED", "true").lower() == "true"
+    BREAKER_WINDOW: int = int(os.getenv("BREAKER_WINDOW", "20"))  # Recent calls considered
+    BREAKER_MIN_CALLS: int = int(os.getenv("BREAKER_MIN_CALLS", "5"))  # Calls needed before the breaker may open
+    BREAKER_ERROR_RATE: float = float(os.getenv("BREAKER_ERROR_RATE", "0.5"))  # Failure share that opens the breaker
+    BREAKER_SLOW_CALL_SECONDS: float = float(os.getenv("BREAKER_SLOW_CALL_SECONDS", "20"))  # Slower calls count as failures
+    BREAKER_OPEN_SECONDS: float = float(os.getenv("BREAKER_OPEN_SECONDS", "30"))  # Time before a probe request is let through
+    
+    # Tracing Configuration
+    TRACING_ENABLED: bool = os.getenv("TRACING_ENABLED", "false").lower() == "true"
+    TRACE_EXPORTER: str = os.getenv("TRACE_EXPORTER", "")  # "stdout", a file path, or empty to disable export
+    
     def validate_configuration(self) -> bool:
         """Validate that required configuration is present for the selected mode."""
         if self.GENERATION_MODE == "openai":
-            if not self.OPENAI_API_KEY:
+            if not self.OPENAI_API_KEY and self.LLM_REPLAY != "replay":
                 raise ValueError("OPENAI_API_KEY is required when GENERATION_MODE is 'openai'")
         elif self.GENERATION_MODE == "ollama":
             if not self.OLLAMA_BASE_URL or not self.OLLAMA_MODEL:
@@ -0,0 +1,256 @@
+"""
+Memory-mapped store of pre-generated content, keyed by listing ID.
+
+Serving pre-generated pages for millions of listings must not mean holding
+them in Python objects. The store is two files:
+
+- `<path>.dat`: append-only records (key length, value length, key, JSON
+  value); a rewritten listing is appended again and the index points to the
+  newest copy
+- `<path>.idx`: an open-addressing hash table of fixed-size slots (64-bit key
+  hash, record offset, record length, flags), grown by rebuilding it at twice
+  the size once it is 70% full
+
+Readers mmap both files, so a lookup is a few slot probes plus one key
+comparison, and get_bytes returns a memoryview into the data file without
+copying. Memory use is whatever pages the OS keeps cached, independent of
+the number of listings.
+
+There is one writer at a time (the bulk CLI, `python -m app.incremental
+--content-store`); any number of reader processes (API workers with
+CONTENT_STORE_PATH) pick up its appends and index rebuilds as they happen.
+Rewritten and deleted records keep their space in the data file; to reclaim
+it, remove both files and let the next bulk run write a fresh store.
+"""
+
+import hashlib
+import mmap
+import os
+import struct
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple
+from .config import settings
+from .generator import GeneratedContent
+from .metrics import record_cache_lookup
+from .schemas import PropertyInput
+from .serialization import dumps, loads
+from .singleflight import listing_key
+
+_DATA_MAGIC = b"CSDATA01"
+_INDEX_MAGIC = b"CSINDX01"
+_INDEX_HEADER = struct.Struct("<8sQQQ")  # magic, capacity, live entries, used slots (live + deleted)
+_SLOT = struct.Struct("<QQII")          # key hash (0 = empty), record offset, record length, flags
+_RECORD = struct.Struct("<II")          # key length, value length
+_DELETED = 1
+_INITIAL_CAPACITY = 1024
+_MAX_LOAD = 0.7
+# How often readers check whether the writer replaced the index (seconds)
+_REFRESH_INTERVAL = 1.0
+
+
+def _key_hash(key: bytes) -> int:
+    # Never 0, which marks an empty slot
+    return int.from_bytes(hashlib.blake2b(key, digest_size=8).digest(), "little") | 1
+
+
+class ContentStore:
+    """Append-only content store with an mmap'ed hash index (single writer, many readers)."""
+
+    def __init__(self, path: str, writable: bool = False):
+        self.path = path
+        self.writable = writable
+        self._data_path = path + ".dat"
+        self._index_path = path + ".idx"
+        self._lock = threading.Lock()
+        self._data_file = None
+        if writable:
+            if not os.path.exists(self._data_path):
+                with open(self._data_path, "wb") as data_file:
+                    data_file.write(_DATA_MAGIC)
+            if not os.path.exists(self._index_path):
+                self._create_index(self._index_path, _INITIAL_CAPACITY)
+            self._data_file = open(self._data_path, "ab")
+        self._map_index()
+        self._map_data()
+
+    # --- mapping -----------------------------------------------------------
+
+    @staticmethod
+    def _create_index(path: str, capacity: int) -> None:
+        with open(path, "wb") as index_file:
+            index_file.write(_INDEX_HEADER.pack(_INDEX_MAGIC, capacity, 0, 0))
+            index_file.truncate(_INDEX_HEADER.size + capacity * _SLOT.size)
+
+    def _map_index(self) -> None:
+        with open(self._index_path, "r+b" if self.writable else "rb") as index_file:
+            self._index = mmap.mmap(index_file.fileno(), 0, access=mmap.ACCESS_WRITE if self.writable else mmap.ACCESS_READ)
+            self._index_inode = os.fstat(index_file.fileno()).st_ino
+        magic, self._capacity, _, _ = _INDEX_HEADER.unpack_from(self._index, 0)
+        if magic != _INDEX_MAGIC:
+            raise ValueError(f"{self._index_path} is not a content store index")
+        self._checked = time.monotonic()
+
+    def _map_data(self) -> None:
+        # Old maps are dropped, not closed: memoryviews handed out may still use them
+        with open(self._data_path, "rb") as data_file:
+            self._data = mmap.mmap(data_file.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._data[:len(_DATA_MAGIC)] != _DATA_MAGIC:
+            raise ValueError(f"{self._data_path} is not a content store data file")
+
+    def _refresh(self) -> None:
+        """Readers: follow an index the writer rebuilt since it was mapped."""
+        now = time.monotonic()
+        if self.writable or now - self._checked < _REFRESH_INTERVAL:
+            return
+        self._checked = now
+        try:
+            if os.stat(self._index_path).st_ino != self._index_inode:
+                self._map_index()
+                self._map_data()
+        except FileNotFoundError:
+            pass
+
+    # --- lookups -----------------------------------------------------------
+
+    def _probe(self, key_hash: int) -> Tuple[int, Optional[Tuple[int, int, int, int]]]:
+        """Slot number holding key_hash, or the empty slot ending its probe chain."""
+        mask = self._capacity - 1
+        slot = key_hash & mask
+        while True:
+            entry = _SLOT.unpack_from(self._index, _INDEX_HEADER.size + slot * _SLOT.size)
+            if entry[0] == 0 or entry[0] == key_hash:
+                return slot, entry if entry[0] else None
+            slot = (slot + 1) & mask
+
+    def get_bytes(self, key: str) -> Optional[memoryview]:
+        """The stored JSON value as a zero-copy view into the data file, or None."""
+        encoded = key.encode("utf-8")
+        self._refresh()
+        _, entry = self._probe(_key_hash(encoded))
+        if entry is None or entry[3] & _DELETED:
+            return None
+        _, offset, length, _ = entry
+        if offset + length > len(self._data):
+            self._map_data()  # appended after the data file was mapped
+        key_length, value_length = _RECORD.unpack_from(self._data, offset)
+        start = offset + _RECORD.size
+        if self._data[start:start + key_length] != encoded:
+            return None  # 64-bit hash collision with another key
+        return memoryview(self._data)[start + key_length:start + key_length + value_length]
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """The stored value, decoded, or None."""
+        value = self.get_bytes(key)
+        return loads(value) if value is not None else None
+
+    def __contains__(self, key: str) -> bool:
+        return self.get_bytes(key) is not None
+
+    def __len__(self) -> int:
+        return _INDEX_HEADER.unpack_from(self._index, 0)[2]
+
+    # --- writer ------------------------------------------------------------
+
+    def put(self, key: str, value: Dict[str, Any]) -> None:
+        """Append a value (JSON-native types) and point the key at it."""
+        encoded, payload = key.encode("utf-8"), dumps(value)
+        with self._lock:
+            offset = self._data_file.tell()
+            self._data_file.write(_RECORD.pack(len(encoded), len(payload)))
+            self._data_file.write(encoded)
+            self._data_file.write(payload)
+            # The record must be readable before the index points at it
+            self._data_file.flush()
+            self._set_slot(_key_hash(encoded), offset, _RECORD.size + len(encoded) + len(payload), 0)
+
+    def delete(self, key: str) -> None:
+        """Mark a key as deleted; the slot stays as a tombstone so probe chains remain intact."""
+        key_hash = _key_hash(key.encode("utf-8"))
+        with self._lock:
+            slot, entry = self._probe(key_hash)
+            if entry is not None and not entry[3] & _DELETED:
+                _SLOT.pack_into(self._index, _INDEX_HEADER.size + slot * _SLOT.size, key_hash, entry[1], entry[2], _DELETED)
+                self._set_counts(-1, 0)
+
+    def _set_counts(self, live_delta: int, used_delta: int) -> None:
+        _, capacity, live, used = _INDEX_HEADER.unpack_from(self._index, 0)
+        _INDEX_HEADER.pack_into(self._index, 0, _INDEX_MAGIC, capacity, live + live_delta, used + used_delta)
+
+    def _set_slot(self, key_hash: int, offset: int, length: int, flags: int) -> None:
+        """Insert or update a slot (caller holds the lock)."""
+        slot, entry = self._probe(key_hash)
+        if entry is None and _INDEX_HEADER.unpack_from(self._index, 0)[3] + 1 > self._capacity * _MAX_LOAD:
+            self._grow()
+            slot, entry = self._probe(key_hash)
+        _SLOT.pack_into(self._index, _INDEX_HEADER.size + slot * _SLOT.size, key_hash, offset, length, flags)
+        if entry is None:
+            self._set_counts(1, 1)
+        elif entry[3] & _DELETED:
+            self._set_counts(1, 0)
+
+    def _grow(self) -> None:
+        """Rebuild the index at twice the capacity and swap it in atomically (drops tombstones)."""
+        capacity = self._capacity * 2
+        mask = capacity - 1
+        rebuilt = self._index_path + ".tmp"
+        self._create_index(rebuilt, capacity)
+        count = 0
+        with open(rebuilt, "r+b") as index_file, mmap.mmap(index_file.fileno(), 0) as index:
+            for number in range(self._capacity):
+                entry = _SLOT.unpack_from(self._index, _INDEX_HEADER.size + number * _SLOT.size)
+                if entry[0] == 0 or entry[3] & _DELETED:
+                    continue
+                slot = entry[0] & mask
+                while _SLOT.unpack_from(index, _INDEX_HEADER.size + slot * _SLOT.size)[0]:
+                    slot = (slot + 1) & mask
+                _SLOT.pack_into(index, _INDEX_HEADER.size + slot * _SLOT.size, *entry)
+                count += 1
+            _INDEX_HEADER.pack_into(index, 0, _INDEX_MAGIC, capacity, count, count)
+            index.flush()
+        os.replace(rebuilt, self._index_path)
+        self._map_index()
+
+    def close(self) -> None:
+        if self._data_file is not None:
+            self._data_file.close()
+            self._data_file = None
+        if self.writable:
+            self._index.flush()
+
+
+def content_record(data: PropertyInput, content: GeneratedContent) -> Dict[str, Any]:
+    """Stored form of a listing's content; `key` ties it to the exact input and model."""
+    return {"key": listing_key(data), "backend": content.backend, "fallback": content.fallback, "sections": content.sections}
+
+
+_store: Optional[ContentStore] = None
+_store_failed = False
+
+
+def get_content_store() -> Optional[ContentStore]:
+    """Read-only store at CONTENT_STORE_PATH, opened on first use; None when unset or missing."""
+    global _store, _store_failed
+    if _store is None and settings.CONTENT_STORE_PATH and not _store_failed:
+        try:
+            _store = ContentStore(settings.CONTENT_STORE_PATH)
+        except (OSError, ValueError) as e:
+            _store_failed = True
+            print(f"Warning: content store {settings.CONTENT_STORE_PATH} unavailable ({e}); generating on demand")
+    return _store
+
+
+def pregenerated(listing_id: str, data: PropertyInput) -> Optional[GeneratedContent]:
+    """
+    Stored content for a listing, if it was generated from this exact input
+    with the current mode and model; otherwise None (generate on demand).
+    """
+    store = get_content_store()
+    if store is None:
+        return None
+    record = store.get(listing_id)
+    hit = record is not None and record["key"] == listing_key(data)
+    record_cache_lookup("content_store", hit)
+    if not hit:
+        return None
+    return GeneratedContent(record["sections"], settings.GENERATION_MODE, record["backend"], record["fallback"])
@@ -1,7 +1,58 @@
 from .schemas import PropertyInput
-from .utils import validate_content_limits
+from .listing import ListingView
+from .utils import token_budget, validate_content_limits
 from .config import settings
-from typing import Dict, Any
+from .metrics import BREAKER_SHORT_CIRCUITS, CONTENT_LIMIT_VIOLATIONS, SECTION_LATENCY, TEMPLATE_FALLBACKS, TRANSLATIONS
+from .tracing import span
+from .templates import get_template
+from .llm.breaker import get_breaker
+from .llm.prompts import get_translation_prompt
+from .llm.replay import ReplayMiss, use_subject
+from .llm.routing import routing_signature
+from .llm.semantic_cache import SemanticCache, cache_partition, get_semantic_cache
+from .llm.translation import parse_translations, render_sections, split_sections
+from concurrent.futures import ThreadPoolExecutor
+from functools import cached_property
+from typing import Dict, Any, Iterable, List, Optional, Tuple
+import contextvars
+import threading
+import time
+
+# The 7 sections in output order; each maps to a generate_<section> function
+# on the selected generator (template module, OpenAIGenerator or OllamaGenerator).
+SECTIONS = (
+    "title",
+    "meta_description",
+    "h1",
+    "description",
+    "key_features",
+    "neighborhood",
+    "call_to_action",
+)
+
+class GeneratedContent:
+    """
+    The 7 generated sections with generation metadata.
+    
+    Sections are kept separately (HTML fragment per section) so API clients can
+    read the title or meta description without parsing a page; the joined HTML
+    page is only built when `html` is first accessed.
+    """
+    
+    def __init__(self, sections: Dict[str, str], mode: str, backend: str, fallback: bool = False,
+                 section_ms: Optional[Dict[str, float]] = None, total_ms: float = 0.0, cache: Optional[str] = None):
+        self.sections = sections
+        self.mode = mode          # configured GENERATION_MODE
+        self.backend = backend    # backend that produced the sections ("template" after a fallback)
+        self.fallback = fallback
+        self.section_ms = section_ms or {}
+        self.total_ms = total_ms
+        self.cache = cache        # cache status, when a cache was consulted
+    
+    @cached_property
+    def html(self) -> str:
+        """All sections joined with newlines, in output order."""
+        return "\n".join(self.sections[section] for section in SECTIONS)
 
 def generate_content(data: PropertyInput) -> str:
     """
@@ -21,117 +72,326 @@ def generate_content(data: PropertyInput) -> str:
     6. <section id="neighborhood"> - Neighborhood Summary
     7. <p class="call-to-action"> - Call to Action
     """
+    return generate_structured(data).html
+
+def generate_structured(data: PropertyInput, mode: Optional[str] = None,
+                        only: Optional[Iterable[str]] = None) -> GeneratedContent:
+    """
+    Generate all 7 sections (see generate_content) without joining them into a page.
+    
+    `mode` overrides GENERATION_MODE for this call, e.g. "template" to serve a
+    request from templates when the LLM backend is overloaded.
+    
+    `only` restricts generation to some sections (incremental regeneration,
+    see app/incremental.py); the result then holds just those sections and
+    its `html` is not available.
+    """
+    started = time.perf_counter()
+    mode = mode or settings.GENERATION_MODE
     
     # Validate configuration first
     settings.validate_configuration()
     
-    # Convert Pydantic model to dict for easier processing
-    data_dict = data.model_dump()
+    # One read-only view with the derived fields all sections share (see app/listing.py)
+    listing = ListingView.from_input(data)
+    wanted = SECTIONS
+    if only is not None:
+        only = set(only)
+        wanted = tuple(section for section in SECTIONS if section in only)
+    return _generate_listing(listing, mode, wanted, started)
+
+def _generate_listing(listing: ListingView, mode: str, wanted: Iterable[str], started: float) -> GeneratedContent:
+    """Generate the `wanted` sections of one listing view with the given mode (see generate_structured)."""
+    # While a backend's circuit breaker is open, serve templates without
+    # touching the network (see app/llm/breaker.py)
+    if mode in ["openai", "ollama"] and settings.BREAKER_ENABLED and not get_breaker(mode).allow_request():
+        BREAKER_SHORT_CIRCUITS.inc(mode)
+        return _template_page(listing, wanted, started)
     
     # Choose generator based on mode
-    if settings.GENERATION_MODE == "openai":
+    if mode == "openai":
         generator = _get_openai_generator()
-    elif settings.GENERATION_MODE == "ollama":
+    elif mode == "ollama":
         generator = _get_ollama_generator()
     else:  # Default to template mode
-        generator = _get_template_generator(data.language)
+        generator = get_template(listing.language)
     
     # Generate all 7 sections
-    sections = []
+    backend = mode if mode in ["openai", "ollama"] else "template"
+    section_ms = {}
+    
+    # Near-duplicate listings reuse LLM sections (SEMANTIC_CACHE, see app/llm/semantic_cache.py)
+    semantic_cache = get_semantic_cache() if backend != "template" else None
+    reused: List[str] = []
     
     try:
-        # 1. Title
-        title = generator.generate_title(data_dict)
-        sections.append(title)
-        
-        # 2. Meta Description
-        meta_description = generator.generate_meta_description(data_dict)
-        sections.append(meta_description)
-        
-        # 3. H1 Headline
-        h1 = generator.generate_h1(data_dict)
-        sections.append(h1)
-        
-        # 4. Description Section
-        description = generator.generate_description(data_dict)
-        sections.append(description)
-        
-        # 5. Key Features List
-        key_features = generator.generate_key_features(data_dict)
-        sections.append(key_features)
-        
-        # 6. Neighborhood Section
-        neighborhood = generator.generate_neighborhood(data_dict)
-        sections.append(neighborhood)
-        
-        # 7. Call to Action
-        call_to_action = generator.generate_call_to_action(data_dict)
-        sections.append(call_to_action)
-        
+        # Recorded LLM answers are replayed by listing when a prompt changed (see app/llm/replay.py)
+        with use_subject(listing):
+            sections = _generate_sections(generator, listing, backend, section_ms, semantic_cache, reused, wanted)
     except Exception as e:
         # If LLM generation fails, fallback to template mode
-        if settings.GENERATION_MODE in ["openai", "ollama"]:
-            print(f"Warning: {settings.GENERATION_MODE} generation failed ({str(e)}), falling back to template mode")
-            return _generate_with_template_fallback(data_dict, data.language)
+        if mode in ["openai", "ollama"]:
+            return _fallback_page(listing, mode, wanted, started, e)
         else:
             raise e
+    return _finished_page(sections, backend, section_ms, started, reused)
+
+def _template_page(listing: ListingView, wanted: Iterable[str], started: float) -> GeneratedContent:
+    """The `wanted` sections from templates, marked as a fallback."""
+    section_ms: Dict[str, float] = {}
+    sections = _generate_with_template_fallback(listing, section_ms, wanted)
+    return GeneratedContent(sections, settings.GENERATION_MODE, "template", fallback=True,
+                            section_ms=section_ms, total_ms=(time.perf_counter() - started) * 1000)
+
+def _fallback_page(listing: ListingView, mode: str, wanted: Iterable[str], started: float, error: Exception) -> GeneratedContent:
+    """Template page after a failed LLM generation (LLM_REPLAY_STRICT re-raises a call missing from the cassette)."""
+    if isinstance(error, ReplayMiss) and settings.LLM_REPLAY_STRICT:
+        raise error
+    print(f"Warning: {mode} generation failed ({str(error)}), falling back to template mode")
+    TEMPLATE_FALLBACKS.inc(mode)
+    return _template_page(listing, wanted, started)
+
+def _finished_page(sections: Dict[str, str], backend: str, section_ms: Dict[str, float], started: float,
+                   reused: List[str]) -> GeneratedContent:
+    # Validate content limits; LLM sections are already enforced in the
+    # generators (see app/llm/limits.py), so violations here show up on /metrics
+    validation_results = validate_content_limits(sections)
+    for section, within_limit in validation_results.items():
+        if not within_limit:
+            CONTENT_LIMIT_VIOLATIONS.inc(backend, section)
+    
+    return GeneratedContent(sections, settings.GENERATION_MODE, backend,
+                            section_ms=section_ms, total_ms=(time.perf_counter() - started) * 1000,
+                            cache="semantic" if reused else None)
+
+def generate_multilingual(data: PropertyInput, languages: Iterable[str], mode: Optional[str] = None,
+                          translate: bool = False) -> Dict[str, GeneratedContent]:
+    """
+    Generate one listing in several languages; returns the content per language.
     
-    # Join all sections with newlines
-    final_content = "\n".join(sections)
+    The listing is validated once and one view per language is derived from
+    it. Each language is generated like /generate (semantic cache, then the
+    LLM; a failed LLM call turns the whole page into templates), but with an
+    LLM backend the LLM calls of all languages and sections run concurrently
+    on a shared thread pool (LLM call slots are still granted by the
+    backend's scheduler). Templates are fast enough to run in line.
     
-    # Optional: Validate content limits (for debugging/quality assurance)
-    content_dict = {
-        'title': title,
-        'meta_description': meta_description,
-        'description': description
-    }
-    validation_results = validate_content_limits(content_dict)
+    With `translate`, only the first language is generated; its page is then
+    translated into the other languages by one batched LLM call (see
+    app/llm/translation.py) and those languages report cache "translated".
+    A language the translation does not cover is generated directly.
+    """
+    mode = mode or settings.GENERATION_MODE
+    settings.validate_configuration()
+    listings = {language: ListingView.from_input(data, language) for language in dict.fromkeys(languages)}
+    if not translate or mode not in ("openai", "ollama") or len(listings) < 2:
+        return _fan_out(listings, mode)
     
-    # In a production system, I would add a log validation results
-    # or retry generation if limits are exceeded
+    source, *targets = listings
+    results = _fan_out({source: listings[source]}, mode)
+    if not results[source].fallback:
+        with use_subject(listings[source], *targets):
+            results.update(_translate(results[source], source, targets, mode))
+    missing = {language: listings[language] for language in targets if language not in results}
+    results.update(_fan_out(missing, mode))
+    return {language: results[language] for language in listings}
+
+# Threads running the (language, section) jobs of multi-language requests,
+# created on first use; sized like the LLM slot pool of one backend
+_fan_out_pool: Optional[ThreadPoolExecutor] = None
+_fan_out_lock = threading.Lock()
+
+def _get_fan_out_pool() -> ThreadPoolExecutor:
+    global _fan_out_pool
+    if _fan_out_pool is None:
+        with _fan_out_lock:
+            if _fan_out_pool is None:
+                _fan_out_pool = ThreadPoolExecutor(max_workers=max(1, settings.LLM_MAX_CONCURRENCY),
+                                                   thread_name_prefix="fan-out")
+    return _fan_out_pool
+
+def _fan_out(listings: Dict[str, ListingView], mode: str) -> Dict[str, GeneratedContent]:
+    """
+    Generate every section of every listing view. With an LLM backend the
+    circuit breaker is asked once for all of them (in half-open state the
+    whole request is the probe), sections are looked up in the semantic cache
+    in order, and only the remaining LLM calls run concurrently.
+    """
+    started = time.perf_counter()
+    if mode not in ("openai", "ollama"):
+        return {language: _generate_listing(listing, mode, SECTIONS, started) for language, listing in listings.items()}
+    if settings.BREAKER_ENABLED and not get_breaker(mode).allow_request():
+        BREAKER_SHORT_CIRCUITS.inc(mode)
+        return {language: _template_page(listing, SECTIONS, started) for language, listing in listings.items()}
+    
+    generator = _get_openai_generator() if mode == "openai" else _get_ollama_generator()
+    semantic_cache = get_semantic_cache()
+    pool = _get_fan_out_pool()
+    pages = {}
+    for language, listing in listings.items():
+        sections, section_ms, reused = {}, {}, []
+        if semantic_cache is not None:
+            for section in SECTIONS:
+                looked_up = time.perf_counter()
+                cached = semantic_cache.lookup(section, listing, cache_partition(mode, generator.routes[section]))
+                if cached is not None:
+                    elapsed = time.perf_counter() - looked_up
+                    SECTION_LATENCY.observe(elapsed, mode, section)
+                    sections[section] = cached
+                    section_ms[section] = round(elapsed * 1000, 3)
+                    reused.append(section)
+        # Each call runs in a copy of the caller's context (priority lane,
+        # tenant, trace, breaker probe) with the listing as replay subject
+        with use_subject(listing):
+            context = contextvars.copy_context()
+        calls = {
+            section: pool.submit(context.copy().run, _call_section, generator, listing, mode, section)
+            for section in SECTIONS if section not in sections
+        }
+        pages[language] = (sections, section_ms, reused, calls)
     
-    return final_content
+    results = {}
+    for language, listing in listings.items():
+        sections, section_ms, reused, calls = pages[language]
+        try:
+            for section, call in calls.items():
+                sections[section], section_ms[section] = call.result()
+        except Exception as e:
+            results[language] = _fallback_page(listing, mode, SECTIONS, started, e)
+            continue
+        if semantic_cache is not None:
+            for section in calls:
+                semantic_cache.store(section, listing, cache_partition(mode, generator.routes[section]), sections[section])
+        results[language] = _finished_page({section: sections[section] for section in SECTIONS}, mode, section_ms,
+                                           started, reused)
+    return results
+
+def _call_section(generator, listing: ListingView, backend: str, section: str) -> Tuple[str, float]:
+    """Generate one section with the LLM; returns its text and latency in milliseconds."""
+    started = time.perf_counter()
+    with span(f"section.{section}", backend=backend):
+        text = getattr(generator, f"generate_{section}")(listing)
+    elapsed = time.perf_counter() - started
+    SECTION_LATENCY.observe(elapsed, backend, section)
+    return text, round(elapsed * 1000, 3)
+
+def _translate(source_content: GeneratedContent, source: str, targets: List[str], mode: str) -> Dict[str, GeneratedContent]:
+    """Translate a generated page into `targets` with one LLM call; languages it fails for are left out."""
+    if settings.BREAKER_ENABLED and not get_breaker(mode).allow_request():
+        BREAKER_SHORT_CIRCUITS.inc(mode)
+        return {}
+    started = time.perf_counter()
+    segments, skeletons = split_sections(source_content.sections)
+    prompt = get_translation_prompt(segments, source, targets)
+    # Room for every text in every target language, plus the JSON around them
+    max_tokens = token_budget(sum(len(segment) + 8 for segment in segments) * len(targets))
+    generator = _get_openai_generator() if mode == "openai" else _get_ollama_generator()
+    try:
+        with span("translate", backend=mode, languages=len(targets)):
+            answer = generator.generate_translation(prompt, max_tokens)
+    except Exception as e:
+        if isinstance(e, ReplayMiss) and settings.LLM_REPLAY_STRICT:
+            raise
+        print(f"Warning: {mode} translation failed ({str(e)}), generating {', '.join(targets)} directly")
+        TRANSLATIONS.inc(mode, "failed")
+        return {}
+    translations = parse_translations(answer, targets, len(segments))
+    TRANSLATIONS.inc(mode, "translated" if len(translations) == len(targets) else "incomplete")
+    elapsed = (time.perf_counter() - started) * 1000
+    results = {}
+    for language, texts in translations.items():
+        sections = render_sections(skeletons, texts, mode)
+        for section, within_limit in validate_content_limits(sections).items():
+            if not within_limit:
+                CONTENT_LIMIT_VIOLATIONS.inc(mode, section)
+        results[language] = GeneratedContent(sections, settings.GENERATION_MODE, mode, total_ms=elapsed, cache="translated")
+    return results
+
+# LLM generators are built once per configuration and reused across requests,
+# so the SDK import and HTTP client setup are paid at startup (see warm_up)
+# rather than on every call. Keys include the settings each generator reads,
+# so changing settings at runtime still yields a fresh instance.
+_generator_cache: Dict[tuple, Any] = {}
 
 def _get_openai_generator():
     """Get OpenAI generator instance."""
+    key = ("openai", settings.OPENAI_API_KEY, routing_signature("openai"), settings.OPENAI_BASE_URL)
+    generator = _generator_cache.get(key)
+    if generator is not None:
+        return generator
     try:
         from .llm.openai_generator import OpenAIGenerator
-        return OpenAIGenerator()
+        generator = OpenAIGenerator()
     except ImportError as e:
         raise Exception(f"OpenAI dependencies not installed: {str(e)}")
     except Exception as e:
         raise Exception(f"Failed to initialize OpenAI generator: {str(e)}")
+    _generator_cache[key] = generator
+    return generator
 
 def _get_ollama_generator():
     """Get Ollama generator instance."""
+    key = ("ollama", settings.OLLAMA_BASE_URL, routing_signature("ollama"))
+    generator = _generator_cache.get(key)
+    if generator is not None:
+        return generator
     try:
         from .llm.ollama_generator import OllamaGenerator
-        return OllamaGenerator()
+        generator = OllamaGenerator()
     except ImportError as e:
         raise Exception(f"Ollama dependencies not installed: {str(e)}")
     except Exception as e:
         raise Exception(f"Failed to initialize Ollama generator: {str(e)}")
+    _generator_cache[key] = generator
+    return generator
 
-def _get_template_generator(language: str):
-    if language == "pt":
-        from .templates.pt import content as template
-    elif language == "es":
-        from .templates.es import content as template
-    else: # Default to English
-        from .templates.en import content as template
-    return template
+def warm_up() -> float:
+    """
+    Import and initialise the active backend ahead of the first request.
+    
+    Only the backend selected by GENERATION_MODE is imported; the other LLM
+    SDKs stay unloaded. Template languages are loaded by templates.preload,
+    limited to TEMPLATE_LANGUAGES when set. Returns the time spent in seconds.
+    """
+    started = time.perf_counter()
+    if settings.GENERATION_MODE == "openai":
+        _get_openai_generator()
+    elif settings.GENERATION_MODE == "ollama":
+        _get_ollama_generator()
+    return time.perf_counter() - started
+
+def _generate_sections(generator, listing: ListingView, backend: str, section_ms: Dict[str, float],
+                       semantic_cache: Optional[SemanticCache] = None, reused: Optional[List[str]] = None,
+                       wanted: Iterable[str] = SECTIONS) -> Dict[str, str]:
+    """
+    Run the section generators in order (every section unless `wanted` says
+    otherwise), recording per-section latency into section_ms.
+    
+    With a semantic cache, sections it covers are first looked up there; reused
+    section names are appended to `reused`.
+    """
+    sections = {}
+    for section in wanted:
+        started = time.perf_counter()
+        with span(f"section.{section}", backend=backend):
+            # Cached text is only reused for the same backend, model and sampling parameters
+            partition = cache_partition(backend, generator.routes[section]) if semantic_cache is not None else None
+            cached = semantic_cache.lookup(section, listing, partition) if semantic_cache is not None else None
+            if cached is not None:
+                sections[section] = cached
+                reused.append(section)
+            else:
+                sections[section] = getattr(generator, f"generate_{section}")(listing)
+                if semantic_cache is not None:
+                    semantic_cache.store(section, listing, partition, sections[section])
+        elapsed = time.perf_counter() - started
+        SECTION_LATENCY.observe(elapsed, backend, section)
+        section_ms[section] = round(elapsed * 1000, 3)
+    return sections
 
-def _generate_with_template_fallback(data_dict: Dict[str, Any], language: str) -> str:
+def _generate_with_template_fallback(listing: ListingView, section_ms: Dict[str, float],
+                                     wanted: Iterable[str] = SECTIONS) -> Dict[str, str]:
     """Fallback to template generation if LLM fails."""
-    template = _get_template_generator(language)
-    
-    sections = []
-    sections.append(template.generate_title(data_dict))
-    sections.append(template.generate_meta_description(data_dict))
-    sections.append(template.generate_h1(data_dict))
-    sections.append(template.generate_description(data_dict))
-    sections.append(template.generate_key_features(data_dict))
-    sections.append(template.generate_neighborhood(data_dict))
-    sections.append(template.generate_call_to_action(data_dict))
-    
-    return "\n".join(sections) 
\ No newline at end of file
+    template = get_template(listing.language)
+    with span("fallback"):
+        return _generate_sections(template, listing, "template", section_ms, wanted=wanted) 
\ No newline at end of file
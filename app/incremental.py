@@ -0,0 +1,377 @@
+"""
+Incremental regeneration of a listing feed.
+
+The feed delivers full snapshots every hour, yet only a few listings change
+between two snapshots. A persistent store keeps, per listing ID, the hash of
+the last input, a hash of the fields each section depends on, and the
+generated sections. Processing a snapshot then costs work proportional to
+what changed:
+
+- same input hash and same backend/model: the listing is skipped
+- otherwise only the sections whose inputs changed are regenerated (a new
+  price regenerates the description only); a listing seen for the first
+  time or generated by another backend/model is generated in full
+- with prune, listings missing from the snapshot are removed
+
+With --content-store, the complete content of every listing is also kept in
+the memory-mapped store the API serves pre-generated pages from (see
+app/content_store.py).
+
+Every content change (created, updated, removed, failed) is appended to a
+change journal, so downstream publishers can pick up exactly the pages that
+changed since their last sequence number.
+
+Usage:
+    python -m app.incremental feed.jsonl                   # one listing per line with an "id" field
+    python -m app.incremental feed.jsonl --store listings.sqlite3 --workers 8 --prune
+    python -m app.incremental feed.jsonl --content-store content   # also write content.dat / content.idx
+"""
+
+import argparse
+import contextvars
+import hashlib
+import json
+import sqlite3
+import sys
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple, Union
+from pydantic import BaseModel
+from .batch import format_errors, validate_lines
+from .config import settings
+from .content_store import ContentStore, content_record
+from .generator import SECTIONS, GeneratedContent, generate_structured
+from .llm.routing import routing_signature
+from .llm.scheduler import use_priority
+from .schemas import PropertyInput
+
+# Listing fields each section is generated from, by the templates and the LLM
+# prompts (app/templates/*/content.py, app/llm/prompts.py); keep in sync when
+# a section starts using another field. The language is always included.
+SECTION_INPUTS: Dict[str, Tuple[str, ...]] = {
+    "title": ("location.city", "location.neighborhood", "features.bedrooms", "listing_type"),
+    "meta_description": ("location.city", "location.neighborhood", "features.bedrooms", "features.area_sqm",
+                         "features.balcony", "features.elevator", "features.parking", "listing_type"),
+    "h1": ("location.city", "location.neighborhood", "features.bedrooms", "features.balcony", "features.elevator"),
+    "description": ("location.city", "location.neighborhood", "features.bedrooms", "features.bathrooms",
+                    "features.area_sqm", "features.balcony", "features.elevator", "features.parking",
+                    "features.floor", "features.year_built", "price", "listing_type"),
+    "key_features": ("location.city", "location.neighborhood", "features.bedrooms", "features.bathrooms",
+                     "features.area_sqm", "features.balcony", "features.elevator", "features.parking"),
+    "neighborhood": ("location.city", "location.neighborhood"),
+    "call_to_action": ("location.city", "listing_type"),
+}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS listings (
+    listing_id TEXT PRIMARY KEY,
+    input_hash TEXT NOT NULL,
+    generation TEXT NOT NULL,
+    section_hashes TEXT NOT NULL,
+    sections TEXT NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS journal (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    listing_id TEXT NOT NULL,
+    at REAL NOT NULL,
+    action TEXT NOT NULL,
+    sections TEXT NOT NULL
+);
+"""
+
+
+def _hash(value: Any) -> str:
+    return hashlib.sha256(json.dumps(value, sort_keys=True, separators=(",", ":")).encode("utf-8")).hexdigest()
+
+
+def _field(data: Dict[str, Any], path: str) -> Any:
+    for part in path.split("."):
+        data = data.get(part) if isinstance(data, dict) else None
+    return data
+
+
+def section_hashes(data: Dict[str, Any]) -> Dict[str, str]:
+    """Hash of the inputs of every section."""
+    language = data.get("language", "en")
+    return {section: _hash([language] + [_field(data, path) for path in SECTION_INPUTS[section]]) for section in SECTIONS}
+
+
+def generation_key(mode: Optional[str] = None) -> str:
+    """Backend and model whose output is stored; a change regenerates every listing."""
+    mode = mode or settings.GENERATION_MODE
+    if mode in ("openai", "ollama"):
+        return f"{mode}:{routing_signature(mode)}"
+    return "template"
+
+
+class ListingRecord:
+    """Stored state of one listing."""
+
+    __slots__ = ("listing_id", "input_hash", "generation", "section_hashes", "sections")
+
+    def __init__(self, listing_id: str, input_hash: str, generation: str, section_hashes: Dict[str, str], sections: Dict[str, str]):
+        self.listing_id = listing_id
+        self.input_hash = input_hash
+        self.generation = generation
+        self.section_hashes = section_hashes
+        self.sections = sections
+
+
+class ListingStore:
+    """SQLite store of the last generated state per listing, plus the change journal."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        # WAL: one cheap commit per changed listing, readers never blocked
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(_SCHEMA)
+        self._lock = threading.Lock()
+
+    def get(self, listing_id: str) -> Optional[ListingRecord]:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT input_hash, generation, section_hashes, sections FROM listings WHERE listing_id = ?", (listing_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        return ListingRecord(listing_id, row[0], row[1], json.loads(row[2]), json.loads(row[3]))
+
+    def put(self, record: ListingRecord, action: Optional[str] = None, changed: Iterable[str] = ()) -> None:
+        """Save a listing; with an action, also append a journal entry for the changed sections."""
+        with self._lock, self._db:
+            now = time.time()
+            self._db.execute(
+                "INSERT OR REPLACE INTO listings VALUES (?, ?, ?, ?, ?, ?)",
+                (record.listing_id, record.input_hash, record.generation,
+                 json.dumps(record.section_hashes), json.dumps(record.sections), now),
+            )
+            if action:
+                self._journal(record.listing_id, action, changed, now)
+
+    def remove(self, listing_id: str) -> None:
+        with self._lock, self._db:
+            self._db.execute("DELETE FROM listings WHERE listing_id = ?", (listing_id,))
+            self._journal(listing_id, "removed", (), time.time())
+
+    def record_failure(self, listing_id: str, sections: Iterable[str]) -> None:
+        with self._lock, self._db:
+            self._journal(listing_id, "failed", sections, time.time())
+
+    def _journal(self, listing_id: str, action: str, sections: Iterable[str], at: float) -> None:
+        self._db.execute("INSERT INTO journal (listing_id, at, action, sections) VALUES (?, ?, ?, ?)",
+                         (listing_id, at, action, json.dumps(list(sections))))
+
+    def listing_ids(self) -> Set[str]:
+        with self._lock:
+            return {row[0] for row in self._db.execute("SELECT listing_id FROM listings")}
+
+    def journal(self, since: int = 0) -> List[Dict[str, Any]]:
+        """Journal entries with a sequence number above `since`, oldest first."""
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT seq, listing_id, at, action, sections FROM journal WHERE seq > ? ORDER BY seq", (since,)
+            ).fetchall()
+        return [{"seq": seq, "listing_id": listing_id, "at": at, "action": action, "sections": json.loads(sections)}
+                for seq, listing_id, at, action, sections in rows]
+
+    def close(self) -> None:
+        self._db.close()
+
+
+def plan(data: PropertyInput, record: Optional[ListingRecord], generation: str) -> Tuple[str, Dict[str, str], List[str]]:
+    """
+    Decide what to regenerate for one listing.
+
+    Returns (input hash, section hashes, sections to regenerate). The section
+    hashes are only computed when the input hash differs; an empty list means
+    the stored content is current.
+    """
+    data_dict = data.model_dump()
+    input_hash = _hash(data_dict)
+    if record is not None and record.generation == generation and record.input_hash == input_hash:
+        return input_hash, record.section_hashes, []
+    hashes = section_hashes(data_dict)
+    if record is None or record.generation != generation:
+        return input_hash, hashes, list(SECTIONS)
+    return input_hash, hashes, [section for section in SECTIONS if record.section_hashes.get(section) != hashes[section]]
+
+
+def regenerate_feed(
+    feed: Iterable[Tuple[str, Optional[PropertyInput]]],
+    store: ListingStore,
+    workers: int = 4,
+    prune: bool = False,
+    on_result: Optional[Callable[[str, GeneratedContent], None]] = None,
+    content_store: Optional[ContentStore] = None,
+) -> Dict[str, Any]:
+    """
+    Bring the store up to date with a feed snapshot of (listing ID, listing) pairs.
+
+    A listing of None stands for one that failed validation: it is counted
+    as invalid and its stored content is left as is.
+
+    Changed listings are generated on `workers` threads in the bulk priority
+    lane, so interactive /generate traffic sharing the backend keeps its
+    latency. `on_result` receives the complete content of every listing that
+    was (re)generated and is called from the worker threads. A writable
+    `content_store` is kept in sync with the content of every listing in the
+    snapshot. Returns counts per outcome.
+    """
+    generation = generation_key()
+    summary = {"listings": 0, "unchanged": 0, "touched": 0, "created": 0, "updated": 0, "failed": 0, "invalid": 0,
+               "removed": 0, "sections_generated": 0, "sections_reused": 0}
+    summary_lock = threading.Lock()
+    started = time.perf_counter()
+    seen: Set[str] = set()
+
+    def count(**changes: int) -> None:
+        with summary_lock:
+            for key, value in changes.items():
+                summary[key] += value
+
+    def process(listing_id: str, data: PropertyInput) -> None:
+        record = store.get(listing_id)
+        input_hash, hashes, changed = plan(data, record, generation)
+        if not changed:
+            if record is not None and record.input_hash != input_hash:
+                # Fields no section depends on (e.g. the listing title) changed
+                record.input_hash, record.section_hashes = input_hash, hashes
+                store.put(record)
+                count(touched=1, sections_reused=len(SECTIONS))
+            else:
+                count(unchanged=1, sections_reused=len(SECTIONS))
+                if content_store is None or listing_id in content_store:
+                    return
+            if content_store is not None:
+                # The content store record is keyed to the full input; also
+                # fills a new content store from the listing store
+                stored = GeneratedContent(record.sections, settings.GENERATION_MODE, record.generation.split(":", 1)[0])
+                content_store.put(listing_id, content_record(data, stored))
+            return
+
+        result = generate_structured(data, only=changed if record is not None else None)
+        sections = dict(record.sections) if record is not None else {}
+        sections.update(result.sections)
+        content = GeneratedContent(sections, result.mode, result.backend, result.fallback, result.section_ms,
+                                   result.total_ms, cache="incremental" if len(changed) < len(SECTIONS) else None)
+        if result.fallback:
+            # Template stand-in after an LLM failure: publish it, but keep the
+            # stored state so the next snapshot retries the LLM
+            store.record_failure(listing_id, changed)
+            action = "failed"
+        else:
+            action = "created" if record is None else "updated"
+            store.put(ListingRecord(listing_id, input_hash, generation, hashes, sections), action, changed)
+        count(**{action: 1, "sections_generated": len(changed), "sections_reused": len(SECTIONS) - len(changed)})
+        if content_store is not None:
+            content_store.put(listing_id, content_record(data, content))
+        if on_result is not None:
+            on_result(listing_id, content)
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        pending: Set[Future] = set()
+        with use_priority("bulk"):
+            context = contextvars.copy_context()
+        for listing_id, data in feed:
+            summary["listings"] += 1
+            seen.add(listing_id)
+            if data is None:
+                # Failed validation: keep whatever is stored for it
+                summary["invalid"] += 1
+                continue
+            # Bounded window: a feed of millions of listings is never fully queued
+            if len(pending) >= workers * 4:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    future.result()
+            pending.add(executor.submit(context.copy().run, process, listing_id, data))
+        for future in pending:
+            future.result()
+
+    if prune:
+        for listing_id in store.listing_ids() - seen:
+            store.remove(listing_id)
+            if content_store is not None:
+                content_store.delete(listing_id)
+            summary["removed"] += 1
+    summary["seconds"] = round(time.perf_counter() - started, 3)
+    return summary
+
+
+class _FeedId(BaseModel):
+    id: Union[str, int]
+
+
+# Lines validated per TypeAdapter call; bounds memory for feeds of any size
+_FEED_CHUNK = 2000
+
+
+def _read_chunks(path: str) -> Iterator[Tuple[List[int], List[bytes]]]:
+    with open(path, "rb") as feed:
+        numbers: List[int] = []
+        lines: List[bytes] = []
+        for number, line in enumerate(feed, 1):
+            if not line.strip():
+                continue
+            numbers.append(number)
+            lines.append(line.rstrip(b"\r\n"))
+            if len(lines) == _FEED_CHUNK:
+                yield numbers, lines
+                numbers, lines = [], []
+        if lines:
+            yield numbers, lines
+
+
+def read_feed(path: str) -> Iterator[Tuple[str, Optional[PropertyInput]]]:
+    """
+    Listings from a JSON Lines snapshot; each line carries its listing ID in "id".
+
+    Lines are validated in bulk (see app/batch.py). An invalid listing is
+    reported on stderr and yielded as (listing ID, None), so its stored
+    content is kept (and not pruned); a line without a usable ID is
+    reported and skipped.
+    """
+    for numbers, lines in _read_chunks(path):
+        batch = validate_lines(lines)
+        listings = dict(batch.items)
+        errors = {error["index"]: error["errors"] for error in batch.errors}
+        ids = dict(validate_lines(lines, _FeedId).items)
+        for index, number in enumerate(numbers):
+            if index not in ids:
+                print(f"Warning: {path}:{number}: skipped, listing without a valid \"id\" field", file=sys.stderr)
+                continue
+            listing_id = str(ids[index].id)
+            if index in errors:
+                print(f"Warning: {path}:{number}: invalid listing {listing_id} ({format_errors(errors[index])})",
+                      file=sys.stderr)
+            yield listing_id, listings.get(index)
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Regenerate only the listings and sections that changed in a feed snapshot.")
+    parser.add_argument("feed", help="JSON Lines snapshot, one listing per line with an \"id\" field")
+    parser.add_argument("--store", default=settings.INCREMENTAL_STORE_PATH, help="SQLite listing store")
+    parser.add_argument("--workers", type=int, default=4, help="listings generated concurrently")
+    parser.add_argument("--prune", action="store_true", help="remove stored listings missing from the snapshot")
+    parser.add_argument("--content-store", help="also write complete content to this memory-mapped store (path without extension)")
+    args = parser.parse_args(argv)
+
+    store = ListingStore(args.store)
+    content_store = ContentStore(args.content_store, writable=True) if args.content_store else None
+    try:
+        summary = regenerate_feed(read_feed(args.feed), store, workers=args.workers, prune=args.prune,
+                                  content_store=content_store)
+    finally:
+        store.close()
+        if content_store is not None:
+            content_store.close()
+    json.dump(summary, sys.stdout, indent=2)
+    print()
+
+
+if __name__ == "__main__":
+    main()
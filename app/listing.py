@@ -0,0 +1,90 @@
+"""
+Compact, read-only view of one listing for the generation hot path.
+
+Every section generator used to receive `data.model_dump()` and dig through
+nested dicts (`data['location']`, `features.get(...)`) and re-derive the same
+values: the bedroom phrase, the listing-type word, the formatted price, the
+amenity list. ListingView is built once per request straight from the
+validated PropertyInput, holds plain attributes in __slots__, and carries
+those derived values precomputed in the listing's language. Templates,
+prompts, LLM generators and the semantic cache all read from it.
+"""
+
+from typing import Any, Dict, Optional
+from .schemas import PropertyInput
+from .utils import format_price
+
+# Shared wording per language; unknown languages use English, like the prompts
+_PHRASES: Dict[str, Dict[str, Any]] = {
+    "en": {"bedrooms": "{}-bedroom", "sale": "sale", "rent": "rent", "amenities": ("balcony", "elevator", "parking")},
+    "pt": {"bedrooms": "T{}", "sale": "venda", "rent": "arrendamento", "amenities": ("varanda", "elevador", "estacionamento")},
+    "es": {"bedrooms": "{} habitaciones", "sale": "venta", "rent": "alquiler", "amenities": ("balcón", "ascensor", "aparcamiento")},
+}
+
+
+class ListingView:
+    """
+    Immutable listing with precomputed derived fields.
+
+    Derived fields, in the listing's language:
+    - bedroom_phrase: "3-bedroom" / "T3" / "3 habitaciones"
+    - action: listing-type word ("sale"/"rent", "venda"/"arrendamento", "venta"/"alquiler")
+    - price_text: price formatted for the language ("€650,000", "€650.000")
+    - area_text: area rounded to whole square metres
+    - amenities: names of the amenities present, in balcony/elevator/parking order
+    """
+
+    __slots__ = (
+        "language", "city", "neighborhood", "listing_type", "is_sale", "price",
+        "bedrooms", "bathrooms", "area_sqm", "balcony", "parking", "elevator", "floor", "year_built",
+        "bedroom_phrase", "action", "price_text", "area_text", "amenities",
+    )
+
+    def __init__(self, language: str, city: str, neighborhood: str, listing_type: str, price: float,
+                 bedrooms: int, bathrooms: int, area_sqm: float, balcony: Optional[bool] = None,
+                 parking: Optional[bool] = None, elevator: Optional[bool] = None, floor: Optional[int] = None,
+                 year_built: Optional[int] = None):
+        phrases = _PHRASES.get(language, _PHRASES["en"])
+        is_sale = listing_type == "sale"
+        amenity_names = phrases["amenities"]
+        values = (
+            ("language", language), ("city", city), ("neighborhood", neighborhood),
+            ("listing_type", listing_type), ("is_sale", is_sale), ("price", price),
+            ("bedrooms", bedrooms), ("bathrooms", bathrooms), ("area_sqm", area_sqm),
+            ("balcony", balcony), ("parking", parking), ("elevator", elevator),
+            ("floor", floor), ("year_built", year_built),
+            ("bedroom_phrase", phrases["bedrooms"].format(bedrooms)),
+            ("action", phrases["sale"] if is_sale else phrases["rent"]),
+            ("price_text", format_price(price, "EUR", language)),
+            ("area_text", f"{area_sqm:.0f}"),
+            ("amenities", tuple(name for name, present in zip(amenity_names, (balcony, elevator, parking)) if present)),
+        )
+        for name, value in values:
+            object.__setattr__(self, name, value)
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        raise AttributeError(f"ListingView is read-only (cannot set '{name}')")
+
+    def __repr__(self) -> str:
+        return f"ListingView({self.language}, {self.neighborhood}, {self.city}, {self.bedroom_phrase}, {self.action})"
+
+    @classmethod
+    def from_input(cls, data: PropertyInput, language: Optional[str] = None) -> "ListingView":
+        """
+        Build the view from a validated listing without dumping it to dicts;
+        `language` overrides the listing's language (multi-language requests).
+        """
+        location, features = data.location, data.features
+        return cls(language or data.language, location.city, location.neighborhood, data.listing_type, data.price,
+                   features.bedrooms, features.bathrooms, features.area_sqm, features.balcony,
+                   features.parking, features.elevator, features.floor, features.year_built)
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "ListingView":
+        """Build the view from a listing dict shaped like PropertyInput (e.g. model_dump output)."""
+        location, features = data["location"], data["features"]
+        return cls(data.get("language", "en"), location["city"], location["neighborhood"], data["listing_type"],
+                   data["price"], features["bedrooms"], features["bathrooms"], features["area_sqm"],
+                   features.get("balcony"), features.get("parking"), features.get("elevator"),
+                   features.get("floor"), features.get("year_built"))
+
@@ -0,0 +1,175 @@
+"""
+Circuit breaker per LLM backend.
+
+When a backend is down, every request would otherwise wait for a connection
+error (or the 60 s timeout) before falling back to templates. The breaker
+watches the outcome of recent calls and stops trying while the backend is
+unhealthy:
+
+- closed: calls go through; the last BREAKER_WINDOW calls are tracked and the
+  breaker opens once at least BREAKER_MIN_CALLS of them were seen and the
+  share of failures (errors, 429/5xx answers, or calls slower than
+  BREAKER_SLOW_CALL_SECONDS) reaches BREAKER_ERROR_RATE
+- open: requests go straight to templates without touching the network, for
+  BREAKER_OPEN_SECONDS
+- half-open: one probe request is let through; its first successful call
+  closes the breaker, a failed call opens it again
+
+allow_request() hands the probe a token in the request context; track()
+carries it, and only a call holding the current token moves the breaker out
+of half-open. Calls that started earlier (a 60 s timeout begun while the
+breaker was still closed) and finish during half-open are dropped, as are
+the outcomes of an expired probe.
+"""
+
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Deque, Dict, Iterator, Optional, Tuple
+from ..config import settings
+from ..metrics import BREAKER_STATE, BREAKER_TRANSITIONS
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+_STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+# (backend, probe token) of the half-open probe the current request was let through as
+_probe: ContextVar[Optional[Tuple[str, int]]] = ContextVar("breaker_probe", default=None)
+
+
+class _CallTracker:
+    """Handle for one tracked call; failed() marks an answer that did not raise as a failure."""
+
+    __slots__ = ("failure", "probe")
+
+    def __init__(self, probe: int = 0):
+        self.failure = False
+        self.probe = probe  # probe token the call was made under, 0 for none
+
+    def failed(self) -> None:
+        self.failure = True
+
+
+class CircuitBreaker:
+    """Closed / open / half-open breaker for one backend (thread-safe)."""
+
+    def __init__(self, backend: str, window: int, min_calls: int, error_rate: float, slow_call_seconds: float, open_seconds: float):
+        self.backend = backend
+        self.min_calls = min_calls
+        self.error_rate = error_rate
+        self.slow_call_seconds = slow_call_seconds
+        self.open_seconds = open_seconds
+        self.state = CLOSED
+        self.opened_at = 0.0
+        self._outcomes: Deque[bool] = deque(maxlen=window)  # True = failure
+        self._probe_started = 0.0
+        self._probe = 0  # token of the current half-open probe
+        self._lock = threading.Lock()
+        BREAKER_STATE.set(_STATE_VALUES[CLOSED], backend)
+
+    def _transition(self, state: str) -> None:
+        """Change state (caller holds the lock)."""
+        if state == self.state:
+            return
+        print(f"Warning: {self.backend} circuit breaker {self.state} -> {state}")
+        self.state = state
+        if state == OPEN:
+            self.opened_at = time.monotonic()
+        if state == CLOSED:
+            self._outcomes.clear()
+        BREAKER_STATE.set(_STATE_VALUES[state], self.backend)
+        BREAKER_TRANSITIONS.inc(self.backend, state)
+
+    def is_open(self) -> bool:
+        """True while requests are being short-circuited (no probe is due yet)."""
+        return self.state == OPEN and time.monotonic() - self.opened_at < self.open_seconds
+
+    def allow_request(self) -> bool:
+        """
+        Whether a request may use the backend; in half-open state only one
+        probe at a time, whose token is set in the caller's context.
+        """
+        with self._lock:
+            now = time.monotonic()
+            if self.state == CLOSED:
+                return True
+            if self.state == OPEN:
+                if now - self.opened_at < self.open_seconds:
+                    return False
+                self._transition(HALF_OPEN)
+            # Half-open: one probe at a time; a probe that never reported back
+            # (e.g. failed before calling the backend) expires after open_seconds
+            if self._probe_started and now - self._probe_started < self.open_seconds:
+                return False
+            self._probe_started = now
+            self._probe += 1
+            _probe.set((self.backend, self._probe))
+            return True
+
+    def record(self, failure: bool, probe: int = 0) -> None:
+        """Record the outcome of one backend call, made under probe token `probe` (0 for none)."""
+        with self._lock:
+            if self.state == HALF_OPEN:
+                if probe != self._probe or not self._probe_started:
+                    return  # a call from before the probe, or from an expired one
+                self._probe_started = 0.0
+                self._transition(OPEN if failure else CLOSED)
+                return
+            if self.state == OPEN:
+                return  # late answer from before the breaker opened
+            self._outcomes.append(failure)
+            if len(self._outcomes) >= self.min_calls and sum(self._outcomes) / len(self._outcomes) >= self.error_rate:
+                self._transition(OPEN)
+
+    @contextmanager
+    def track(self) -> Iterator[_CallTracker]:
+        """Time one backend call and record it: exceptions and slow calls count as failures."""
+        probe = _probe.get()
+        tracker = _CallTracker(probe[1] if probe is not None and probe[0] == self.backend else 0)
+        started = time.perf_counter()
+        try:
+            yield tracker
+        except Exception:
+            self.record(True, tracker.probe)
+            raise
+        self.record(tracker.failure or time.perf_counter() - started > self.slow_call_seconds, tracker.probe)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """State for /status."""
+        with self._lock:
+            calls = len(self._outcomes)
+            return {
+                "state": self.state,
+                "recent_calls": calls,
+                "recent_failure_rate": round(sum(self._outcomes) / calls, 3) if calls else 0.0,
+                "open_for_seconds": round(time.monotonic() - self.opened_at, 1) if self.state == OPEN else None,
+            }
+
+
+_breakers: Dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+
+def get_breaker(backend: str) -> CircuitBreaker:
+    """Breaker for a backend, created from the current settings on first use."""
+    breaker = _breakers.get(backend)
+    if breaker is None:
+        with _breakers_lock:
+            breaker = _breakers.get(backend)
+            if breaker is None:
+                breaker = CircuitBreaker(
+                    backend,
+                    settings.BREAKER_WINDOW,
+                    settings.BREAKER_MIN_CALLS,
+                    settings.BREAKER_ERROR_RATE,
+                    settings.BREAKER_SLOW_CALL_SECONDS,
+                    settings.BREAKER_OPEN_SECONDS,
+                )
+                _breakers[backend] = breaker
+    return breaker
+
+
+def breaker_states() -> Dict[str, Dict[str, Any]]:
+    """Snapshot of every breaker created so far."""
+    return {backend: breaker.snapshot() for backend, breaker in _breakers.items()}
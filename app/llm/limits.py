@@ -0,0 +1,29 @@
+from typing import Callable
+from ..config import settings
+from ..metrics import LIMIT_ENFORCEMENTS
+from ..utils import SECTION_LIMITS, smart_truncate
+from .prompts import get_shorten_prompt
+
+def enforce_limit(section: str, text: str, language: str, reask: Callable[[str], str], backend: str) -> str:
+    """
+    Bring an LLM answer for a limited section (title, meta description,
+    description) within its character limit.
+    
+    With LIMIT_ENFORCEMENT="reask", the failing section alone is sent back once
+    with a shortening prompt; anything still over the limit (or every
+    over-length answer with "truncate") is cut at a sentence or word boundary.
+    """
+    limit = SECTION_LIMITS[section]
+    if len(text) <= limit or settings.LIMIT_ENFORCEMENT == "off":
+        return text
+    
+    if settings.LIMIT_ENFORCEMENT == "reask":
+        shorter = reask(get_shorten_prompt(text, limit, language))
+        if shorter and len(shorter) <= limit:
+            LIMIT_ENFORCEMENTS.inc(backend, section, "reask")
+            return shorter
+        if shorter and len(shorter) < len(text):
+            text = shorter
+    
+    LIMIT_ENFORCEMENTS.inc(backend, section, "truncate")
+    return smart_truncate(text, limit)
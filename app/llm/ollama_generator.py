@@ -1,8 +1,18 @@
 import httpx
-import re
 import json
-from typing import Dict, Any
+import time
+from typing import Any, Callable, Dict, Optional, Tuple
 from ..config import settings
+from ..listing import ListingView
+from ..metrics import LLM_ERRORS, MODEL_ESCALATIONS
+from ..tracing import span
+from ..utils import SECTION_LIMITS, token_budget
+from .breaker import get_breaker
+from .limits import enforce_limit
+from .replay import CallKey, Recording, call_key, get_recording
+from .routing import account_call, has_answer, has_items, section_routes, within_limit
+from .scheduler import get_scheduler
+from .sanitize import clean_lines, clean_text, escape_attr, escape_text
 from .prompts import (
     get_title_prompt, 
     get_meta_description_prompt, 
@@ -17,130 +27,217 @@ class OllamaGenerator:
     def __init__(self):
         self.base_url = settings.OLLAMA_BASE_URL
         self.model = settings.OLLAMA_MODEL
+        # Model and sampling profile per section (see routing.py)
+        self.routes = section_routes("ollama")
+        # One pooled client per generator: keeps connections to Ollama alive across calls
+        self.client = httpx.Client(timeout=60.0)
+        self.scheduler = get_scheduler("ollama")
+        self.breaker = get_breaker("ollama")
     
-    def _call_ollama(self, prompt: str) -> str:
-        """Make a call to Ollama API."""
+    def model_for(self, section: str) -> str:
+        """Model a section is routed to."""
+        return self.routes[section].model
+    
+    def _call_ollama(self, section: str, prompt: str, max_chars: Optional[int] = None, model: Optional[str] = None,
+                     max_tokens: Optional[int] = None) -> str:
+        """
+        Make a call to Ollama API with the section's routed model (or `model`).
+        
+        With max_chars the answer is streamed with a num_predict budget and the
+        stream is closed as soon as the text passes the limit, so a runaway
+        answer stops costing generation time; see enforce_limit.
+        max_tokens caps the answer's tokens (num_predict) without streaming.
+        With LLM_REPLAY the answer is recorded or served from a recording (see replay.py).
+        """
+        route = self.routes[section]
+        model = model or route.model
+        sampling = route.sampling
+        recording = get_recording()
+        key = None
+        if recording is not None:
+            key = call_key("ollama", model, section, sampling, prompt, max_tokens=max_tokens, max_chars=max_chars)
+            if recording.replaying:
+                with self.scheduler.slot(), span("llm", backend="ollama", model=model, section=section, replay=True):
+                    return recording.answer("ollama", key, model, section, prompt)
+        options = {
+            # temperature controls the randomness of generation. 0.7 (the balanced profile) produces creative but not chaotic text.
+            "temperature": sampling.temperature, 
+            # top_p limits the cumulative probability of candidate words. 0.9 allows variety while maintaining coherence.
+            "top_p": sampling.top_p if sampling.top_p is not None else 0.9,
+            # top_k limits the number of candidate words considered at each step. 40 gives diversity without losing quality.
+            "top_k": sampling.top_k if sampling.top_k is not None else 40
+        }
+        if sampling.seed is not None:
+            # A fixed seed makes sampling repeatable (deterministic profile)
+            options["seed"] = sampling.seed
+        if max_chars is not None or max_tokens is not None:
+            # num_predict caps the number of generated tokens
+            budgets = ([token_budget(max_chars)] if max_chars is not None else []) + ([max_tokens] if max_tokens is not None else [])
+            options["num_predict"] = min(budgets)
+        payload = {"model": model, "prompt": prompt, "stream": max_chars is not None, "options": options}
+        
         try:
-            with httpx.Client(timeout=60.0) as client:
-                response = client.post(
-                    f"{self.base_url}/api/generate",
-                    json={
-                        "model": self.model,
-                        "prompt": prompt,
-                        "stream": False,
-                        "options": {
-                            # temperature controls the randomness of generation. 0.7 is a balanced value, producing creative but not chaotic text.
-                            "temperature": 0.7, 
-                            # top_p limits the cumulative probability of candidate words. 0.9 allows variety while maintaining coherence.
-                            "top_p": 0.9,
-                            # top_k limits the number of candidate words considered at each step. 40 gives diversity without losing quality.
-                            "top_k": 40
-                        }
-                    }
-                )
-                
-                if response.status_code == 200:
-                    result = response.json()
-                    return result.get("response", "").strip()
+            # Wait for a slot in this request's priority lane (see scheduler.py)
+            with self.scheduler.slot(), self.breaker.track() as call, span("llm", backend="ollama", model=model, section=section):
+                started = time.perf_counter()
+                if max_chars is None:
+                    response = self.client.post(f"{self.base_url}/api/generate", json=payload)
                 else:
-                    raise Exception(f"Ollama API error: {response.status_code} - {response.text}")
-                    
+                    with self.client.stream("POST", f"{self.base_url}/api/generate", json=payload) as response:
+                        if response.status_code == 200:
+                            text, stats = self._read_stream(response, max_chars)
+                            self._account(recording, key, model, section, prompt, text, time.perf_counter() - started, stats)
+                            return text
+                        response.read()
+                # Overload and server errors count against the breaker; other errors are request problems
+                if response.status_code == 429 or response.status_code >= 500:
+                    call.failed()
         except httpx.ConnectError:
+            LLM_ERRORS.inc("ollama", "ConnectError")
             raise Exception(f"Could not connect to Ollama at {self.base_url}. Make sure Ollama is running.")
         except Exception as e:
+            LLM_ERRORS.inc("ollama", type(e).__name__)
             raise Exception(f"Ollama API error: {str(e)}")
+        
+        if response.status_code != 200:
+            LLM_ERRORS.inc("ollama", f"http_{response.status_code}")
+            raise Exception(f"Ollama API error: {response.status_code} - {response.text}")
+        
+        result = response.json()
+        text = result.get("response", "").strip()
+        self._account(recording, key, model, section, prompt, text, time.perf_counter() - started, result)
+        return text
     
-    def generate_title(self, data: Dict[str, Any]) -> str:
+    def _account(self, recording: Optional[Recording], key: Optional[CallKey], model: str, section: str, prompt: str,
+                 text: str, elapsed: float, stats: Dict[str, Any]) -> None:
+        """Account a finished call from Ollama's token counts and record it when LLM_REPLAY=record."""
+        prompt_tokens, completion_tokens = stats.get("prompt_eval_count"), stats.get("eval_count")
+        account_call("ollama", model, section, elapsed, prompt, text, prompt_tokens, completion_tokens)
+        if recording is not None:
+            recording.record("ollama", key, model, section, prompt, text, elapsed, prompt_tokens, completion_tokens)
+    
+    def _read_stream(self, response: httpx.Response, max_chars: int) -> Tuple[str, Dict[str, Any]]:
+        """Accumulate NDJSON chunks, stopping once the text exceeds max_chars; returns the text and the final chunk's stats."""
+        text = ""
+        stats: Dict[str, Any] = {}
+        for line in response.iter_lines():
+            if not line:
+                continue
+            chunk = json.loads(line)
+            text += chunk.get("response", "")
+            if chunk.get("done"):
+                stats = chunk
+                break
+            if len(text.strip()) > max_chars:
+                break
+        return text.strip(), stats
+    
+    def _call_routed(self, section: str, prompt: str, max_chars: Optional[int] = None,
+                     valid: Callable[[str], bool] = has_answer) -> str:
+        """Call the section's model; if the answer fails `valid`, ask the escalation model once (see routing.py)."""
+        text = self._call_ollama(section, prompt, max_chars=max_chars)
+        escalation = self.routes[section].escalation
+        if escalation and not valid(text):
+            MODEL_ESCALATIONS.inc("ollama", section)
+            text = self._call_ollama(section, prompt, max_chars=max_chars, model=escalation)
+        return text
+    
+    def _call_limited(self, section: str, prompt: str, language: str) -> str:
+        """Call Ollama for a section with a character limit and enforce that limit."""
+        if settings.LIMIT_ENFORCEMENT == "off":
+            return clean_text(self._call_routed(section, prompt))
+        limit = SECTION_LIMITS[section]
+        # Limits apply to the cleaned text, i.e. the characters a reader sees
+        text = clean_text(self._call_routed(section, prompt, max_chars=limit, valid=within_limit(limit)))
+        return enforce_limit(section, text, language, lambda reask_prompt: clean_text(self._call_ollama(section, reask_prompt, max_chars=limit)), "ollama")
+    
+    def generate_title(self, listing: ListingView) -> str:
         """Generate title using Ollama."""
-        prompt = get_title_prompt(data, data.get('language', 'en'))
-        title_text = self._call_ollama(prompt)
-        # Clean up the response (remove quotes if present)
-        title_text = title_text.strip('"\'')
-        return f"<title>{title_text}</title>"
+        language = listing.language
+        prompt = get_title_prompt(listing)
+        title_text = self._call_limited("title", prompt, language)
+        return f"<title>{escape_text(title_text)}</title>"
     
-    def generate_meta_description(self, data: Dict[str, Any]) -> str:
+    def generate_meta_description(self, listing: ListingView) -> str:
         """Generate meta description using Ollama."""
-        prompt = get_meta_description_prompt(data, data.get('language', 'en'))
-        meta_text = self._call_ollama(prompt)
-        meta_text = meta_text.strip('"\'')
-        return f'<meta name="description" content="{meta_text}">'
+        language = listing.language
+        prompt = get_meta_description_prompt(listing)
+        meta_text = self._call_limited("meta_description", prompt, language)
+        return f'<meta name="description" content="{escape_attr(meta_text)}">'
     
-    def generate_h1(self, data: Dict[str, Any]) -> str:
+    def generate_h1(self, listing: ListingView) -> str:
         """Generate H1 headline using Ollama."""
-        location = data['location']
-        features = data['features']
-        language = data.get('language', 'en')
+        language = listing.language
         
         if language == "pt":
-            prompt = f"Cria um título H1 atrativo (diferente do título SEO) para um apartamento T{features.get('bedrooms', '')} em {location['neighborhood']}, {location['city']}. Deve ser cativante e incluir uma característica especial se disponível. Máximo 80 caracteres. Responde apenas com o título."
+            prompt = f"Cria um título H1 atrativo (diferente do título SEO) para um apartamento {listing.bedroom_phrase} em {listing.neighborhood}, {listing.city}. Deve ser cativante e incluir uma característica especial se disponível. Máximo 80 caracteres. Responde apenas com o título."
         elif language == "es":
-            prompt = f"Crear un título H1 atractivo (diferente del título SEO) para un apartamento de{features.get('bedrooms', '')} habitaciones en {location['neighborhood']}, {location['city']}. Debe ser cautivador e incluir una característica especial si está disponible. Máximo 80 caracteres. Responde solo con el título."
+            prompt = f"Crear un título H1 atractivo (diferente del título SEO) para un apartamento de{listing.bedroom_phrase} en {listing.neighborhood}, {listing.city}. Debe ser cautivador e incluir una característica especial si está disponible. Máximo 80 caracteres. Responde solo con el título."
         else:
-            prompt = f"Create an attractive H1 headline (different from SEO title) for a {features.get('bedrooms', '')}-bedroom apartment in {location['neighborhood']}, {location['city']}. Should be catchy and include a special feature if available. Maximum 80 characters. Respond only with the headline."
+            prompt = f"Create an attractive H1 headline (different from SEO title) for a {listing.bedroom_phrase} apartment in {listing.neighborhood}, {listing.city}. Should be catchy and include a special feature if available. Maximum 80 characters. Respond only with the headline."
         
-        h1_text = self._call_ollama(prompt)
-        h1_text = h1_text.strip('"\'')
-        return f"<h1>{h1_text}</h1>"
+        h1_text = clean_text(self._call_routed("h1", prompt))
+        return f"<h1>{escape_text(h1_text)}</h1>"
     
-    def generate_description(self, data: Dict[str, Any]) -> str:
+    def generate_description(self, listing: ListingView) -> str:
         """Generate full property description using Ollama."""
-        prompt = get_description_prompt(data, data.get('language', 'en'))
-        description_text = self._call_ollama(prompt)
-        description_text = description_text.strip('"\'')
-        return f'<section id="description"><p>{description_text}</p></section>'
+        language = listing.language
+        prompt = get_description_prompt(listing)
+        description_text = self._call_limited("description", prompt, language)
+        return f'<section id="description"><p>{escape_text(description_text)}</p></section>'
     
-    def generate_key_features(self, data: Dict[str, Any]) -> str:
+    def generate_key_features(self, listing: ListingView) -> str:
         """Generate key features list using Ollama."""
-        location = data['location']
-        features = data['features']
-        language = data.get('language', 'en')
+        language = listing.language
         
         if language == "pt":
             prompt = f"""
 Lista 4-5 características principais em formato de bullet points para:
-- Apartamento T{features.get('bedrooms', '')} em {location['neighborhood']}
-- Área: {features.get('area_sqm', '')} m²
-- Características: varanda={'sim' if features.get('balcony') else 'não'}, elevador={'sim' if features.get('elevator') else 'não'}, estacionamento={'sim' if features.get('parking') else 'não'}
+- Apartamento {listing.bedroom_phrase} em {listing.neighborhood}
+- Área: {listing.area_sqm} m²
+- Características: varanda={'sim' if listing.balcony else 'não'}, elevador={'sim' if listing.elevator else 'não'}, estacionamento={'sim' if listing.parking else 'não'}
 
 Formato: cada linha deve começar com "•" e ser concisa. Responde apenas com a lista.
 """
         elif language == "es":
             prompt = f"""
 Lista 4-5 características clave en formato de puntos clave para:
-- Apartamento de {features.get('bedrooms', '')} habitaciones en {location['neighborhood']}
-- Área: {features.get('area_sqm', '')} m²
-- Características: balcón={'sí' if features.get('balcony') else 'no'}, ascensor={'sí' if features.get('elevator') else 'no'}, aparcamiento={'sí' if features.get('parking') else 'no'}
+- Apartamento de {listing.bedroom_phrase} en {listing.neighborhood}
+- Área: {listing.area_sqm} m²
+- Características: balcón={'sí' if listing.balcony else 'no'}, ascensor={'sí' if listing.elevator else 'no'}, aparcamiento={'sí' if listing.parking else 'no'}
 
 Formato: cada línea debe comenzar con "•" y ser concisa. Responde solo con la lista.
 """
         else:
             prompt = f"""
 List 4-5 key features in bullet point format for:
-- {features.get('bedrooms', '')}-bedroom apartment in {location['neighborhood']}
-- Area: {features.get('area_sqm', '')} sqm
-- Features: balcony={'yes' if features.get('balcony') else 'no'}, elevator={'yes' if features.get('elevator') else 'no'}, parking={'yes' if features.get('parking') else 'no'}
+- {listing.bedroom_phrase} apartment in {listing.neighborhood}
+- Area: {listing.area_sqm} sqm
+- Features: balcony={'yes' if listing.balcony else 'no'}, elevator={'yes' if listing.elevator else 'no'}, parking={'yes' if listing.parking else 'no'}
 
 Format: each line should start with "•" and be concise. Respond only with the list.
 """
         
-        features_text = self._call_ollama(prompt)
+        features_text = self._call_routed("key_features", prompt, valid=has_items)
         
         # Convert to HTML format
-        lines = [line.strip() for line in features_text.split('\n') if line.strip()]
-        features_html = '\n'.join(['  <li>{}</li>'.format(re.sub(r"^[-•\s]+", "", line)) for line in lines if line])
+        with span("postprocess"):
+            features_html = '\n'.join(f'  <li>{escape_text(item)}</li>' for item in clean_lines(features_text))
         
         return f'<ul id="key-features">\n{features_html}\n</ul>'
     
-    def generate_neighborhood(self, data: Dict[str, Any]) -> str:
+    def generate_neighborhood(self, listing: ListingView) -> str:
         """Generate neighborhood description using Ollama."""
-        prompt = get_neighborhood_prompt(data, data.get('language', 'en'))
-        neighborhood_text = self._call_ollama(prompt)
-        neighborhood_text = neighborhood_text.strip('"\'')
-        return f'<section id="neighborhood"><p>{neighborhood_text}</p></section>'
+        prompt = get_neighborhood_prompt(listing)
+        neighborhood_text = clean_text(self._call_routed("neighborhood", prompt))
+        return f'<section id="neighborhood"><p>{escape_text(neighborhood_text)}</p></section>'
     
-    def generate_call_to_action(self, data: Dict[str, Any]) -> str:
+    def generate_call_to_action(self, listing: ListingView) -> str:
         """Generate call to action using Ollama."""
-        prompt = get_cta_prompt(data, data.get('language', 'en'))
-        cta_text = self._call_ollama(prompt)
-        cta_text = cta_text.strip('"\'')
-        return f'<p class="call-to-action">{cta_text}</p>' 
\ No newline at end of file
+        prompt = get_cta_prompt(listing)
+        cta_text = clean_text(self._call_routed("call_to_action", prompt))
+        return f'<p class="call-to-action">{escape_text(cta_text)}</p>' 
+    
+    def generate_translation(self, prompt: str, max_tokens: int) -> str:
+        """Raw answer to a translation prompt (see app/llm/translation.py) using Ollama."""
+        return self._call_ollama("translation", prompt, max_tokens=max_tokens)
@@ -1,7 +1,10 @@
 import openai
-import re
-from typing import Dict, Any
+import time
+from typing import Any, Callable, Optional, Tuple
 from ..config import settings
+from ..listing import ListingView
+from ..metrics import LLM_ERRORS, MODEL_ESCALATIONS
+from ..tracing import span
 from .prompts import (
     get_title_prompt, 
     get_meta_description_prompt, 
@@ -9,121 +12,214 @@ from .prompts import (
     get_neighborhood_prompt,
     get_cta_prompt
 )
-from ..utils import format_price
+from .breaker import get_breaker
+from .limits import enforce_limit
+from .replay import call_key, get_recording
+from .routing import account_call, has_answer, has_items, section_routes, within_limit
+from .scheduler import get_scheduler
+from .sanitize import clean_lines, clean_text, escape_attr, escape_text
+from ..utils import format_price, SECTION_LIMITS, token_budget
 
 class OpenAIGenerator:
     """Content generator using OpenAI API."""
     
     def __init__(self):
-        if not settings.OPENAI_API_KEY:
+        # Replaying a cassette never calls the API, so it needs no key
+        replaying = settings.LLM_REPLAY == "replay"
+        if not settings.OPENAI_API_KEY and not replaying:
             raise ValueError("OpenAI API key is required")
         
-        self.client = openai.OpenAI(api_key=settings.OPENAI_API_KEY)
+        self.client = openai.OpenAI(api_key=settings.OPENAI_API_KEY or "replay", base_url=settings.OPENAI_BASE_URL or None)
         self.model = settings.OPENAI_MODEL
+        # Model and sampling profile per section (see routing.py)
+        self.routes = section_routes("openai")
+        self.scheduler = get_scheduler("openai")
+        self.breaker = get_breaker("openai")
     
-    def _call_openai(self, prompt: str, max_tokens: int = 150) -> str:
-        """Make a call to OpenAI API."""
+    def model_for(self, section: str) -> str:
+        """Model a section is routed to."""
+        return self.routes[section].model
+    
+    def _call_openai(self, section: str, prompt: str, max_tokens: int = 150, max_chars: Optional[int] = None,
+                     model: Optional[str] = None) -> str:
+        """
+        Make a call to OpenAI API with the section's routed model (or `model`).
+        
+        With max_chars the answer is streamed and the stream is closed as soon
+        as the text passes the limit, so over-length output stops costing
+        tokens and time; the caller then fixes the section (see enforce_limit).
+        With LLM_REPLAY the answer is recorded or served from a recording (see replay.py).
+        """
+        route = self.routes[section]
+        model = model or route.model
+        sampling = route.sampling
+        recording = get_recording()
+        if recording is not None:
+            key = call_key("openai", model, section, sampling, prompt, max_tokens, max_chars)
+            if recording.replaying:
+                with self.scheduler.slot(), span("llm", backend="openai", model=model, section=section, replay=True):
+                    return recording.answer("openai", key, model, section, prompt)
+        usage = None
         try:
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": "You are an expert real estate copywriter and SEO specialist."},
-                    {"role": "user", "content": prompt}
-                ],
-                max_tokens=max_tokens,  # Maximum number of tokens in the generated response
-                temperature=0.7,        # Controls randomness: higher values = more creative, lower = more deterministic
-                top_p=1.0,              # Nucleus sampling: 1.0 means all words are considered (maximum diversity)
-                frequency_penalty=0.0,  # Penalizes repeated tokens in the response (higher = less repetition)
-                presence_penalty=0.0    # Penalizes new topic introduction (higher = more likely to introduce new topics)
-            )
-            return response.choices[0].message.content.strip()
+            # Wait for a slot in this request's priority lane (see scheduler.py)
+            with self.scheduler.slot(), self.breaker.track(), span("llm", backend="openai", model=model, section=section, max_tokens=max_tokens):
+                started = time.perf_counter()
+                response = self.client.chat.completions.create(
+                    model=model,
+                    messages=[
+                        {"role": "system", "content": "You are an expert real estate copywriter and SEO specialist."},
+                        {"role": "user", "content": prompt}
+                    ],
+                    max_tokens=max_tokens,  # Maximum number of tokens in the generated response
+                    temperature=sampling.temperature,  # Controls randomness: higher values = more creative, lower = more deterministic
+                    # Nucleus sampling: 1.0 (the API default) means all words are considered (maximum diversity)
+                    top_p=sampling.top_p if sampling.top_p is not None else 1.0,
+                    frequency_penalty=0.0,  # Penalizes repeated tokens in the response (higher = less repetition)
+                    presence_penalty=0.0,   # Penalizes new topic introduction (higher = more likely to introduce new topics)
+                    stream=max_chars is not None,
+                    # A fixed seed makes sampling repeatable (deterministic profile)
+                    **({"seed": sampling.seed} if sampling.seed is not None else {}),
+                    # Streams report token usage in a final chunk
+                    **({"stream_options": {"include_usage": True}} if max_chars is not None else {})
+                )
+                if max_chars is None:
+                    text = response.choices[0].message.content.strip()
+                    usage = response.usage
+                else:
+                    text, usage = self._read_stream(response, max_chars)
         except Exception as e:
+            LLM_ERRORS.inc("openai", type(e).__name__)
             raise Exception(f"OpenAI API error: {str(e)}")
+        elapsed = time.perf_counter() - started
+        prompt_tokens, completion_tokens = (usage.prompt_tokens, usage.completion_tokens) if usage else (None, None)
+        account_call("openai", model, section, elapsed, prompt, text, prompt_tokens, completion_tokens)
+        if recording is not None:
+            recording.record("openai", key, model, section, prompt, text, elapsed, prompt_tokens, completion_tokens)
+        return text
+    
+    def _read_stream(self, stream, max_chars: int) -> Tuple[str, Any]:
+        """Accumulate streamed deltas, stopping once the text exceeds max_chars; returns the text and usage, if reported."""
+        text = ""
+        usage = None
+        try:
+            for chunk in stream:
+                if getattr(chunk, "usage", None):
+                    usage = chunk.usage
+                if chunk.choices and chunk.choices[0].delta.content:
+                    text += chunk.choices[0].delta.content
+                    if len(text.strip()) > max_chars:
+                        break
+        finally:
+            stream.close()
+        return text.strip(), usage
     
-    def generate_title(self, data: Dict[str, Any]) -> str:
+    def _call_routed(self, section: str, prompt: str, max_tokens: int, max_chars: Optional[int] = None,
+                     valid: Callable[[str], bool] = has_answer) -> str:
+        """Call the section's model; if the answer fails `valid`, ask the escalation model once (see routing.py)."""
+        text = self._call_openai(section, prompt, max_tokens=max_tokens, max_chars=max_chars)
+        escalation = self.routes[section].escalation
+        if escalation and not valid(text):
+            MODEL_ESCALATIONS.inc("openai", section)
+            text = self._call_openai(section, prompt, max_tokens=max_tokens, max_chars=max_chars, model=escalation)
+        return text
+    
+    def _call_limited(self, section: str, prompt: str, language: str, max_tokens: int) -> str:
+        """Call OpenAI for a section with a character limit and enforce that limit."""
+        if settings.LIMIT_ENFORCEMENT == "off":
+            return clean_text(self._call_routed(section, prompt, max_tokens))
+        limit = SECTION_LIMITS[section]
+        budget = min(max_tokens, token_budget(limit))
+        # Limits apply to the cleaned text, i.e. the characters a reader sees
+        text = clean_text(self._call_routed(section, prompt, budget, max_chars=limit, valid=within_limit(limit)))
+        return enforce_limit(section, text, language, lambda reask_prompt: clean_text(self._call_openai(section, reask_prompt, max_tokens=budget, max_chars=limit)), "openai")
+    
+    def generate_title(self, listing: ListingView) -> str:
         """Generate title using OpenAI."""
-        prompt = get_title_prompt(data, data.get('language', 'en'))
-        title_text = self._call_openai(prompt, max_tokens=50)
-        return f"<title>{title_text}</title>"
+        language = listing.language
+        prompt = get_title_prompt(listing)
+        title_text = self._call_limited("title", prompt, language, max_tokens=50)
+        return f"<title>{escape_text(title_text)}</title>"
     
-    def generate_meta_description(self, data: Dict[str, Any]) -> str:
+    def generate_meta_description(self, listing: ListingView) -> str:
         """Generate meta description using OpenAI."""
-        prompt = get_meta_description_prompt(data, data.get('language', 'en'))
-        meta_text = self._call_openai(prompt, max_tokens=100)
-        return f'<meta name="description" content="{meta_text}">'
+        language = listing.language
+        prompt = get_meta_description_prompt(listing)
+        meta_text = self._call_limited("meta_description", prompt, language, max_tokens=100)
+        return f'<meta name="description" content="{escape_attr(meta_text)}">'
     
-    def generate_h1(self, data: Dict[str, Any]) -> str:
+    def generate_h1(self, listing: ListingView) -> str:
         """Generate H1 headline using OpenAI (similar to title but for display)."""
         # For H1, we can use a slightly modified title prompt
-        location = data['location']
-        features = data['features']
-        language = data.get('language', 'en')
+        language = listing.language
         
         if language == "pt":
-            prompt = f"Cria um título H1 atrativo (diferente do título SEO) para um apartamento T{features.get('bedrooms', '')} em {location['neighborhood']}, {location['city']}. Deve ser cativante e incluir uma característica especial se disponível. Máximo 80 caracteres."
+            prompt = f"Cria um título H1 atrativo (diferente do título SEO) para um apartamento {listing.bedroom_phrase} em {listing.neighborhood}, {listing.city}. Deve ser cativante e incluir uma característica especial se disponível. Máximo 80 caracteres."
         elif language == "es":
-            prompt = f"Crear un título H1 atractivo (diferente del título SEO) para un apartamento de {features.get('bedrooms', '')} habitaciones en {location['neighborhood']}, {location['city']}. Debe ser cautivador e incluir una característica especial si está disponible. Máximo 80 caracteres."
+            prompt = f"Crear un título H1 atractivo (diferente del título SEO) para un apartamento de {listing.bedroom_phrase} en {listing.neighborhood}, {listing.city}. Debe ser cautivador e incluir una característica especial si está disponible. Máximo 80 caracteres."
         else:
-            prompt = f"Create an attractive H1 headline (different from SEO title) for a {features.get('bedrooms', '')}-bedroom apartment in {location['neighborhood']}, {location['city']}. Should be catchy and include a special feature if available. Maximum 80 characters."
+            prompt = f"Create an attractive H1 headline (different from SEO title) for a {listing.bedroom_phrase} apartment in {listing.neighborhood}, {listing.city}. Should be catchy and include a special feature if available. Maximum 80 characters."
         
-        h1_text = self._call_openai(prompt, max_tokens=60)
-        return f"<h1>{h1_text}</h1>"
+        h1_text = clean_text(self._call_routed("h1", prompt, max_tokens=60))
+        return f"<h1>{escape_text(h1_text)}</h1>"
     
-    def generate_description(self, data: Dict[str, Any]) -> str:
+    def generate_description(self, listing: ListingView) -> str:
         """Generate full property description using OpenAI."""
-        prompt = get_description_prompt(data, data.get('language', 'en'))
-        description_text = self._call_openai(prompt, max_tokens=300)
-        return f'<section id="description"><p>{description_text}</p></section>'
+        language = listing.language
+        prompt = get_description_prompt(listing)
+        description_text = self._call_limited("description", prompt, language, max_tokens=300)
+        return f'<section id="description"><p>{escape_text(description_text)}</p></section>'
     
-    def generate_key_features(self, data: Dict[str, Any]) -> str:
+    def generate_key_features(self, listing: ListingView) -> str:
         """Generate key features list using OpenAI."""
-        location = data['location']
-        features = data['features']
-        language = data.get('language', 'en')
+        language = listing.language
         
         if language == "pt":
             prompt = f"""
 Lista 4-5 características principais em formato de bullet points para:
-- Apartamento T{features.get('bedrooms', '')} em {location['neighborhood']}
-- Área: {features.get('area_sqm', '')} m²
-- Características: varanda={'sim' if features.get('balcony') else 'não'}, elevador={'sim' if features.get('elevator') else 'não'}, estacionamento={'sim' if features.get('parking') else 'não'}
+- Apartamento {listing.bedroom_phrase} em {listing.neighborhood}
+- Área: {listing.area_sqm} m²
+- Características: varanda={'sim' if listing.balcony else 'não'}, elevador={'sim' if listing.elevator else 'não'}, estacionamento={'sim' if listing.parking else 'não'}
 
 Formato: cada linha deve começar com "•" e ser concisa.
 """
         elif language == "es":
             prompt = f"""
 Lista 4-5 características clave en formato de puntos clave para:
-- Apartamento de {features.get('bedrooms', '')} habitaciones en {location['neighborhood']}
-- Área: {features.get('area_sqm', '')} m²
-- Características: balcón={'sí' if features.get('balcony') else 'no'}, ascensor={'sí' if features.get('elevator') else 'no'}, aparcamiento={'sí' if features.get('parking') else 'no'}
+- Apartamento de {listing.bedroom_phrase} en {listing.neighborhood}
+- Área: {listing.area_sqm} m²
+- Características: balcón={'sí' if listing.balcony else 'no'}, ascensor={'sí' if listing.elevator else 'no'}, aparcamiento={'sí' if listing.parking else 'no'}
 
 Formato: cada línea debe comenzar con "•" y ser concisa.
 """
         else:
             prompt = f"""
 List 4-5 key features in bullet point format for:
-- {features.get('bedrooms', '')}-bedroom apartment in {location['neighborhood']}
-- Area: {features.get('area_sqm', '')} sqm
-- Features: balcony={'yes' if features.get('balcony') else 'no'}, elevator={'yes' if features.get('elevator') else 'no'}, parking={'yes' if features.get('parking') else 'no'}
+- {listing.bedroom_phrase} apartment in {listing.neighborhood}
+- Area: {listing.area_sqm} sqm
+- Features: balcony={'yes' if listing.balcony else 'no'}, elevator={'yes' if listing.elevator else 'no'}, parking={'yes' if listing.parking else 'no'}
 
 Format: each line should start with "•" and be concise.
 """
         
-        features_text = self._call_openai(prompt, max_tokens=150)
+        features_text = self._call_routed("key_features", prompt, max_tokens=150, valid=has_items)
         
         # Convert to HTML format
-        lines = [line.strip() for line in features_text.split('\n') if line.strip()]
-        features_html = '\n'.join(['  <li>{}</li>'.format(re.sub(r"^[-•\s]+", "", line)) for line in lines if line])
+        with span("postprocess"):
+            features_html = '\n'.join(f'  <li>{escape_text(item)}</li>' for item in clean_lines(features_text))
         return f'<ul id="key-features">\n{features_html}\n</ul>'
     
-    def generate_neighborhood(self, data: Dict[str, Any]) -> str:
+    def generate_neighborhood(self, listing: ListingView) -> str:
         """Generate neighborhood description using OpenAI."""
-        prompt = get_neighborhood_prompt(data, data.get('language', 'en'))
-        neighborhood_text = self._call_openai(prompt, max_tokens=200)
-        return f'<section id="neighborhood"><p>{neighborhood_text}</p></section>'
+        prompt = get_neighborhood_prompt(listing)
+        neighborhood_text = clean_text(self._call_routed("neighborhood", prompt, max_tokens=200))
+        return f'<section id="neighborhood"><p>{escape_text(neighborhood_text)}</p></section>'
     
-    def generate_call_to_action(self, data: Dict[str, Any]) -> str:
+    def generate_call_to_action(self, listing: ListingView) -> str:
         """Generate call to action using OpenAI."""
-        prompt = get_cta_prompt(data, data.get('language', 'en'))
-        cta_text = self._call_openai(prompt, max_tokens=50)
-        return f'<p class="call-to-action">{cta_text}</p>' 
\ No newline at end of file
+        prompt = get_cta_prompt(listing)
+        cta_text = clean_text(self._call_routed("call_to_action", prompt, max_tokens=50))
+        return f'<p class="call-to-action">{escape_text(cta_text)}</p>' 
+    
+    def generate_translation(self, prompt: str, max_tokens: int) -> str:
+        """Raw answer to a translation prompt (see app/llm/translation.py) using OpenAI."""
+        return self._call_openai("translation", prompt, max_tokens=max_tokens)
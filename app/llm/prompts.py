@@ -1,20 +1,23 @@
-from typing import Dict, Any
+import json
+from typing import Sequence
+from ..listing import ListingView
 
-def get_title_prompt(data: Dict[str, Any], language: str) -> str:
+# Language names used in translation prompts
+LANGUAGE_NAMES = {"en": "English", "pt": "European Portuguese", "es": "Spanish (Spain)"}
+
+def get_title_prompt(listing: ListingView) -> str:
     """Generate prompt for title generation."""
-    location = data['location']
-    features = data['features']
-    listing_type = data['listing_type']
+    language = listing.language
 
     if language == "pt":
         return f"""
 Gera um título SEO optimizado (máximo 60 caracteres) para um anúncio imobiliário com os seguintes dados:
-- Tipo: T{features.get('bedrooms', '')} apartamento
-- Localização: {location['neighborhood']}, {location['city']}
-- Tipo de anúncio: {'venda' if listing_type == 'sale' else 'arrendamento'}
+- Tipo: {listing.bedroom_phrase} apartamento
+- Localização: {listing.neighborhood}, {listing.city}
+- Tipo de anúncio: {listing.action}
 
 O título deve:
-- Incluir keywords como "T{features.get('bedrooms', '')}", "{location['city']}", "{location['neighborhood']}"
+- Incluir keywords como "{listing.bedroom_phrase}", "{listing.city}", "{listing.neighborhood}"
 - Ser atrativo e claro
 - Ter máximo 60 caracteres
 - Ser em português de Portugal
@@ -24,12 +27,12 @@ Responde apenas com o título, sem explicações.
     elif language == "es":
         return f"""
 Genera un título SEO optimizado (máximo 60 caracteres) para un anuncio inmobiliario con los siguientes datos:
-- Tipo: apartamento de {features.get('bedrooms', '')} habitaciones
-- Ubicación: {location['neighborhood']}, {location['city']}
-- Tipo de anuncio: {'venta' if listing_type == 'sale' else 'alquiler'}
+- Tipo: apartamento de {listing.bedroom_phrase}
+- Ubicación: {listing.neighborhood}, {listing.city}
+- Tipo de anuncio: {listing.action}
 
 El título debe:
-- Incluir palabras clave como "{features.get('bedrooms', '')} habitaciones", "{location['city']}", "{location['neighborhood']}"
+- Incluir palabras clave como "{listing.bedroom_phrase}", "{listing.city}", "{listing.neighborhood}"
 - Ser atractivo y claro
 - Tener máximo 60 caracteres
 - Estar en español
@@ -39,12 +42,12 @@ Responde solo con el título, sin explicaciones.
     else:
         return f"""
 Generate an SEO-optimized title (maximum 60 characters) for a real estate listing with the following data:
-- Type: {features.get('bedrooms', '')}-bedroom apartment
-- Location: {location['neighborhood']}, {location['city']}
-- Listing type: {'sale' if listing_type == 'sale' else 'rent'}
+- Type: {listing.bedroom_phrase} apartment
+- Location: {listing.neighborhood}, {listing.city}
+- Listing type: {listing.action}
 
 The title should:
-- Include keywords like "apartment", "{location['city']}", "{location['neighborhood']}"
+- Include keywords like "apartment", "{listing.city}", "{listing.neighborhood}"
 - Be attractive and clear
 - Have maximum 60 characters
 - Be in English
@@ -52,31 +55,22 @@ The title should:
 Respond only with the title, no explanations.
 """
 
-def get_meta_description_prompt(data: Dict[str, Any], language: str) -> str:
+def get_meta_description_prompt(listing: ListingView) -> str:
     """Generate prompt for meta description generation."""
-    location = data['location']
-    features = data['features']
-    listing_type = data['listing_type']
-
-    highlights = []
-    if features.get('balcony'):
-        highlights.append("varanda" if language == "pt" else "balcón" if language == "es" else "balcony")
-    if features.get('elevator'):
-        highlights.append("elevador" if language == "pt" else "ascensor" if language == "es" else "elevator")
-    if features.get('parking'):
-        highlights.append("estacionamento" if language == "pt" else "aparcamiento" if language == "es" else "parking")
+    language = listing.language
+    highlights = listing.amenities
 
     if language == "pt":
         return f"""
 Gera uma meta descrição SEO (máximo 155 caracteres) para um anúncio imobiliário:
-- Apartamento T{features.get('bedrooms', '')} em {location['city']}
-- Localização: {location['neighborhood']}
+- Apartamento {listing.bedroom_phrase} em {listing.city}
+- Localização: {listing.neighborhood}
 - Características: {', '.join(highlights[:3]) if highlights else 'apartamento espaçoso'}
-- Área: {features.get('area_sqm', '')} m²
+- Área: {listing.area_sqm} m²
 
 A descrição deve:
 - Ser atrativa para motores de busca
-- Incluir "apartamento T{features.get('bedrooms', '')}", "{location['city']}", "{location['neighborhood']}"
+- Incluir "apartamento {listing.bedroom_phrase}", "{listing.city}", "{listing.neighborhood}"
 - Ter máximo 155 caracteres
 - Terminar com algo como "Ideal para famílias"
 - Ser em português de Portugal
@@ -86,14 +80,14 @@ Responde apenas com a meta descrição, sem explicações.
     elif language == "es":
         return f"""
 Genera una meta descripción SEO (máximo 155 caracteres) para un anuncio inmobiliario:
-- Apartamento de {features.get('bedrooms', '')} habitaciones en {location['city']}
-- Ubicación: {location['neighborhood']}
+- Apartamento de {listing.bedroom_phrase} en {listing.city}
+- Ubicación: {listing.neighborhood}
 - Características: {', '.join(highlights[:3]) if highlights else 'apartamento espacioso'}
-- Superficie: {features.get('area_sqm', '')} m²
+- Superficie: {listing.area_sqm} m²
 
 La descripción debe:
 - Ser atractiva para buscadores
-- Incluir "apartamento de {features.get('bedrooms', '')} habitaciones", "{location['city']}", "{location['neighborhood']}"
+- Incluir "apartamento de {listing.bedroom_phrase}", "{listing.city}", "{listing.neighborhood}"
 - Tener máximo 155 caracteres
 - Terminar con algo como "Ideal para familias"
 - Estar en español
@@ -103,14 +97,14 @@ Responde solo con la meta descripción, sin explicaciones.
     else:
         return f"""
 Generate an SEO meta description (maximum 155 characters) for a real estate listing:
-- {features.get('bedrooms', '')}-bedroom apartment in {location['city']}
-- Location: {location['neighborhood']}
+- {listing.bedroom_phrase} apartment in {listing.city}
+- Location: {listing.neighborhood}
 - Features: {', '.join(highlights[:3]) if highlights else 'spacious apartment'}
-- Area: {features.get('area_sqm', '')} sqm
+- Area: {listing.area_sqm} sqm
 
 The description should:
 - Be attractive for search engines
-- Include "{features.get('bedrooms', '')}-bedroom apartment", "{location['city']}", "{location['neighborhood']}"
+- Include "{listing.bedroom_phrase} apartment", "{listing.city}", "{listing.neighborhood}"
 - Have maximum 155 characters
 - End with something like "Ideal for families"
 - Be in English
@@ -118,34 +112,31 @@ The description should:
 Respond only with the meta description, no explanations.
 """
 
-def get_description_prompt(data: Dict[str, Any], language: str) -> str:
+def get_description_prompt(listing: ListingView) -> str:
     """Generate prompt for full property description."""
-    location = data['location']
-    features = data['features']
-    price = data['price']
-    listing_type = data['listing_type']
+    language = listing.language
 
     if language == "pt":
         return f"""
 Escreve uma descrição completa e atrativa (500-700 caracteres) para um apartamento:
 
 DADOS DO IMÓVEL:
-- Tipo: T{features.get('bedrooms', '')} apartamento
-- Localização: {location['neighborhood']}, {location['city']}
-- Área: {features.get('area_sqm', '')} m²
-- Quartos: {features.get('bedrooms', '')}
-- Casas de banho: {features.get('bathrooms', '')}
-- Andar: {features.get('floor', 'N/A')}
-- Ano de construção: {features.get('year_built', 'N/A')}
-- Varanda: {'Sim' if features.get('balcony') else 'Não'}
-- Elevador: {'Sim' if features.get('elevator') else 'Não'}
-- Estacionamento: {'Sim' if features.get('parking') else 'Não'}
-- Preço: €{price:,.0f}
-- Tipo: {'Venda' if listing_type == 'sale' else 'Arrendamento'}
+- Tipo: {listing.bedroom_phrase} apartamento
+- Localização: {listing.neighborhood}, {listing.city}
+- Área: {listing.area_sqm} m²
+- Quartos: {listing.bedrooms}
+- Casas de banho: {listing.bathrooms}
+- Andar: {listing.floor}
+- Ano de construção: {listing.year_built}
+- Varanda: {'Sim' if listing.balcony else 'Não'}
+- Elevador: {'Sim' if listing.elevator else 'Não'}
+- Estacionamento: {'Sim' if listing.parking else 'Não'}
+- Preço: €{listing.price:,.0f}
+- Tipo: {listing.action.capitalize()}
 
 A descrição deve:
 - Ser envolvente e persuasiva
-- Incluir keywords SEO naturalmente: "apartamento T{features.get('bedrooms', '')}", "{location['city']}", "{location['neighborhood']}", "imobiliário em Portugal"
+- Incluir keywords SEO naturalmente: "apartamento {listing.bedroom_phrase}", "{listing.city}", "{listing.neighborhood}", "imobiliário em Portugal"
 - Mencionar as características mais atrativas
 - Ter entre 500-700 caracteres
 - Terminar com uma frase sobre a localização ou oportunidade
@@ -158,22 +149,22 @@ Responde apenas com a descrição, sem explicações.
 Escribe una descripción completa y atractiva (500-700 caracteres) para un apartamento:
 
 DATOS DE LA PROPIEDAD:
-- Tipo: apartamento de {features.get('bedrooms', '')} habitaciones
-- Ubicación: {location['neighborhood']}, {location['city']}
-- Superficie: {features.get('area_sqm', '')} m²
-- Habitaciones: {features.get('bedrooms', '')}
-- Baños: {features.get('bathrooms', '')}
-- Planta: {features.get('floor', 'N/A')}
-- Año de construcción: {features.get('year_built', 'N/A')}
-- Balcón: {'Sí' if features.get('balcony') else 'No'}
-- Ascensor: {'Sí' if features.get('elevator') else 'No'}
-- Aparcamiento: {'Sí' if features.get('parking') else 'No'}
-- Precio: €{price:,.0f}
-- Tipo: {'Venta' if listing_type == 'sale' else 'Alquiler'}
+- Tipo: apartamento de {listing.bedroom_phrase}
+- Ubicación: {listing.neighborhood}, {listing.city}
+- Superficie: {listing.area_sqm} m²
+- Habitaciones: {listing.bedrooms}
+- Baños: {listing.bathrooms}
+- Planta: {listing.floor}
+- Año de construcción: {listing.year_built}
+- Balcón: {'Sí' if listing.balcony else 'No'}
+- Ascensor: {'Sí' if listing.elevator else 'No'}
+- Aparcamiento: {'Sí' if listing.parking else 'No'}
+- Precio: €{listing.price:,.0f}
+- Tipo: {listing.action.capitalize()}
 
 La descripción debe:
 - Ser envolvente y persuasiva
-- Incluir palabras clave SEO naturalmente: "apartamento de {features.get('bedrooms', '')} habitaciones", "{location['city']}", "{location['neighborhood']}", "inmobiliaria en España"
+- Incluir palabras clave SEO naturalmente: "apartamento de {listing.bedroom_phrase}", "{listing.city}", "{listing.neighborhood}", "inmobiliaria en España"
 - Mencionar las características más atractivas
 - Tener entre 500-700 caracteres
 - Terminar con una frase sobre la ubicación u oportunidad
@@ -186,22 +177,22 @@ Responde solo con la descripción, sin explicaciones.
 Write a complete and attractive description (500-700 characters) for an apartment:
 
 PROPERTY DATA:
-- Type: {features.get('bedrooms', '')}-bedroom apartment
-- Location: {location['neighborhood']}, {location['city']}
-- Area: {features.get('area_sqm', '')} sqm
-- Bedrooms: {features.get('bedrooms', '')}
-- Bathrooms: {features.get('bathrooms', '')}
-- Floor: {features.get('floor', 'N/A')}
-- Year built: {features.get('year_built', 'N/A')}
-- Balcony: {'Yes' if features.get('balcony') else 'No'}
-- Elevator: {'Yes' if features.get('elevator') else 'No'}
-- Parking: {'Yes' if features.get('parking') else 'No'}
-- Price: €{price:,.0f}
-- Type: {'Sale' if listing_type == 'sale' else 'Rent'}
+- Type: {listing.bedroom_phrase} apartment
+- Location: {listing.neighborhood}, {listing.city}
+- Area: {listing.area_sqm} sqm
+- Bedrooms: {listing.bedrooms}
+- Bathrooms: {listing.bathrooms}
+- Floor: {listing.floor}
+- Year built: {listing.year_built}
+- Balcony: {'Yes' if listing.balcony else 'No'}
+- Elevator: {'Yes' if listing.elevator else 'No'}
+- Parking: {'Yes' if listing.parking else 'No'}
+- Price: €{listing.price:,.0f}
+- Type: {listing.action.capitalize()}
 
 The description should:
 - Be engaging and persuasive
-- Include SEO keywords naturally: "{features.get('bedrooms', '')}-bedroom apartment", "{location['city']}", "{location['neighborhood']}", "real estate in Portugal"
+- Include SEO keywords naturally: "{listing.bedroom_phrase} apartment", "{listing.city}", "{listing.neighborhood}", "real estate in Portugal"
 - Mention the most attractive features
 - Be between 500-700 characters
 - End with a sentence about the location or opportunity
@@ -210,19 +201,19 @@ The description should:
 Respond only with the description, no explanations.
 """
 
-def get_neighborhood_prompt(data: Dict[str, Any], language: str) -> str:
+def get_neighborhood_prompt(listing: ListingView) -> str:
     """Generate prompt for neighborhood description."""
-    location = data['location']
+    language = listing.language
 
     if language == "pt":
         return f"""
-Escreve uma descrição atrativa do bairro {location['neighborhood']} em {location['city']} (aproximadamente 200-300 caracteres):
+Escreve uma descrição atrativa do bairro {listing.neighborhood} em {listing.city} (aproximadamente 200-300 caracteres):
 
 A descrição deve:
 - Destacar as características únicas do bairro
 - Mencionar comodidades, transporte, ou atrações próximas
 - Ser atrativa para potenciais compradores/inquilinos
-- Incluir "{location['neighborhood']}" e "{location['city']}" naturalmente
+- Incluir "{listing.neighborhood}" e "{listing.city}" naturalmente
 - Ser em português de Portugal
 
 Se não conheceres detalhes específicos do bairro, cria uma descrição genérica mas atrativa sobre a zona.
@@ -231,13 +222,13 @@ Responde apenas com a descrição, sem explicações.
 """
     elif language == "es":
         return f"""
-Escribe una descripción atractiva del barrio {location['neighborhood']} en {location['city']} (aproximadamente 200-300 caracteres):
+Escribe una descripción atractiva del barrio {listing.neighborhood} en {listing.city} (aproximadamente 200-300 caracteres):
 
 La descripción debe:
 - Resaltar las características únicas del barrio
 - Mencionar servicios, transporte o atracciones cercanas
 - Ser atractiva para compradores o inquilinos potenciales
-- Incluir "{location['neighborhood']}" y "{location['city']}" naturalmente
+- Incluir "{listing.neighborhood}" y "{listing.city}" naturalmente
 - Estar en español
 
 Si no conoces detalles específicos del barrio, crea una descripción genérica pero atractiva sobre la zona.
@@ -246,13 +237,13 @@ Responde solo con la descripción, sin explicaciones.
 """
     else:
         return f"""
-Write an attractive description of the {location['neighborhood']} neighborhood in {location['city']} (approximately 200-300 characters):
+Write an attractive description of the {listing.neighborhood} neighborhood in {listing.city} (approximately 200-300 characters):
 
 The description should:
 - Highlight unique characteristics of the neighborhood
 - Mention amenities, transport, or nearby attractions
 - Be attractive to potential buyers/renters
-- Include "{location['neighborhood']}" and "{location['city']}" naturally
+- Include "{listing.neighborhood}" and "{listing.city}" naturally
 - Be in English
 
 If you don't know specific details about the neighborhood, create a generic but attractive description of the area.
@@ -260,21 +251,20 @@ If you don't know specific details about the neighborhood, create a generic but
 Respond only with the description, no explanations.
 """
 
-def get_cta_prompt(data: Dict[str, Any], language: str) -> str:
+def get_cta_prompt(listing: ListingView) -> str:
     """Generate prompt for call-to-action."""
-    location = data['location']
-    listing_type = data['listing_type']
+    language = listing.language
 
     if language == "pt":
         return f"""
-Escreve uma chamada para ação (call-to-action) persuasiva para um anúncio imobiliário em {location['city']}:
+Escreve uma chamada para ação (call-to-action) persuasiva para um anúncio imobiliário em {listing.city}:
 
-Tipo de anúncio: {'Venda' if listing_type == 'sale' else 'Arrendamento'}
+Tipo de anúncio: {listing.action.capitalize()}
 
 A chamada deve:
 - Ser urgente e persuasiva
 - Incentivar o contacto ou visita
-- Mencionar "{location['city']}"
+- Mencionar "{listing.city}"
 - Ter aproximadamente 50-80 caracteres
 - Ser em português de Portugal
 
@@ -282,14 +272,14 @@ Responde apenas com a chamada para ação, sem explicações.
 """
     elif language == "es":
         return f"""
-Escribe una llamada a la acción (call-to-action) persuasiva para un anuncio inmobiliario en {location['city']}:
+Escribe una llamada a la acción (call-to-action) persuasiva para un anuncio inmobiliario en {listing.city}:
 
-Tipo de anuncio: {'Venta' if listing_type == 'sale' else 'Alquiler'}
+Tipo de anuncio: {listing.action.capitalize()}
 
 La llamada debe:
 - Ser urgente y persuasiva
 - Invitar a contactar o visitar
-- Mencionar "{location['city']}"
+- Mencionar "{listing.city}"
 - Tener aproximadamente 50-80 caracteres
 - Estar en español
 
@@ -297,16 +287,61 @@ Responde solo con la llamada a la acción, sin explicaciones.
 """
     else:
         return f"""
-Write a persuasive call-to-action for a real estate listing in {location['city']}:
+Write a persuasive call-to-action for a real estate listing in {listing.city}:
 
-Listing type: {'Sale' if listing_type == 'sale' else 'Rent'}
+Listing type: {listing.action.capitalize()}
 
 The call-to-action should:
 - Be urgent and persuasive
 - Encourage contact or viewing
-- Mention "{location['city']}"
+- Mention "{listing.city}"
 - Be approximately 50-80 characters
 - Be in English
 
 Respond only with the call-to-action, no explanations.
 """
+
+def get_shorten_prompt(text: str, max_chars: int, language: str) -> str:
+    """Generate prompt to rewrite an over-length section within its character limit."""
+    if language == "pt":
+        return f"""
+Reescreve o seguinte texto com no máximo {max_chars} caracteres, mantendo o significado e as palavras-chave (localização, tipologia).
+
+Texto: {text}
+
+Responde apenas com o texto reescrito, sem aspas nem explicações.
+"""
+    elif language == "es":
+        return f"""
+Reescribe el siguiente texto con un máximo de {max_chars} caracteres, manteniendo el significado y las palabras clave (ubicación, tipo de vivienda).
+
+Texto: {text}
+
+Responde solo con el texto reescrito, sin comillas ni explicaciones.
+"""
+    else:
+        return f"""
+Rewrite the following text in at most {max_chars} characters, keeping its meaning and keywords (location, property type).
+
+Text: {text}
+
+Respond only with the rewritten text, no quotes or explanations.
+"""
+
+def get_translation_prompt(segments: Sequence[str], source: str, targets: Sequence[str]) -> str:
+    """Generate prompt to translate all texts of a page into several languages in one call."""
+    names = ", ".join(f"{language} ({LANGUAGE_NAMES.get(language, language)})" for language in targets)
+    example = json.dumps({language: ["..."] for language in targets})
+    return f"""
+Translate the texts of a real estate listing page from {LANGUAGE_NAMES.get(source, source)} into each of these languages: {names}.
+
+Source texts (JSON array of {len(segments)} strings):
+{json.dumps(list(segments), ensure_ascii=False)}
+
+Rules:
+- Keep place names, numbers and the meaning of every text; write natural, SEO-friendly real estate copy
+- Use the price and number formats and property terms of each language (e.g. "T3" in Portuguese)
+- Translate each string on its own and keep the order; do not merge or split strings
+
+Respond only with a JSON object mapping each language code to an array of exactly {len(segments)} translated strings, e.g. {example}
+"""
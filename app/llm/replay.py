@@ -0,0 +1,328 @@
+"""
+Recorded LLM calls ("cassettes") for benchmarks, regression tests and
+offline load replays.
+
+With LLM_REPLAY=record every call an LLM backend answers is appended to
+LLM_REPLAY_FILE: prompt, answer, latency, token usage and start time. A path
+ending in ".gz" is written gzip-compressed (prompts are mostly shared
+wording and compress to a fraction of their size); each call is flushed as it
+is recorded, so the file stays readable while the server runs.
+
+With LLM_REPLAY=replay the answers are served from that file and the backend
+is never called, so a benchmark or regression check runs against fixed
+outputs, offline. Replayed calls still take a slot of the backend's
+scheduler and wait for their recorded latency times
+LLM_REPLAY_LATENCY_SCALE (0, the default, answers at once; 1 reproduces the
+recorded latencies; 0.5 a backend twice as fast), and their latency and
+tokens are accounted as if the backend had answered. Replaying recorded
+production traffic against a new version therefore reproduces its LLM load
+shape on a laptop with no network.
+
+Calls are keyed by backend, model, section, sampling parameters and output
+budget, and then by prompt or, failing that, by the listing they were made
+for (see use_subject): a call whose prompt is unchanged replays its own
+answer; after a prompt change, the answer recorded for the same listing and
+section is served instead and counted as result="prompt_changed". A call
+recorded several times (non-deterministic sampling) replays its answers in
+recorded order, cycling. Record with the deterministic sampling profile to
+capture what the model answers reproducibly.
+
+A call missing from the cassette raises ReplayMiss and is counted as
+llm_replay_calls_total{result="miss"}. By default it fails like a backend
+error and the page falls back to templates; with LLM_REPLAY_STRICT the miss
+fails the request instead.
+
+While recording, the server also appends every /generate,
+/generate/batch and /generate/multilingual request to the cassette, with
+its arrival time, query parameters, tenant and body (see record_request).
+`python -m benchmarks.replay <file>` re-issues them at their recorded pace,
+scaled, against the app and reports misses and fallbacks.
+
+`python -m app.llm.replay <file>` summarises a cassette: calls, time span,
+throughput and concurrency, and latency and tokens per backend, model and
+section.
+"""
+
+import argparse
+import atexit
+import gzip
+import hashlib
+import json
+import os
+import sys
+import threading
+import time
+import zlib
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, IO, Iterator, List, Optional, Tuple
+from ..config import settings
+from ..listing import ListingView
+from ..metrics import LLM_REPLAY_CALLS
+from .routing import account_call
+from .sampling import SamplingProfile
+
+# (prompt key, subject key or None)
+CallKey = Tuple[str, Optional[str]]
+
+# Input fields of a listing view; the derived ones follow from them
+_SUBJECT_FIELDS = ("language", "city", "neighborhood", "listing_type", "price", "bedrooms", "bathrooms",
+                   "area_sqm", "balcony", "parking", "elevator", "floor", "year_built")
+
+_subject: ContextVar[Optional[Tuple[ListingView, Tuple[str, ...]]]] = ContextVar("llm_replay_subject", default=None)
+
+
+class ReplayMiss(Exception):
+    """An LLM call that is not in the cassette being replayed."""
+
+
+@contextmanager
+def use_subject(listing: ListingView, *extra: str) -> Iterator[None]:
+    """Key the LLM calls of the enclosed code by this listing (and `extra`), so they replay across prompt changes."""
+    token = _subject.set((listing, extra))
+    try:
+        yield
+    finally:
+        _subject.reset(token)
+
+
+def _digest(parts: List[Any]) -> str:
+    return hashlib.sha256(json.dumps(parts, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+
+def call_key(backend: str, model: str, section: str, sampling: SamplingProfile, prompt: str,
+             max_tokens: Optional[int] = None, max_chars: Optional[int] = None) -> CallKey:
+    """Stable identifiers of an LLM call: by prompt, and by subject when one is set (see use_subject)."""
+    parts = [backend, model, section, sampling.signature, max_tokens, max_chars]
+    subject = _subject.get()
+    subject_key = None
+    if subject is not None:
+        listing, extra = subject
+        subject_key = _digest(parts + [[getattr(listing, name) for name in _SUBJECT_FIELDS], list(extra)])
+    return _digest(parts + [prompt]), subject_key
+
+
+def _open(path: str, mode: str) -> IO[str]:
+    if path.endswith(".gz"):
+        return gzip.open(path, mode + "t", encoding="utf-8")
+    return open(path, mode, encoding="utf-8")
+
+
+def _is_call(entry: Any) -> bool:
+    return isinstance(entry, dict) and isinstance(entry.get("key"), str) and isinstance(entry.get("text"), str)
+
+
+def _is_request(entry: Any) -> bool:
+    return (isinstance(entry, dict) and isinstance(entry.get("request"), str) and isinstance(entry.get("body"), str)
+            and isinstance(entry.get("ts"), (int, float)))
+
+
+def _read_entries(path: str) -> Iterator[Dict[str, Any]]:
+    """Recorded calls and requests in order; malformed lines and an unfinished gzip tail are skipped with a warning."""
+    with _open(path, "r") as f:
+        number = 0
+        try:
+            for number, line in enumerate(f, 1):
+                if not line.strip():
+                    continue
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    entry = None
+                if not (_is_call(entry) or _is_request(entry)):
+                    print(f"Warning: skipping malformed line {number} of {path}")
+                    continue
+                yield entry
+        except (EOFError, zlib.error):
+            # A cassette still being written (or cut off) has no gzip trailer yet
+            print(f"Warning: {path} ends after line {number} without a complete gzip trailer")
+
+
+def read_cassette(path: str) -> Iterator[Dict[str, Any]]:
+    """Recorded LLM calls in order."""
+    return (entry for entry in _read_entries(path) if _is_call(entry))
+
+
+def read_requests(path: str) -> Iterator[Dict[str, Any]]:
+    """Recorded requests in order of arrival."""
+    return (entry for entry in _read_entries(path) if _is_request(entry))
+
+
+class Recording:
+    """A cassette: recorded calls by key, loaded from (replay) or appended to (record) one file."""
+
+    def __init__(self, path: str, mode: str):
+        self.path = path
+        self.mode = mode
+        self._calls: Dict[str, List[Dict[str, Any]]] = {}
+        self._next: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._file: Optional[IO[str]] = None
+        if mode == "replay":
+            self._load()
+
+    def _load(self) -> None:
+        if not os.path.exists(self.path):
+            print(f"Warning: LLM_REPLAY is 'replay' but {self.path} does not exist; every call will miss")
+            return
+        for entry in read_cassette(self.path):
+            self._calls.setdefault(entry["key"], []).append(entry)
+            if isinstance(entry.get("subject_key"), str):
+                self._calls.setdefault(entry["subject_key"], []).append(entry)
+
+    @property
+    def replaying(self) -> bool:
+        return self.mode == "replay"
+
+    def answer(self, backend: str, key: CallKey, model: str, section: str, prompt: str) -> str:
+        """
+        The recorded answer of a call, after its recorded latency times
+        LLM_REPLAY_LATENCY_SCALE; raises ReplayMiss when the call was not
+        recorded, by prompt or by subject.
+        """
+        prompt_key, subject_key = key
+        call, result = None, "hit"
+        with self._lock:
+            for candidate in (prompt_key, subject_key):
+                calls = self._calls.get(candidate) if candidate is not None else None
+                if calls:
+                    position = self._next.get(candidate, 0)
+                    self._next[candidate] = (position + 1) % len(calls)
+                    call = calls[position]
+                    break
+                result = "prompt_changed"
+        if call is None:
+            LLM_REPLAY_CALLS.inc(backend, "miss")
+            raise ReplayMiss(f"No recorded {backend} answer for section '{section}' in {self.path}")
+        started = time.perf_counter()
+        delay = float(call.get("seconds") or 0.0) * settings.LLM_REPLAY_LATENCY_SCALE
+        if delay > 0:
+            time.sleep(delay)
+        LLM_REPLAY_CALLS.inc(backend, result)
+        account_call(backend, model, section, time.perf_counter() - started, prompt, call["text"],
+                     call.get("prompt_tokens"), call.get("completion_tokens"))
+        return call["text"]
+
+    def record(self, backend: str, key: CallKey, model: str, section: str, prompt: str, text: str, seconds: float,
+               prompt_tokens: Optional[int] = None, completion_tokens: Optional[int] = None) -> None:
+        """Append a live call to the cassette."""
+        prompt_key, subject_key = key
+        entry = {
+            "key": prompt_key, "subject_key": subject_key, "backend": backend, "model": model, "section": section,
+            # Start time and latency in milliseconds resolution are plenty for load shapes
+            "ts": round(time.time() - seconds, 3), "seconds": round(seconds, 4),
+            "prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+            "prompt": prompt, "text": text,
+        }
+        self._append(entry)
+        LLM_REPLAY_CALLS.inc(backend, "recorded")
+
+    def record_request(self, path: str, params: Dict[str, Any], tenant: str, body: str) -> None:
+        """Append an arriving request to the cassette (see python -m benchmarks.replay)."""
+        self._append({"request": path, "ts": round(time.time(), 3), "params": params, "tenant": tenant, "body": body})
+
+    def _append(self, entry: Dict[str, Any]) -> None:
+        line = json.dumps(entry, ensure_ascii=False, separators=(",", ":"))
+        with self._lock:
+            if self._file is None:
+                self._file = _open(self.path, "a")
+                atexit.register(self.close)
+            self._file.write(line + "\n")
+            # For gzip this is a sync flush: the cassette stays readable up to here while recording continues
+            self._file.flush()
+
+    def close(self) -> None:
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    def __len__(self) -> int:
+        return len({id(call) for calls in self._calls.values() for call in calls})
+
+
+_recording: Optional[Recording] = None
+_recording_lock = threading.Lock()
+
+
+def get_recording() -> Optional[Recording]:
+    """The process-wide cassette when LLM_REPLAY is "record" or "replay", else None."""
+    global _recording
+    if settings.LLM_REPLAY not in ("record", "replay"):
+        return None
+    with _recording_lock:
+        if _recording is None or (_recording.path, _recording.mode) != (settings.LLM_REPLAY_FILE, settings.LLM_REPLAY):
+            if _recording is not None:
+                _recording.close()
+            _recording = Recording(settings.LLM_REPLAY_FILE, settings.LLM_REPLAY)
+        return _recording
+
+
+def record_request(path: str, params: Dict[str, Any], tenant: str, body: Callable[[], str]) -> None:
+    """Append an arriving request to the cassette when LLM_REPLAY=record; `body` is only called then."""
+    recording = get_recording()
+    if recording is not None and not recording.replaying:
+        recording.record_request(path, {name: value for name, value in params.items() if value is not None}, tenant, body())
+
+
+def _percentile(values: List[float], share: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(share * len(ordered)))]
+
+
+def summarize(path: str) -> Dict[str, Any]:
+    """Requests, calls, time span, throughput, peak concurrency and per-route latency and tokens of a cassette."""
+    entries = list(_read_entries(path))
+    calls = [entry for entry in entries if _is_call(entry)]
+    routes: Dict[str, Dict[str, Any]] = {}
+    events = []
+    for call in calls:
+        seconds = float(call.get("seconds") or 0.0)
+        route = routes.setdefault(f"{call.get('backend')}/{call.get('model')}/{call.get('section')}",
+                                  {"calls": 0, "latencies": [], "prompt_tokens": 0, "completion_tokens": 0})
+        route["calls"] += 1
+        route["latencies"].append(seconds)
+        route["prompt_tokens"] += call.get("prompt_tokens") or 0
+        route["completion_tokens"] += call.get("completion_tokens") or 0
+        if call.get("ts") is not None:
+            events += [(call["ts"], 1), (call["ts"] + seconds, -1)]
+    # Concurrency over time: +1 at each call start, -1 at its end (ends first on ties)
+    concurrent = peak = 0
+    for _, change in sorted(events, key=lambda event: (event[0], event[1])):
+        concurrent += change
+        peak = max(peak, concurrent)
+    starts = [ts for ts, change in events if change == 1]
+    span_seconds = max(ts for ts, _ in events) - min(starts) if starts else 0.0
+    per_second: Dict[int, int] = {}
+    for ts in starts:
+        per_second[int(ts)] = per_second.get(int(ts), 0) + 1
+    return {
+        "requests": sum(1 for entry in entries if _is_request(entry)),
+        "calls": len(calls),
+        "span_seconds": round(span_seconds, 3),
+        "calls_per_second": round(len(starts) / span_seconds, 2) if span_seconds else None,
+        "peak_calls_per_second": max(per_second.values(), default=0),
+        "peak_concurrency": peak,
+        "routes": {
+            name: {
+                "calls": route["calls"],
+                "p50_ms": round(_percentile(route["latencies"], 0.5) * 1000, 1),
+                "p95_ms": round(_percentile(route["latencies"], 0.95) * 1000, 1),
+                "prompt_tokens": route["prompt_tokens"],
+                "completion_tokens": route["completion_tokens"],
+            }
+            for name, route in sorted(routes.items())
+        },
+    }
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Summarise a cassette of recorded LLM calls (LLM_REPLAY=record).")
+    parser.add_argument("cassette", nargs="?", default=settings.LLM_REPLAY_FILE, help="JSON Lines file, optionally .gz")
+    args = parser.parse_args(argv)
+    json.dump(summarize(args.cassette), sys.stdout, indent=2)
+    print()
+
+
+if __name__ == "__main__":
+    main()
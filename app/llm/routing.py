@@ -0,0 +1,144 @@
+"""
+Model routing per section for the LLM backends.
+
+The seven sections are not equally hard: a title, H1 or call-to-action is a
+short, formulaic answer a small model writes as well as a large one, while
+the 500-700 character description benefits from a stronger model. Each
+backend reads these settings (shown for OpenAI; OLLAMA_* work the same way):
+
+- OPENAI_SECTION_MODELS: "section=model,..." (unlisted sections use OPENAI_MODEL)
+- OPENAI_SAMPLING_PROFILE and OPENAI_SECTION_PROFILES: sampling profile of
+  every section and per section (see sampling.py)
+- OPENAI_SECTION_TEMPERATURES: "section=temperature,..." (default: the profile's)
+- OPENAI_ESCALATION_MODEL: model a section is asked again with when the
+  routed model's answer fails validation (empty, or over the section's
+  character limit); empty disables escalation
+
+Every call is accounted per backend, model and section: tokens as reported by
+the API (or estimated from the text when a stream was cut off) and latency,
+so /metrics shows what each route costs.
+"""
+
+from typing import Any, Callable, Dict, Optional
+from ..config import settings
+from ..metrics import LLM_CALL_LATENCY, LLM_TOKENS
+from .sampling import DEFAULT_PROFILE, SamplingProfile, get_profile, profile_name
+from .sanitize import clean_lines, clean_text
+
+# Sections that can be routed: the 7 page sections plus batched translation
+ROUTABLE = ("title", "meta_description", "h1", "description", "key_features", "neighborhood", "call_to_action",
+            "translation")
+
+
+class SectionRoute:
+    """Model and sampling profile for one section, and the model to escalate to."""
+
+    __slots__ = ("model", "sampling", "escalation")
+
+    def __init__(self, model: str, sampling: SamplingProfile, escalation: str = ""):
+        self.model = model
+        self.sampling = sampling
+        # Only a different model is worth asking again
+        self.escalation = escalation if escalation != model else ""
+
+    def __repr__(self) -> str:
+        return f"SectionRoute({self.model}, {self.sampling}, escalation={self.escalation or None})"
+
+
+def _parse_map(spec: str, name: str, cast: Callable[[str], Any]) -> Dict[str, Any]:
+    """Parse "section=value,..."; unknown sections and malformed entries are skipped with a warning."""
+    values = {}
+    for entry in spec.split(","):
+        if not entry.strip():
+            continue
+        section, _, value = entry.partition("=")
+        section, value = section.strip(), value.strip()
+        if section not in ROUTABLE or not value:
+            print(f"Warning: ignoring {name} entry '{entry.strip()}'")
+            continue
+        try:
+            values[section] = cast(value)
+        except ValueError:
+            print(f"Warning: ignoring {name} entry '{entry.strip()}'")
+    return values
+
+
+def _backend_settings(backend: str) -> Dict[str, str]:
+    prefix = backend.upper()
+    return {
+        "model": getattr(settings, f"{prefix}_MODEL"),
+        "models": getattr(settings, f"{prefix}_SECTION_MODELS"),
+        "temperatures": getattr(settings, f"{prefix}_SECTION_TEMPERATURES"),
+        "escalation": getattr(settings, f"{prefix}_ESCALATION_MODEL"),
+        "profile": getattr(settings, f"{prefix}_SAMPLING_PROFILE"),
+        "profiles": getattr(settings, f"{prefix}_SECTION_PROFILES"),
+    }
+
+
+def _default_profile(backend: str, name: str) -> str:
+    try:
+        return profile_name(name)
+    except ValueError:
+        print(f"Warning: unknown {backend.upper()}_SAMPLING_PROFILE '{name}', using '{DEFAULT_PROFILE}'")
+        return DEFAULT_PROFILE
+
+
+def section_routes(backend: str) -> Dict[str, SectionRoute]:
+    """Route of every routable section for a backend ("openai" or "ollama"), from the current settings."""
+    config = _backend_settings(backend)
+    models = _parse_map(config["models"], f"{backend.upper()}_SECTION_MODELS", str)
+    temperatures = _parse_map(config["temperatures"], f"{backend.upper()}_SECTION_TEMPERATURES", float)
+    profiles = _parse_map(config["profiles"], f"{backend.upper()}_SECTION_PROFILES", profile_name)
+    default = _default_profile(backend, config["profile"])
+    routes = {}
+    for section in ROUTABLE:
+        sampling = get_profile(profiles.get(section, default))
+        if section in temperatures:
+            sampling = sampling.with_temperature(temperatures[section])
+        routes[section] = SectionRoute(models.get(section, config["model"]), sampling, config["escalation"])
+    return routes
+
+
+def routing_signature(backend: str) -> str:
+    """
+    The backend's model configuration as one string, for cache and store keys:
+    the default model alone when neither routing nor sampling profiles are
+    configured.
+    """
+    config = _backend_settings(backend)
+    signature = config["model"]
+    if config["models"] or config["temperatures"] or config["escalation"]:
+        signature += f"|{config['models']}|{config['temperatures']}|{config['escalation']}"
+    if config["profiles"] or config["profile"] != DEFAULT_PROFILE:
+        # The seed decides deterministic answers
+        signature += f"|{config['profile']}|{config['profiles']}|seed={settings.LLM_SEED}"
+    return signature
+
+
+# Answer validation deciding escalation (raw answers, before sanitizing)
+
+def has_answer(text: str) -> bool:
+    return bool(clean_text(text))
+
+
+def has_items(text: str) -> bool:
+    return bool(clean_lines(text))
+
+
+def within_limit(limit: int) -> Callable[[str], bool]:
+    """Non-empty and at most `limit` visible characters."""
+    return lambda text: 0 < len(clean_text(text)) <= limit
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (~4 characters per token) for calls without reported usage."""
+    return max(1, len(text) // 4)
+
+
+def account_call(backend: str, model: str, section: str, seconds: float, prompt: str, answer: str,
+                 prompt_tokens: Optional[int] = None, completion_tokens: Optional[int] = None) -> None:
+    """Record the latency and token usage of one LLM call."""
+    LLM_CALL_LATENCY.observe(seconds, backend, model, section)
+    LLM_TOKENS.inc(backend, model, section, "prompt", amount=prompt_tokens if prompt_tokens is not None else estimate_tokens(prompt))
+    LLM_TOKENS.inc(backend, model, section, "completion",
+                   amount=completion_tokens if completion_tokens is not None else estimate_tokens(answer))
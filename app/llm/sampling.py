@@ -0,0 +1,67 @@
+"""
+Sampling profiles for the LLM backends.
+
+A profile bundles the sampling parameters of a call. Each backend has a
+default profile (OPENAI_SAMPLING_PROFILE, OLLAMA_SAMPLING_PROFILE) and can
+override it per section (OPENAI_SECTION_PROFILES="title=deterministic,...");
+a section temperature set in *_SECTION_TEMPERATURES takes precedence over
+the profile's.
+
+- balanced (default): temperature 0.7 with the backend's nucleus settings
+  (OpenAI top_p 1.0; Ollama top_p 0.9, top_k 40), as before profiles existed
+- creative: temperature 0.9, top_p 0.95
+- deterministic: temperature 0, top_k 1 and the fixed seed LLM_SEED, so the
+  same prompt gets the same answer and content can be cached and compared
+  across runs (OpenAI documents seeded sampling as best effort)
+
+The profiles in use are part of the backend's routing signature, and with it
+of the single-flight, content store and incremental keys.
+"""
+
+from typing import Optional
+from ..config import settings
+
+
+class SamplingProfile:
+    """Sampling parameters of an LLM call; None leaves a parameter at the backend's default."""
+
+    __slots__ = ("name", "temperature", "top_p", "top_k", "seed")
+
+    def __init__(self, name: str, temperature: float, top_p: Optional[float] = None, top_k: Optional[int] = None,
+                 seed: Optional[int] = None):
+        self.name = name
+        self.temperature = temperature
+        self.top_p = top_p
+        self.top_k = top_k
+        self.seed = seed
+
+    def with_temperature(self, temperature: float) -> "SamplingProfile":
+        return SamplingProfile(self.name, temperature, self.top_p, self.top_k, self.seed)
+
+    @property
+    def signature(self) -> str:
+        """The parameters as one string, for recording keys."""
+        return f"{self.name}:{self.temperature}:{self.top_p}:{self.top_k}:{self.seed}"
+
+    def __repr__(self) -> str:
+        return f"SamplingProfile({self.name}, temperature={self.temperature}, seed={self.seed})"
+
+
+DEFAULT_PROFILE = "balanced"
+PROFILE_NAMES = ("balanced", "creative", "deterministic")
+
+
+def profile_name(name: str) -> str:
+    """Validate a profile name (ValueError for unknown names)."""
+    if name not in PROFILE_NAMES:
+        raise ValueError(f"unknown sampling profile '{name}'")
+    return name
+
+
+def get_profile(name: str) -> SamplingProfile:
+    """The named profile; the deterministic one is seeded with LLM_SEED."""
+    if name == "creative":
+        return SamplingProfile("creative", 0.9, top_p=0.95)
+    if name == "deterministic":
+        return SamplingProfile("deterministic", 0.0, top_k=1, seed=settings.LLM_SEED)
+    return SamplingProfile("balanced", 0.7)
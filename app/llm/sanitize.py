@@ -0,0 +1,53 @@
+"""
+Post-processing of raw LLM text before it is placed into HTML.
+
+Every backend runs its answers through the same stage: markdown emphasis,
+headings and code ticks are dropped, wrapping quotes and whitespace runs are
+removed, bullets are normalised and the text is escaped for the element or
+attribute it goes into. Patterns are compiled once at import time.
+"""
+
+import re
+from typing import List
+
+# Markdown the models add despite "respond only with ...": **bold**, __bold__,
+# `code`, "# " headings and "> " quotes at the start of a line
+_MARKDOWN = re.compile(r"\*\*|__|`|^[ \t]*(?:#{1,6}|>)[ \t]+", re.MULTILINE)
+# Cheap pre-check: most answers contain no markdown at all
+_MARKDOWN_CHARS = re.compile(r"[*_`#>]")
+# Leading list markers: "-", "*", "•", "·", "–" or "1." / "1)"
+_BULLET = re.compile(r"^\s*(?:[-*•·–]|\d{1,2}[.)](?=\s))\s*")
+_QUOTES = "\"'“”‘’«»"
+
+
+def _strip_markdown(text: str) -> str:
+    return _MARKDOWN.sub("", text) if _MARKDOWN_CHARS.search(text) else text
+
+
+def clean_text(text: str) -> str:
+    """Plain single-paragraph text: no markdown, wrapping quotes or repeated whitespace."""
+    return " ".join(_strip_markdown(text).split()).strip(_QUOTES).strip()
+
+
+def clean_lines(text: str) -> List[str]:
+    """Items of a bullet list: one per non-empty line, without list markers or headings."""
+    items = []
+    for line in text.splitlines():
+        # Skip headings and labels such as "## Features" or "Key features:"
+        if line.lstrip().startswith("#") or line.rstrip().endswith(":"):
+            continue
+        item = " ".join(_BULLET.sub("", _strip_markdown(line)).split()).strip(_QUOTES)
+        if item:
+            items.append(item)
+    return items
+
+
+def escape_text(text: str) -> str:
+    """Escape text for an element body such as <title> or <p>."""
+    # Chained str.replace runs in C and beats str.translate on non-ASCII text
+    return text.replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;")
+
+
+def escape_attr(text: str) -> str:
+    """Escape text for a double-quoted attribute such as <meta content="...">."""
+    return escape_text(text).replace('"', "&quot;")
@@ -0,0 +1,203 @@
+"""
+Priority-aware scheduling of LLM calls.
+
+Every call made by OpenAIGenerator and OllamaGenerator takes a slot from the
+scheduler of its backend. Slots are handed out across three lanes:
+
+- interactive: agents waiting on /generate (default)
+- bulk: catalogue-wide regeneration
+- background: cache warming and refresh jobs
+
+Waiting calls are served by weighted fair sharing (stride scheduling with
+LLM_LANE_WEIGHTS). In addition, LLM_INTERACTIVE_RESERVE slots are only ever
+given to interactive calls, so bulk work cannot take the whole backend. Each
+tenant can hold at most LLM_TENANT_MAX_CONCURRENCY slots; calls over that
+quota wait while other tenants' calls in the same lane go first. A call that
+gets no slot within LLM_SLOT_TIMEOUT leaves the queue and raises SlotTimeout.
+
+The lane and tenant come from the request context (see use_priority), which
+FastAPI carries into the threadpool that runs the generators.
+"""
+
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Deque, Dict, Iterator, Optional, Tuple
+from ..config import settings
+from ..metrics import LLM_QUEUE_DEPTH, LLM_SLOT_TIMEOUTS, LLM_SLOTS_IN_USE, QUEUE_WAIT
+
+LANES = ("interactive", "bulk", "background")
+
+_lane: ContextVar[str] = ContextVar("llm_lane", default="interactive")
+_tenant: ContextVar[str] = ContextVar("llm_tenant", default="")
+
+
+@contextmanager
+def use_priority(lane: str, tenant: str = "") -> Iterator[None]:
+    """Run the enclosed code (and threads started from it) in a lane, for a tenant."""
+    if lane not in LANES:
+        raise ValueError(f"Unknown lane '{lane}', expected one of {LANES}")
+    lane_token, tenant_token = _lane.set(lane), _tenant.set(tenant)
+    try:
+        yield
+    finally:
+        _lane.reset(lane_token)
+        _tenant.reset(tenant_token)
+
+
+def current_priority() -> Tuple[str, str]:
+    """Lane and tenant of the current context."""
+    return _lane.get(), _tenant.get()
+
+
+def _parse_weights(spec: str) -> Dict[str, float]:
+    """Parse "interactive=16,bulk=3,background=1"; missing lanes get weight 1."""
+    weights = {lane: 1.0 for lane in LANES}
+    for item in spec.split(","):
+        if "=" in item:
+            lane, value = item.split("=", 1)
+            if lane.strip() in weights:
+                weights[lane.strip()] = max(float(value), 0.001)
+    return weights
+
+
+class SlotTimeout(Exception):
+    """No LLM call slot was granted within the scheduler's wait timeout."""
+
+
+class _Ticket:
+    __slots__ = ("lane", "tenant", "event")
+
+    def __init__(self, lane: str, tenant: str):
+        self.lane = lane
+        self.tenant = tenant
+        self.event = threading.Event()
+
+
+class LLMScheduler:
+    """Slot scheduler for one LLM backend, shared by all worker threads."""
+
+    def __init__(self, backend: str, capacity: int, weights: Dict[str, float], interactive_reserve: int, tenant_limit: int,
+                 wait_timeout: Optional[float] = None):
+        self.backend = backend
+        self.capacity = max(1, capacity)
+        self.weights = weights
+        # Never reserve every slot: bulk work must still make progress
+        self.interactive_reserve = min(max(0, interactive_reserve), self.capacity - 1)
+        self.tenant_limit = tenant_limit
+        self.wait_timeout = wait_timeout if wait_timeout and wait_timeout > 0 else None
+        self._lock = threading.Lock()
+        self._queues: Dict[str, Deque[_Ticket]] = {lane: deque() for lane in LANES}
+        self._in_use: Dict[str, int] = {lane: 0 for lane in LANES}
+        self._tenant_in_use: Dict[str, int] = {}
+        # Stride scheduling: the eligible lane with the lowest pass value goes next
+        self._pass: Dict[str, float] = {lane: 0.0 for lane in LANES}
+
+    @contextmanager
+    def slot(self, lane: Optional[str] = None, tenant: Optional[str] = None) -> Iterator[None]:
+        """Hold one backend slot for the duration of an LLM call."""
+        lane = lane or _lane.get()
+        tenant = _tenant.get() if tenant is None else tenant
+        queued = time.perf_counter()
+        ticket = _Ticket(lane, tenant)
+        with self._lock:
+            self._enqueue(ticket)
+            self._dispatch()
+        if not ticket.event.wait(self.wait_timeout):
+            with self._lock:
+                # The slot may have been granted just as the wait ran out; then use it
+                if not ticket.event.is_set():
+                    self._queues[lane].remove(ticket)
+                    self._dispatch()
+            if not ticket.event.is_set():
+                QUEUE_WAIT.observe(time.perf_counter() - queued, f"llm_{lane}")
+                LLM_SLOT_TIMEOUTS.inc(self.backend, lane)
+                raise SlotTimeout(f"no {self.backend} slot in lane '{lane}' within {self.wait_timeout:g}s")
+        QUEUE_WAIT.observe(time.perf_counter() - queued, f"llm_{lane}")
+        try:
+            yield
+        finally:
+            self._release(lane, tenant)
+
+    def _release(self, lane: str, tenant: str) -> None:
+        """Give a slot back and hand it to the next waiting call."""
+        with self._lock:
+            self._in_use[lane] -= 1
+            if tenant:
+                self._tenant_in_use[tenant] -= 1
+                if not self._tenant_in_use[tenant]:
+                    del self._tenant_in_use[tenant]
+            self._dispatch()
+
+    def busy_slots(self, lanes: Tuple[str, ...] = LANES) -> int:
+        """Slots held plus calls waiting in the given lanes."""
+        with self._lock:
+            return sum(self._in_use[lane] + len(self._queues[lane]) for lane in lanes)
+
+    def _enqueue(self, ticket: _Ticket) -> None:
+        queue = self._queues[ticket.lane]
+        if not queue:
+            # A lane returning from idle starts at the current virtual time
+            # instead of spending credit saved while it had nothing to run
+            busy = [self._pass[lane] for lane in LANES if self._queues[lane]]
+            self._pass[ticket.lane] = max(self._pass[ticket.lane], min(busy, default=self._pass[ticket.lane]))
+        queue.append(ticket)
+
+    def _next_ticket(self, lane: str) -> Optional[_Ticket]:
+        """First ticket in the lane whose tenant is below its quota."""
+        for ticket in self._queues[lane]:
+            if not (ticket.tenant and self.tenant_limit and self._tenant_in_use.get(ticket.tenant, 0) >= self.tenant_limit):
+                return ticket
+        return None
+
+    def _dispatch(self) -> None:
+        """Grant free slots to waiting tickets (caller holds the lock)."""
+        while True:
+            in_use = sum(self._in_use.values())
+            if in_use >= self.capacity:
+                break
+            shared_free = in_use < self.capacity - self.interactive_reserve
+            best: Optional[Tuple[str, _Ticket]] = None
+            for lane in LANES:
+                if lane != "interactive" and not shared_free:
+                    continue
+                ticket = self._next_ticket(lane)
+                if ticket is not None and (best is None or self._pass[lane] < self._pass[best[0]]):
+                    best = (lane, ticket)
+            if best is None:
+                break
+            lane, ticket = best
+            self._queues[lane].remove(ticket)
+            self._pass[lane] += 1.0 / self.weights[lane]
+            self._in_use[lane] += 1
+            if ticket.tenant:
+                self._tenant_in_use[ticket.tenant] = self._tenant_in_use.get(ticket.tenant, 0) + 1
+            ticket.event.set()
+        for lane in LANES:
+            LLM_SLOTS_IN_USE.set(self._in_use[lane], self.backend, lane)
+            LLM_QUEUE_DEPTH.set(len(self._queues[lane]), self.backend, lane)
+
+
+_schedulers: Dict[str, LLMScheduler] = {}
+_schedulers_lock = threading.Lock()
+
+
+def get_scheduler(backend: str) -> LLMScheduler:
+    """Scheduler for a backend, created from the current settings on first use."""
+    scheduler = _schedulers.get(backend)
+    if scheduler is None:
+        with _schedulers_lock:
+            scheduler = _schedulers.get(backend)
+            if scheduler is None:
+                scheduler = LLMScheduler(
+                    backend,
+                    settings.LLM_MAX_CONCURRENCY,
+                    _parse_weights(settings.LLM_LANE_WEIGHTS),
+                    settings.LLM_INTERACTIVE_RESERVE,
+                    settings.LLM_TENANT_MAX_CONCURRENCY,
+                    settings.LLM_SLOT_TIMEOUT,
+                )
+                _schedulers[backend] = scheduler
+    return scheduler
@@ -0,0 +1,289 @@
+"""
+Semantic cache for near-duplicate listings (optional, requires NumPy).
+
+Listings that differ by a few square metres or a slightly different price get
+practically interchangeable neighborhood, call-to-action and key-feature
+text. Each cacheable section names the listing fields it depends on, computed
+locally with no network or model:
+
+- categorical fields (city, neighborhood, bedrooms, balcony, ...) must match
+  exactly: their values are part of the cache key, so text is never reused
+  for another neighborhood or bedroom count
+- numeric fields (area, price) are bucketed on a log scale with linear
+  interpolation between the two nearest buckets and hashed into an
+  L2-normalised vector, so 118 and 120 sqm are nearly identical while 60 and
+  120 sqm are orthogonal
+
+Vectors are kept in one NumPy matrix per section, language, partition and
+categorical values; a lookup is a single matrix-vector product. The nearest
+entry is reused when its cosine similarity reaches SEMANTIC_CACHE_THRESHOLD.
+
+Reused text may quote the cached listing's numbers. A number the section
+depends on (the area in key features) is replaced by the new listing's
+value; when the text quotes any other listing number (bedrooms, bathrooms,
+floor, year, price) that differs for the new listing, the entry is not
+reused, since the number cannot be told apart from unrelated ones in the
+text ("2 minutes away").
+
+The partition (see cache_partition) is the backend and the section's route:
+model, escalation model and sampling parameters, seed included. Text written
+with the creative profile is never served to a deterministic configuration,
+nor text sampled with another seed.
+"""
+
+import math
+import re
+import threading
+import zlib
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from ..config import settings
+from ..listing import ListingView
+from ..metrics import record_cache_lookup
+from .routing import SectionRoute
+
+# NumPy is optional and only imported once the cache is enabled (see get_semantic_cache)
+np = None
+
+DIMENSIONS = 64
+# Log-scale bucket width for numeric features: ~10% per bucket
+_NUMERIC_BUCKET = math.log(1.1)
+
+
+def _location(listing: ListingView) -> List[Tuple[str, Any]]:
+    return [("city", listing.city.strip().lower()), ("neighborhood", listing.neighborhood.strip().lower())]
+
+
+def _neighborhood_features(listing: ListingView) -> Tuple[List[Tuple[str, Any]], List[Tuple[str, float]]]:
+    return _location(listing), []
+
+
+def _cta_features(listing: ListingView) -> Tuple[List[Tuple[str, Any]], List[Tuple[str, float]]]:
+    return _location(listing) + [("listing_type", listing.listing_type), ("bedrooms", listing.bedrooms)], [("price", listing.price)]
+
+
+def _key_features_features(listing: ListingView) -> Tuple[List[Tuple[str, Any]], List[Tuple[str, float]]]:
+    categorical = _location(listing) + [
+        (name, getattr(listing, name)) for name in ("bedrooms", "bathrooms", "balcony", "elevator", "parking")
+    ]
+    return categorical, [("area_sqm", listing.area_sqm)]
+
+
+# Sections whose text can be reused across near-duplicate listings, and the
+# listing fields each depends on (categorical, numeric)
+SECTION_FEATURES: Dict[str, Callable[[ListingView], Tuple[List[Tuple[str, Any]], List[Tuple[str, float]]]]] = {
+    "neighborhood": _neighborhood_features,
+    "call_to_action": _cta_features,
+    "key_features": _key_features_features,
+}
+
+# Listing numbers that reused text may quote
+_QUOTED = ("bedrooms", "bathrooms", "area_sqm", "floor", "year_built", "price")
+# Numbers replaced by the new listing's value in a section's reused text: the
+# section's own numeric features whose written form is the plain number
+# (prices are written with separators and currency, so they are never rewritten)
+SECTION_SUBSTITUTED: Dict[str, Tuple[str, ...]] = {
+    "neighborhood": (),
+    "call_to_action": (),
+    "key_features": ("area_sqm",),
+}
+
+
+def _slot(token: str) -> Tuple[int, float]:
+    """Stable (process-independent) dimension and sign for a feature token."""
+    digest = zlib.crc32(token.encode("utf-8"))
+    return digest % DIMENSIONS, 1.0 if digest & 0x80000000 else -1.0
+
+
+def categorical_key(section: str, listing: ListingView) -> Tuple[Any, ...]:
+    """The exact categorical values a section depends on, part of the cache key."""
+    categorical, _ = SECTION_FEATURES[section](listing)
+    return tuple(value for _, value in categorical)
+
+
+def feature_vector(section: str, listing: ListingView) -> "np.ndarray":
+    """L2-normalised vector of the numeric fields a section depends on."""
+    vector = np.zeros(DIMENSIONS, dtype=np.float32)
+    _, numeric = SECTION_FEATURES[section](listing)
+    for name, value in numeric:
+        if not value or value <= 0:
+            # A missing number has its own token, so it only matches other missing numbers
+            index, sign = _slot(f"{name}=missing")
+            vector[index] += sign
+            continue
+        position = math.log(value) / _NUMERIC_BUCKET
+        low = math.floor(position)
+        weight = position - low
+        for bucket, share in ((low, 1.0 - weight), (low + 1, weight)):
+            index, sign = _slot(f"{name}~{bucket}")
+            vector[index] += sign * share
+    norm = float(np.linalg.norm(vector))
+    if not norm:
+        # No numeric fields: every listing with the same categorical values is identical
+        vector[0] = 1.0
+        return vector
+    return vector / norm
+
+
+def _format_number(value: Any) -> str:
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+
+def _numbers(listing: ListingView) -> Dict[str, str]:
+    values = {name: getattr(listing, name) for name in _QUOTED}
+    return {name: _format_number(value) for name, value in values.items() if value is not None}
+
+
+def _pattern(number: str) -> str:
+    return rf"(?<![\d.,]){re.escape(number)}(?![\d]|[.,]\d)"
+
+
+def _mentions(text: str, name: str, number: str) -> bool:
+    """Whether text quotes a listing number (prices also in their grouped forms, e.g. 650,000 and 650.000)."""
+    forms = {number}
+    if name == "price":
+        grouped = f"{round(float(number)):,}"
+        forms |= {grouped, grouped.replace(",", ".")}
+    return any(re.search(_pattern(form), text) for form in forms)
+
+
+def resubstitute(text: str, cached: Dict[str, str], current: Dict[str, str]) -> str:
+    """Replace the cached listing's numbers in reused text with the current listing's."""
+    for name, old in cached.items():
+        new = current.get(name)
+        if new is not None and new != old:
+            text = re.sub(_pattern(old), new, text)
+    return text
+
+
+def adapt(section: str, text: str, cached: Dict[str, str], current: Dict[str, str]) -> Optional[str]:
+    """
+    Cached text of `section` rewritten for the current listing's numbers, or
+    None when it quotes a differing number the section does not substitute.
+    """
+    substituted = SECTION_SUBSTITUTED.get(section, ())
+    replaced = {}
+    for name, old in cached.items():
+        new = current.get(name)
+        if new == old:
+            continue
+        if name in substituted and new is not None:
+            replaced[name] = old
+        elif _mentions(text, name, old):
+            return None
+    return resubstitute(text, replaced, current)
+
+
+def cache_partition(backend: str, route: SectionRoute) -> str:
+    """Partition of a section's cached text: backend, routed models and sampling parameters (with the seed)."""
+    return f"{backend}:{route.model}:{route.escalation}:{route.sampling.signature}"
+
+
+class _Index:
+    """Vectors and cached sections of one (section, language, backend, categorical values) partition."""
+
+    __slots__ = ("vectors", "entries", "size", "next")
+
+    def __init__(self):
+        self.vectors = np.zeros((4, DIMENSIONS), dtype=np.float32)
+        self.entries: List[Tuple[str, Dict[str, str]]] = []
+        self.size = 0
+        self.next = 0  # insert position; wraps around (FIFO eviction) once full
+
+    def add(self, vector: "np.ndarray", entry: Tuple[str, Dict[str, str]], max_entries: int) -> bool:
+        """Add an entry; returns whether the index grew (False when an old entry was replaced)."""
+        grew = self.size < max_entries
+        if grew:
+            if self.size == len(self.vectors):
+                grown = np.zeros((min(len(self.vectors) * 2, max_entries), DIMENSIONS), dtype=np.float32)
+                grown[:self.size] = self.vectors[:self.size]
+                self.vectors = grown
+            self.entries.append(entry)
+            self.size += 1
+        else:
+            self.entries[self.next] = entry
+        self.vectors[self.next] = vector
+        self.next = (self.next + 1) % max_entries
+        return grew
+
+    def nearest(self, vector: "np.ndarray") -> Tuple[float, int]:
+        similarities = self.vectors[:self.size] @ vector
+        best = int(np.argmax(similarities))
+        return float(similarities[best]), best
+
+
+class SemanticCache:
+    """Nearest-neighbour reuse of section outputs across near-duplicate listings."""
+
+    def __init__(self, threshold: float, max_entries: int, sections: List[str]):
+        self.threshold = threshold
+        self.max_entries = max(1, max_entries)
+        self.sections = [section for section in sections if section in SECTION_FEATURES]
+        # (section, language, backend) -> categorical values -> index, least recently stored first
+        self._groups: Dict[Tuple[str, str, str], "OrderedDict[Tuple[Any, ...], _Index]"] = {}
+        self._sizes: Dict[Tuple[str, str, str], int] = {}
+        self._lock = threading.Lock()
+
+    def lookup(self, section: str, listing: ListingView, partition: str) -> Optional[str]:
+        """Cached output for a near-identical listing, with its numbers re-substituted, or None."""
+        if section not in self.sections:
+            return None
+        vector = feature_vector(section, listing)
+        group = (section, listing.language, partition)
+        with self._lock:
+            index = self._groups.get(group, {}).get(categorical_key(section, listing))
+            match = index.nearest(vector) if index is not None and index.size else None
+            entry = index.entries[match[1]] if match is not None and match[0] >= self.threshold else None
+        text = adapt(section, entry[0], entry[1], _numbers(listing)) if entry is not None else None
+        record_cache_lookup(f"semantic_{section}", text is not None)
+        return text
+
+    def store(self, section: str, listing: ListingView, partition: str, text: str) -> None:
+        """Remember a freshly generated section for later near-duplicates."""
+        if section not in self.sections:
+            return
+        vector = feature_vector(section, listing)
+        group_key = (section, listing.language, partition)
+        key = categorical_key(section, listing)
+        with self._lock:
+            group = self._groups.setdefault(group_key, OrderedDict())
+            index = group.get(key)
+            if index is None:
+                index = group[key] = _Index()
+            group.move_to_end(key)
+            if index.add(vector, (text, _numbers(listing)), self.max_entries):
+                self._sizes[group_key] = self._sizes.get(group_key, 0) + 1
+            # At most max_entries per section, language and backend: drop the
+            # least recently stored categorical values first
+            while self._sizes[group_key] > self.max_entries and len(group) > 1:
+                _, evicted = group.popitem(last=False)
+                self._sizes[group_key] -= evicted.size
+
+    def __len__(self) -> int:
+        return sum(self._sizes.values())
+
+
+_cache: Optional[SemanticCache] = None
+_warned = False
+
+
+def get_semantic_cache() -> Optional[SemanticCache]:
+    """The process-wide cache when SEMANTIC_CACHE is enabled and NumPy is installed, else None."""
+    global _cache, _warned, np
+    if not settings.SEMANTIC_CACHE:
+        return None
+    if np is None:
+        try:
+            import numpy
+        except ImportError:
+            if not _warned:
+                _warned = True
+                print("Warning: SEMANTIC_CACHE is enabled but NumPy is not installed (pip install numpy); cache disabled")
+            return None
+        np = numpy
+    if _cache is None:
+        sections = [section.strip() for section in settings.SEMANTIC_CACHE_SECTIONS.split(",") if section.strip()]
+        _cache = SemanticCache(settings.SEMANTIC_CACHE_THRESHOLD, settings.SEMANTIC_CACHE_MAX_ENTRIES, sections)
+    return _cache
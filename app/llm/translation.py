@@ -0,0 +1,94 @@
+"""
+Translation of a generated page into other languages in one LLM call.
+
+Multi-language publishing can generate one language section by section and
+translate the result, instead of running the seven section prompts again per
+language. Only the visible texts of the page are translated: every text node
+and the meta description's content attribute is extracted from the source
+sections, all of them are sent in one prompt for all target languages, and
+the answers are put back into the source markup escaped, so the markup never
+passes through the model. Limited sections (title, meta description,
+description) are truncated to their limit if a translation runs long.
+"""
+
+import html
+import json
+import re
+from typing import Dict, List, Sequence, Tuple, Union
+from ..config import settings
+from ..metrics import LIMIT_ENFORCEMENTS
+from ..utils import SECTION_LIMITS, smart_truncate
+from .sanitize import clean_text, escape_attr, escape_text
+
+_PART = re.compile(r"(<[^>]+>)")
+_CONTENT_ATTR = re.compile(r'content="([^"]*)"')
+
+# A section skeleton is its markup with placeholders: literal HTML strings and
+# (segment index, inside an attribute) pairs
+Skeleton = List[Union[str, Tuple[int, bool]]]
+
+
+def split_sections(sections: Dict[str, str]) -> Tuple[List[str], Dict[str, Skeleton]]:
+    """Visible texts of the sections (unescaped, in order) and the markup around them."""
+    segments: List[str] = []
+    skeletons: Dict[str, Skeleton] = {}
+    for section, fragment in sections.items():
+        parts: Skeleton = []
+        for part in _PART.split(fragment):
+            if part.startswith("<"):
+                attribute = _CONTENT_ATTR.search(part)
+                if attribute is None or not attribute.group(1).strip():
+                    parts.append(part)
+                    continue
+                parts += [part[:attribute.start(1)], (len(segments), True), part[attribute.end(1):]]
+                segments.append(html.unescape(attribute.group(1)))
+            elif part.strip():
+                stripped = part.strip()
+                start = part.index(stripped)
+                parts += [part[:start], (len(segments), False), part[start + len(stripped):]]
+                segments.append(html.unescape(stripped))
+            elif part:
+                parts.append(part)
+        skeletons[section] = parts
+    return segments, skeletons
+
+
+def render_sections(skeletons: Dict[str, Skeleton], translated: Sequence[str], backend: str) -> Dict[str, str]:
+    """Put translated texts back into the source markup."""
+    sections = {}
+    for section, parts in skeletons.items():
+        limit = SECTION_LIMITS.get(section) if settings.LIMIT_ENFORCEMENT != "off" else None
+        rendered = []
+        for part in parts:
+            if isinstance(part, str):
+                rendered.append(part)
+                continue
+            index, in_attribute = part
+            text = clean_text(translated[index])
+            if limit is not None and len(text) > limit:
+                LIMIT_ENFORCEMENTS.inc(backend, section, "truncate")
+                text = smart_truncate(text, limit)
+            rendered.append(escape_attr(text) if in_attribute else escape_text(text))
+        sections[section] = "".join(rendered)
+    return sections
+
+
+def parse_translations(answer: str, targets: Sequence[str], count: int) -> Dict[str, List[str]]:
+    """
+    Translations per target language from the model's JSON answer.
+
+    Languages whose list is missing or does not hold exactly `count` strings
+    are left out, so the caller can generate them directly instead.
+    """
+    try:
+        data = json.loads(answer[answer.find("{"):answer.rfind("}") + 1])
+    except ValueError:
+        return {}
+    if not isinstance(data, dict):
+        return {}
+    translations = {}
+    for language in targets:
+        texts = data.get(language)
+        if isinstance(texts, list) and len(texts) == count and all(isinstance(text, str) for text in texts):
+            translations[language] = texts
+    return translations
@@ -1,6 +1,11 @@
 from fastapi import FastAPI
 from .routes import router
 from .config import settings
+from .tracing import TracingMiddleware
+from .generator import warm_up
+from .llm.routing import section_routes
+from .templates import preload
+from . import prewarm, workers
 
 app = FastAPI(
     title="Real Estate Content Generator",
@@ -19,8 +24,35 @@ async def startup_event():
             print(f"   Using OpenAI model: {settings.OPENAI_MODEL}")
         elif settings.GENERATION_MODE == "ollama":
             print(f"   Using Ollama model: {settings.OLLAMA_MODEL} at {settings.OLLAMA_BASE_URL}")
+        if settings.GENERATION_MODE in ["openai", "ollama"]:
+            routes = section_routes(settings.GENERATION_MODE)
+            if len({route.model for route in routes.values()}) > 1:
+                print("   Section models: " + ", ".join(f"{section}={route.model}" for section, route in routes.items()))
+            profiles = {route.sampling.name for route in routes.values()}
+            if profiles != {"balanced"}:
+                print(f"   Sampling profiles: {', '.join(sorted(profiles))} (seed {settings.LLM_SEED})")
+            if settings.LLM_REPLAY != "off":
+                strict = ", misses fail requests" if settings.LLM_REPLAY == "replay" and settings.LLM_REPLAY_STRICT else ""
+                print(f"   LLM answers: {settings.LLM_REPLAY} ({settings.LLM_REPLAY_FILE}{strict})")
+        # Template modules back template mode and the LLM fallback; load them once here
+        print(f"   Template languages: {', '.join(preload())} (default: {settings.DEFAULT_LANGUAGE})")
+        # Import and initialise the active backend now, not on the first request
+        if settings.GENERATION_MODE in ["openai", "ollama"]:
+            print(f"   Backend warmed up in {warm_up() * 1000:.0f} ms")
+        if settings.WORKER_MODE == "process":
+            workers.start_pool()
+            print(f"   Template generation runs on a pool of {workers.pool_size()} worker processes")
+        if prewarm.start():
+            print(f"   Pre-generation of busy neighborhoods runs in hours {settings.PREWARM_HOURS or 'any'}")
     except Exception as e:
         print(f"❌ Configuration error: {e}")
         raise e
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Stop the pre-generation job and drain the worker process pool."""
+    prewarm.stop()
+    workers.shutdown_pool()
+
+app.add_middleware(TracingMiddleware)
 app.include_router(router) 
\ No newline at end of file
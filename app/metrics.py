@@ -0,0 +1,297 @@
+import threading
+from bisect import bisect_left
+from typing import Callable, Dict, List, Optional, Tuple
+
+# Latency buckets (seconds) covering template rendering (sub-millisecond)
+# up to slow LLM calls hitting the 60 s HTTP timeout.
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+_INF_LABEL = 'le="+Inf"'
+
+# In process-pool workers (see app/workers.py) updates are buffered here and
+# shipped back to the parent process, which owns the registry served on /metrics.
+_forward_buffer: Optional[List[Tuple[str, str, Tuple[str, ...], float]]] = None
+
+
+def _escape(value: str) -> str:
+    """Escape a label value for the Prometheus text format."""
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+    """Render a label set such as {backend="openai",section="title"}."""
+    pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    """Render a sample value, keeping integers free of a trailing .0."""
+    if value == int(value):
+        return str(int(value))
+    return repr(value)
+
+
+class _Metric:
+    """Base class for labelled in-process metrics."""
+
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labels: Tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = labels
+        self._lock = threading.Lock()
+
+    def _header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+    def render(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    """Monotonically increasing counter."""
+
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labels: Tuple[str, ...] = ()):
+        super().__init__(name, documentation, labels)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, *labels: str, amount: float = 1.0) -> None:
+        if _forward_buffer is not None:
+            _forward_buffer.append((self.name, "inc", labels, amount))
+            return
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def value(self, *labels: str) -> float:
+        return self._values.get(labels, 0.0)
+
+    def render(self) -> List[str]:
+        lines = self._header()
+        with self._lock:
+            items = list(self._values.items())
+        for labels, value in items:
+            lines.append(f"{self.name}{_format_labels(self.label_names, labels)} {_format_value(value)}")
+        return lines
+
+
+class Gauge(_Metric):
+    """Value that can go up and down, optionally computed at scrape time."""
+
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, labels: Tuple[str, ...] = (),
+                 collect: Optional[Callable[[], Dict[Tuple[str, ...], float]]] = None):
+        super().__init__(name, documentation, labels)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._collect = collect
+
+    def set(self, value: float, *labels: str) -> None:
+        with self._lock:
+            self._values[labels] = value
+
+    def inc(self, *labels: str, amount: float = 1.0) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def dec(self, *labels: str, amount: float = 1.0) -> None:
+        self.inc(*labels, amount=-amount)
+
+    def value(self, *labels: str) -> float:
+        return self._values.get(labels, 0.0)
+
+    def render(self) -> List[str]:
+        lines = self._header()
+        with self._lock:
+            items = list(self._values.items())
+        if self._collect is not None:
+            items.extend(self._collect().items())
+        for labels, value in items:
+            lines.append(f"{self.name}{_format_labels(self.label_names, labels)} {_format_value(value)}")
+        return lines
+
+
+class Histogram(_Metric):
+    """Bucketed distribution of observed values (e.g. latencies in seconds)."""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labels: Tuple[str, ...] = (),
+                 buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(sorted(buckets))
+        # Per label set: [bucket counts..., +Inf count], sum
+        self._series: Dict[Tuple[str, ...], List[float]] = {}
+
+    def observe(self, value: float, *labels: str) -> None:
+        if _forward_buffer is not None:
+            _forward_buffer.append((self.name, "observe", labels, value))
+            return
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = [0.0] * (len(self.buckets) + 2)
+                self._series[labels] = series
+            series[index] += 1
+            series[-1] += value
+
+    def count(self, *labels: str) -> int:
+        series = self._series.get(labels)
+        return int(sum(series[:-1])) if series else 0
+
+    def render(self) -> List[str]:
+        lines = self._header()
+        with self._lock:
+            items = [(labels, list(series)) for labels, series in self._series.items()]
+        for labels, series in items:
+            cumulative = 0.0
+            for bound, bucket_count in zip(self.buckets, series):
+                cumulative += bucket_count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.label_names, labels, le)} {_format_value(cumulative)}")
+            cumulative += series[len(self.buckets)]
+            lines.append(f"{self.name}_bucket{_format_labels(self.label_names, labels, _INF_LABEL)} {_format_value(cumulative)}")
+            lines.append(f"{self.name}_sum{_format_labels(self.label_names, labels)} {_format_value(series[-1])}")
+            lines.append(f"{self.name}_count{_format_labels(self.label_names, labels)} {_format_value(cumulative)}")
+        return lines
+
+
+class Registry:
+    """Collection of metrics rendered together on /metrics."""
+
+    def __init__(self):
+        self._metrics: List[_Metric] = []
+        self._by_name: Dict[str, _Metric] = {}
+
+    def register(self, metric: _Metric) -> _Metric:
+        self._metrics.append(metric)
+        self._by_name[metric.name] = metric
+        return metric
+
+    def replay(self, updates: List[Tuple[str, str, Tuple[str, ...], float]]) -> None:
+        """Apply updates forwarded from a worker process."""
+        for name, operation, labels, value in updates:
+            metric = self._by_name[name]
+            if operation == "observe":
+                metric.observe(value, *labels)
+            else:
+                metric.inc(*labels, amount=value)
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+# Generation metrics
+REQUESTS = registry.register(Counter(
+    "content_requests_total", "Content generation requests by mode and outcome.", ("mode", "outcome")))
+REQUEST_LATENCY = registry.register(Histogram(
+    "content_request_duration_seconds", "End-to-end generation latency per request.", ("mode",)))
+SECTION_LATENCY = registry.register(Histogram(
+    "content_section_duration_seconds", "Latency of each generated section by backend.", ("backend", "section")))
+TEMPLATE_FALLBACKS = registry.register(Counter(
+    "content_template_fallbacks_total", "Requests that fell back to template mode after an LLM failure.", ("backend",)))
+IN_FLIGHT = registry.register(Gauge(
+    "content_requests_in_flight", "Generation requests currently being processed.", ("endpoint",)))
+QUEUE_WAIT = registry.register(Histogram(
+    "content_queue_wait_seconds", "Time a request waited before a worker started generating it.", ("queue",)))
+WORKER_POOL_RESTARTS = registry.register(Counter(
+    "worker_pool_restarts_total", "Template worker process pools rebuilt after a worker died.", ()))
+
+# Admission control metrics (see app/admission.py)
+ADMISSION_LIMIT = registry.register(Gauge(
+    "admission_concurrency_limit", "Current adaptive limit on concurrent LLM generations.", ("mode", "lane")))
+ADMISSION_QUEUE_DEPTH = registry.register(Gauge(
+    "admission_queue_depth", "Requests waiting for an admission slot.", ("mode", "lane")))
+LOAD_SHED = registry.register(Counter(
+    "admission_shed_total", "Requests shed under overload, by action (rejected or downgraded).", ("mode", "action")))
+
+CONTENT_LIMIT_VIOLATIONS = registry.register(Counter(
+    "content_limit_violations_total", "Sections published over their character limit.", ("mode", "section")))
+
+# LLM backend metrics
+LLM_ERRORS = registry.register(Counter(
+    "llm_errors_total", "Failed LLM calls by backend and error type.", ("backend", "error_type")))
+LIMIT_ENFORCEMENTS = registry.register(Counter(
+    "llm_limit_enforcements_total", "Over-length LLM sections fixed by a re-ask or truncation.", ("backend", "section", "action")))
+LLM_CALL_LATENCY = registry.register(Histogram(
+    "llm_call_duration_seconds", "Latency of each LLM call by backend, model and section.", ("backend", "model", "section")))
+LLM_TOKENS = registry.register(Counter(
+    "llm_tokens_total", "LLM tokens by backend, model, section and kind (prompt or completion).", ("backend", "model", "section", "kind")))
+MODEL_ESCALATIONS = registry.register(Counter(
+    "llm_model_escalations_total", "Sections asked again with the escalation model after failing validation.", ("backend", "section")))
+LLM_REPLAY_CALLS = registry.register(Counter(
+    "llm_replay_calls_total", "LLM answers recorded or served from a recording (recorded, hit, prompt_changed, miss).", ("backend", "result")))
+
+LLM_SLOTS_IN_USE = registry.register(Gauge(
+    "llm_slots_in_use", "LLM call slots held per backend and priority lane.", ("backend", "lane")))
+LLM_QUEUE_DEPTH = registry.register(Gauge(
+    "llm_queue_depth", "LLM calls waiting for a slot per backend and priority lane.", ("backend", "lane")))
+LLM_SLOT_TIMEOUTS = registry.register(Counter(
+    "llm_slot_timeouts_total", "LLM calls that gave up waiting for a slot (LLM_SLOT_TIMEOUT).", ("backend", "lane")))
+
+BREAKER_STATE = registry.register(Gauge(
+    "llm_circuit_breaker_state", "Circuit breaker state per backend (0 closed, 1 half-open, 2 open).", ("backend",)))
+BREAKER_TRANSITIONS = registry.register(Counter(
+    "llm_circuit_breaker_transitions_total", "Circuit breaker state changes by new state.", ("backend", "state")))
+BREAKER_SHORT_CIRCUITS = registry.register(Counter(
+    "llm_circuit_breaker_short_circuits_total", "Requests served from templates without calling an open backend.", ("backend",)))
+TRANSLATIONS = registry.register(Counter(
+    "llm_translations_total", "Batched page translations by outcome (translated, incomplete, failed).", ("backend", "result")))
+PREWARM_LISTINGS = registry.register(Counter(
+    "prewarm_listings_total", "Representative listings pre-generated in idle hours by outcome (warmed, fallback).", ("backend", "result")))
+
+# Cache metrics
+CACHE_REQUESTS = registry.register(Counter(
+    "content_cache_requests_total", "Cache lookups by cache name and result (hit or miss).", ("cache", "result")))
+
+
+def _cache_hit_ratios() -> Dict[Tuple[str, ...], float]:
+    """Compute the hit ratio of every cache that has seen lookups."""
+    with CACHE_REQUESTS._lock:
+        values = dict(CACHE_REQUESTS._values)
+    caches = {labels[0] for labels in values}
+    ratios = {}
+    for cache in caches:
+        hits = values.get((cache, "hit"), 0.0)
+        total = hits + values.get((cache, "miss"), 0.0)
+        ratios[(cache,)] = hits / total if total else 0.0
+    return ratios
+
+
+CACHE_HIT_RATIO = registry.register(Gauge(
+    "content_cache_hit_ratio", "Hit ratio per cache since process start.", ("cache",), collect=_cache_hit_ratios))
+
+
+def record_cache_lookup(cache: str, hit: bool) -> None:
+    """Record a cache lookup so hit ratios show up on /metrics."""
+    CACHE_REQUESTS.inc(cache, "hit" if hit else "miss")
+
+
+def start_forwarding() -> None:
+    """Buffer counter/histogram updates instead of applying them (worker processes)."""
+    global _forward_buffer
+    _forward_buffer = []
+
+
+def drain_forwarded() -> List[Tuple[str, str, Tuple[str, ...], float]]:
+    """Return and clear the updates buffered since the last drain."""
+    if _forward_buffer is None:
+        return []
+    updates = list(_forward_buffer)
+    _forward_buffer.clear()
+    return updates
+
+
+def render_metrics() -> str:
+    """Render all registered metrics in the Prometheus text exposition format."""
+    return registry.render()
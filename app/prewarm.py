@@ -0,0 +1,250 @@
+"""
+Warm pre-generation of shared sections for the busiest neighborhoods.
+
+At the morning peak new listings cluster in a few neighborhoods and a few
+common shapes (T2/T3 for sale with an elevator, ...). Their neighborhood
+paragraph, call-to-action and key features hardly depend on the individual
+listing, and the semantic cache (app/llm/semantic_cache.py) reuses them
+across near-duplicates, but only once the first of them has been generated
+at peak time, by the LLM.
+
+This job moves that first generation into idle hours:
+
+- every request is counted per (city, neighborhood, language, listing_type)
+  combination with exponentially decaying counts (PREWARM_HALF_LIFE_HOURS),
+  together with its shape (bedrooms, bathrooms, balcony, elevator, parking)
+  and recent areas and prices per shape
+- every PREWARM_INTERVAL_SECONDS within PREWARM_HOURS, a background thread
+  takes the PREWARM_TOP busiest combinations and their PREWARM_SHAPES most
+  requested shapes, builds one representative listing per shape (median area
+  and price) and generates the semantic cache's sections for it in the
+  `background` scheduling lane, so the sections land in the cache
+- a shape is warmed again after PREWARM_REFRESH_HOURS, and only while the
+  backend is idle: at most PREWARM_MAX_INTERACTIVE interactive LLM calls
+  running or waiting, and its circuit breaker closed
+
+Warming needs an LLM GENERATION_MODE and SEMANTIC_CACHE; otherwise the job
+does not start. Outcomes are counted in prewarm_listings_total.
+"""
+
+import heapq
+import statistics
+import threading
+import time
+from collections import Counter, deque
+from typing import Deque, Dict, Iterable, List, Optional, Tuple
+from .config import settings
+from .generator import generate_structured
+from .llm.breaker import get_breaker
+from .llm.routing import routing_signature
+from .llm.scheduler import get_scheduler, use_priority
+from .llm.semantic_cache import get_semantic_cache
+from .metrics import PREWARM_LISTINGS
+from .schemas import PropertyInput
+
+# (city, neighborhood, language, listing_type)
+Combination = Tuple[str, str, str, str]
+# (bedrooms, bathrooms, balcony, elevator, parking); an amenity the listing leaves out stays None,
+# as the semantic cache tells None from False
+Shape = Tuple[int, int, Optional[bool], Optional[bool], Optional[bool]]
+
+# Tracked combinations; the least requested are forgotten beyond this
+_MAX_COMBINATIONS = 10000
+# Recent shapes, and areas and prices per shape, kept per combination
+_RECENT_SHAPES = 200
+_RECENT_VALUES = 50
+
+
+class _Demand:
+    """Decaying request count and recent shapes of one combination."""
+
+    __slots__ = ("score", "updated", "shapes", "areas", "prices")
+
+    def __init__(self, now: float):
+        self.score = 0.0
+        self.updated = now
+        self.shapes: Deque[Shape] = deque(maxlen=_RECENT_SHAPES)
+        self.areas: Dict[Shape, Deque[float]] = {}
+        self.prices: Dict[Shape, Deque[float]] = {}
+
+    def decayed(self, now: float, half_life: float) -> float:
+        return self.score * 0.5 ** ((now - self.updated) / half_life)
+
+
+class RequestStats:
+    """Recent demand per (city, neighborhood, language, listing_type), shared by all request handlers."""
+
+    def __init__(self, half_life_hours: float):
+        self.half_life = max(half_life_hours, 0.001) * 3600
+        self._demand: Dict[Combination, _Demand] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, data: PropertyInput, languages: Optional[Iterable[str]] = None, now: Optional[float] = None) -> None:
+        """Count one request for a listing (in each of `languages` when given, else its own)."""
+        now = time.time() if now is None else now
+        location, features = data.location, data.features
+        shape = (features.bedrooms, features.bathrooms, features.balcony, features.elevator, features.parking)
+        with self._lock:
+            for language in languages or (data.language,):
+                combination = (location.city, location.neighborhood, language, data.listing_type)
+                demand = self._demand.get(combination)
+                if demand is None:
+                    if len(self._demand) >= _MAX_COMBINATIONS:
+                        self._forget(now)
+                    demand = self._demand[combination] = _Demand(now)
+                demand.score = demand.decayed(now, self.half_life) + 1.0
+                demand.updated = now
+                demand.shapes.append(shape)
+                demand.areas.setdefault(shape, deque(maxlen=_RECENT_VALUES)).append(features.area_sqm)
+                demand.prices.setdefault(shape, deque(maxlen=_RECENT_VALUES)).append(data.price)
+
+    def _forget(self, now: float) -> None:
+        # Drop the least requested tenth to make room
+        ranked = sorted(self._demand, key=lambda combination: self._demand[combination].decayed(now, self.half_life))
+        for combination in ranked[:max(1, len(ranked) // 10)]:
+            del self._demand[combination]
+
+    def busiest(self, top: int, shapes: int, now: Optional[float] = None) -> List[Tuple[Combination, List[Tuple[Shape, float, float]]]]:
+        """
+        The `top` most requested combinations, busiest first, each with its
+        `shapes` most requested shapes and their median area and price.
+        """
+        now = time.time() if now is None else now
+        with self._lock:
+            ranked = heapq.nlargest(top, self._demand.items(), key=lambda item: item[1].decayed(now, self.half_life))
+            busiest = []
+            for combination, demand in ranked:
+                common = [shape for shape, _ in Counter(demand.shapes).most_common(shapes)]
+                busiest.append((combination, [
+                    (shape, statistics.median(demand.areas[shape]), statistics.median(demand.prices[shape]))
+                    for shape in common
+                ]))
+        return busiest
+
+    def __len__(self) -> int:
+        return len(self._demand)
+
+
+request_stats = RequestStats(settings.PREWARM_HALF_LIFE_HOURS)
+
+
+def observe(data: PropertyInput, languages: Optional[Iterable[str]] = None) -> None:
+    """Count a request for the warm-up job; a no-op unless PREWARM_ENABLED."""
+    if settings.PREWARM_ENABLED:
+        request_stats.observe(data, languages)
+
+
+def parse_hours(spec: str) -> Optional[Tuple[int, int]]:
+    """Parse "start-end" local hours (end exclusive, may wrap past midnight); None for empty (any hour)."""
+    if not spec.strip():
+        return None
+    try:
+        start, end = (int(part) % 24 for part in spec.split("-", 1))
+    except ValueError:
+        print(f"Warning: ignoring malformed PREWARM_HOURS '{spec}', warming at any hour")
+        return None
+    return start, end
+
+
+def in_window(hours: Optional[Tuple[int, int]], hour: int) -> bool:
+    if hours is None:
+        return True
+    start, end = hours
+    return start <= hour < end if start <= end else hour >= start or hour < end
+
+
+def _idle(mode: str) -> bool:
+    if settings.BREAKER_ENABLED and get_breaker(mode).is_open():
+        return False
+    return get_scheduler(mode).busy_slots(("interactive",)) <= settings.PREWARM_MAX_INTERACTIVE
+
+
+class Prewarmer:
+    """Background job that pre-generates shared sections for the busiest combinations."""
+
+    def __init__(self, stats: RequestStats):
+        self.stats = stats
+        self.hours = parse_hours(settings.PREWARM_HOURS)
+        self._warmed: Dict[tuple, float] = {}
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def run_once(self, now: Optional[float] = None) -> Dict[str, int]:
+        """
+        Warm the busiest combinations once, if inside the warm-up hours;
+        returns how many listings were warmed, skipped as fresh, or left for
+        later because the backend got busy.
+        """
+        summary = {"warmed": 0, "fallback": 0, "fresh": 0, "deferred": 0}
+        mode = settings.GENERATION_MODE
+        cache = get_semantic_cache()
+        now = time.time() if now is None else now
+        if mode not in ("openai", "ollama") or cache is None or not in_window(self.hours, time.localtime(now).tm_hour):
+            return summary
+        signature = routing_signature(mode)
+        refresh = settings.PREWARM_REFRESH_HOURS * 3600
+        for (city, neighborhood, language, listing_type), shapes in self.stats.busiest(settings.PREWARM_TOP, settings.PREWARM_SHAPES, now):
+            for shape, area, price in shapes:
+                key = (mode, signature, city, neighborhood, language, listing_type, shape)
+                if now - self._warmed.get(key, float("-inf")) < refresh:
+                    summary["fresh"] += 1
+                    continue
+                if self._stop.is_set() or not _idle(mode):
+                    summary["deferred"] += 1
+                    continue
+                bedrooms, bathrooms, balcony, elevator, parking = shape
+                listing = PropertyInput(
+                    title="", price=price, listing_type=listing_type, language=language,
+                    location={"city": city, "neighborhood": neighborhood},
+                    features={"bedrooms": bedrooms, "bathrooms": bathrooms, "area_sqm": area,
+                              "balcony": balcony, "elevator": elevator, "parking": parking},
+                )
+                with use_priority("background"):
+                    result = generate_structured(listing, mode, only=cache.sections)
+                outcome = "fallback" if result.fallback else "warmed"
+                PREWARM_LISTINGS.inc(mode, outcome)
+                summary[outcome] += 1
+                if not result.fallback:
+                    self._warmed[key] = now
+        return summary
+
+    def _loop(self) -> None:
+        while not self._stop.wait(settings.PREWARM_INTERVAL_SECONDS):
+            try:
+                self.run_once()
+            except Exception as e:
+                print(f"Warning: pre-generation run failed ({e})")
+
+    def start(self) -> None:
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._loop, name="prewarm", daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+
+_prewarmer: Optional[Prewarmer] = None
+
+
+def start() -> bool:
+    """Start the warm-up job when PREWARM_ENABLED, an LLM mode and the semantic cache are configured."""
+    global _prewarmer
+    if not settings.PREWARM_ENABLED or settings.GENERATION_MODE not in ("openai", "ollama"):
+        return False
+    if get_semantic_cache() is None:
+        print("Warning: PREWARM_ENABLED needs SEMANTIC_CACHE (and NumPy) to keep warmed sections; pre-generation disabled")
+        return False
+    if _prewarmer is None:
+        _prewarmer = Prewarmer(request_stats)
+    _prewarmer.start()
+    return True
+
+
+def stop() -> None:
+    if _prewarmer is not None:
+        _prewarmer.stop()
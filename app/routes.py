@@ -1,10 +1,31 @@
-from fastapi import APIRouter, HTTPException
-from .schemas import PropertyInput, ContentOutput
-from .generator import generate_content
+import asyncio
+import time
+from functools import partial
+from fastapi import APIRouter, Header, HTTPException, Query, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import PlainTextResponse
+from typing import Any, Callable, Dict, Iterable, List, Literal, Optional, Tuple, Union
+from .schemas import PropertyInput, ContentOutput, BatchOutput, MultilingualOutput
+from .batch import validate_batch
+from .generator import GeneratedContent, generate_multilingual, generate_structured
 from .config import settings
+from .content_store import pregenerated
+from .metrics import IN_FLIGHT, LOAD_SHED, QUEUE_WAIT, REQUESTS, REQUEST_LATENCY, render_metrics
+from .admission import Overloaded, get_controller
+from .llm.breaker import breaker_states, get_breaker
+from .llm.replay import record_request
+from .llm.scheduler import current_priority, use_priority
+from .serialization import FastJSONResponse
+from .singleflight import flight_key, generation_flights
+from .tracing import current_span, record_span
+from . import prewarm, workers
 
 router = APIRouter()
 
+IN_FLIGHT.set(0, "/generate")
+IN_FLIGHT.set(0, "/generate/batch")
+IN_FLIGHT.set(0, "/generate/multilingual")
+
 @router.get("/status")
 def get_status():
     """Get current configuration status."""
@@ -13,14 +34,295 @@ def get_status():
         "openai_model": settings.OPENAI_MODEL if settings.GENERATION_MODE == "openai" else None,
         "ollama_model": settings.OLLAMA_MODEL if settings.GENERATION_MODE == "ollama" else None,
         "ollama_url": settings.OLLAMA_BASE_URL if settings.GENERATION_MODE == "ollama" else None,
+        "circuit_breakers": breaker_states(),
         "status": "ready"
     }
 
-@router.post("/generate", response_model=ContentOutput)
-def generate(property_input: PropertyInput):
-    """Generate SEO-optimized real estate content."""
+@router.get("/metrics", response_class=PlainTextResponse)
+def get_metrics():
+    """Expose in-process metrics in the Prometheus text format."""
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+def _build_output(result: GeneratedContent, output: str, cache: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Build the ContentOutput payload for the requested format.
+    
+    The payload is assembled from values we produced ourselves, so it is
+    encoded directly (see FastJSONResponse) instead of being validated against
+    the response model again. Only the fields of the format are filled, and
+    the joined HTML is built only when asked for.
+    """
+    payload: Dict[str, Any] = {}
+    if output in ("html", "full"):
+        payload["content"] = result.html
+    if output in ("sections", "full"):
+        payload["sections"] = result.sections
+        metadata = {
+            "mode": result.mode,
+            "backend": result.backend,
+            "fallback": result.fallback,
+            "total_ms": round(result.total_ms, 3),
+            "section_ms": result.section_ms,
+        }
+        # The result object may be shared between requests; per-request
+        # cache status is passed separately
+        cache = cache or result.cache
+        if cache is not None:
+            metadata["cache"] = cache
+        payload["metadata"] = metadata
+    return payload
+
+def _run(property_input: PropertyInput, submitted: float, generation_mode: Optional[str] = None) -> GeneratedContent:
+    # Generation is blocking (template rendering or sync LLM clients), so it
+    # runs on the threadpool; the time spent waiting for a free thread is
+    # the queue wait.
+    QUEUE_WAIT.observe(time.perf_counter() - submitted, "threadpool")
+    return generate_structured(property_input, generation_mode)
+
+def _run_multilingual(property_input: PropertyInput, languages: List[str], translate: bool, submitted: float,
+                      generation_mode: Optional[str] = None) -> Dict[str, GeneratedContent]:
+    QUEUE_WAIT.observe(time.perf_counter() - submitted, "threadpool")
+    return generate_multilingual(property_input, languages, generation_mode, translate)
+
+def _contents(result: Union[GeneratedContent, Dict[str, GeneratedContent]]) -> Iterable[GeneratedContent]:
+    """The pages of a result: one for /generate, one per language for /generate/multilingual."""
+    return result.values() if isinstance(result, dict) else (result,)
+
+async def _generate(run: Callable[..., Any], mode: str, priority: str, enqueued: float) -> Any:
+    """Run a blocking generation `run(submitted, generation_mode=None)` on the threadpool, through admission control."""
+    # With the backend's breaker open the request is served from templates
+    # in microseconds; it needs no LLM admission slot
+    breaker_open = settings.BREAKER_ENABLED and mode in ("openai", "ollama") and get_breaker(mode).is_open()
+    if breaker_open or not (settings.ADMISSION_CONTROL and mode in ("openai", "ollama")):
+        return await run_in_threadpool(run, enqueued)
+    return await _generate_admitted(run, mode, priority, enqueued)
+
+async def _generate_admitted(run: Callable[..., Any], mode: str, priority: str, enqueued: float) -> Any:
+    # LLM generations pass the adaptive admission controller; see app/admission.py
+    controller = get_controller(mode, priority)
+    try:
+        await controller.acquire()
+    except Overloaded:
+        if settings.ADMISSION_OVERLOAD_ACTION != "template":
+            LOAD_SHED.inc(mode, "rejected")
+            raise
+        LOAD_SHED.inc(mode, "downgraded")
+        result = await run_in_threadpool(run, time.perf_counter(), "template")
+        for content in _contents(result):
+            content.fallback = True
+        return result
+    admitted = time.perf_counter()
+    QUEUE_WAIT.observe(admitted - enqueued, "admission")
+    result = None
+    try:
+        result = await run_in_threadpool(run, admitted)
+        return result
+    finally:
+        # Failures and template fallbacks (rate limits, timeouts) count as congestion
+        failed = result is None or any(content.fallback for content in _contents(result))
+        controller.release(time.perf_counter() - admitted, failed)
+
+async def _generate_one(property_input: PropertyInput, mode: str, priority: str, enqueued: float) -> GeneratedContent:
+    if workers.uses_pool():
+        return await workers.generate_in_pool(property_input)
+    return await _generate(partial(_run, property_input), mode, priority, enqueued)
+
+async def _generate_shared(property_input: PropertyInput, mode: str, priority: str, enqueued: float) -> Tuple[GeneratedContent, bool]:
+    """Generate one listing, joining an identical in-flight generation when single-flight is on."""
+    if settings.SINGLE_FLIGHT:
+        # Only requests in the same lane and of the same tenant share a generation
+        lane, tenant = current_priority()
+        return await generation_flights.run(
+            flight_key(property_input, lane, tenant), lambda: _generate_one(property_input, mode, priority, enqueued)
+        )
+    return await _generate_one(property_input, mode, priority, enqueued), False
+
+# response_model documents the schema; the handler returns a FastJSONResponse,
+# so FastAPI does not re-validate or re-encode the payload
+@router.post("/generate", response_model=ContentOutput, response_model_exclude_none=True, response_class=FastJSONResponse)
+async def generate(
+    property_input: PropertyInput,
+    output: Literal["html", "sections", "full"] = "html",
+    priority: Literal["interactive", "bulk", "background"] = "interactive",
+    x_tenant_id: str = Header("", description="Tenant the request is accounted to for LLM quotas"),
+    listing_id: Optional[str] = None,
+):
+    """
+    Generate SEO-optimized real estate content.
+    
+    `output` selects the response shape: "html" (default) returns the joined
+    page as `content`, "sections" returns one field per section plus metadata
+    (mode, backend, cache status, timings), "full" returns both.
+    
+    `priority` selects the LLM scheduling lane: catalogue jobs should send
+    "bulk" or "background" so interactive requests keep their latency.
+    
+    With `listing_id` and CONTENT_STORE_PATH set, content pre-generated for
+    exactly this listing is served from the content store (cache "store").
+    """
+    mode = settings.GENERATION_MODE
+    enqueued = time.perf_counter()
+    root = current_span()
+    if root is not None:
+        # Body parsing and PropertyInput validation happen before the handler runs
+        record_span("validation", root.start, enqueued)
+    # With LLM_REPLAY=record the request is kept for replays (python -m benchmarks.replay)
+    record_request("/generate", {"output": output, "priority": priority, "listing_id": listing_id}, x_tenant_id,
+                   property_input.model_dump_json)
+
+    # Demand per neighborhood and shape drives off-peak pre-generation (see app/prewarm.py)
+    prewarm.observe(property_input)
+    IN_FLIGHT.inc("/generate")
+    try:
+        # The lane and tenant travel with the context into the threadpool
+        # (and into a shared single-flight task started by this request)
+        stored = pregenerated(listing_id, property_input) if listing_id and settings.CONTENT_STORE_PATH else None
+        if stored is not None:
+            REQUESTS.inc(mode, "success")
+            return FastJSONResponse(_build_output(stored, output, "store"))
+        with use_priority(priority, x_tenant_id):
+            result, shared = await _generate_shared(property_input, mode, priority, enqueued)
+        REQUESTS.inc(mode, "success")
+        return FastJSONResponse(_build_output(result, output, "shared" if shared else None))
+    except Overloaded as e:
+        REQUESTS.inc(mode, "shed")
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": str(int(e.retry_after))})
+    except Exception as e:
+        REQUESTS.inc(mode, "error")
+        raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        IN_FLIGHT.dec("/generate")
+        REQUEST_LATENCY.observe(time.perf_counter() - enqueued, mode)
+
+# The body is read as raw bytes and validated in bulk (app/batch.py), so its
+# schema is declared here instead of through a parameter
+_BATCH_BODY = {"requestBody": {"required": True, "content": {"application/json": {"schema": {
+    "type": "array", "items": {"$ref": "#/components/schemas/PropertyInput"},
+}}}}}
+
+async def _read_batch_body(request: Request) -> bytes:
+    """
+    Read a batch body, rejecting it with 413 before validation once it is
+    larger than BATCH_MAX_ITEMS listings of BATCH_MAX_ITEM_BYTES each.
+    """
+    limit = settings.BATCH_MAX_ITEMS * settings.BATCH_MAX_ITEM_BYTES
+    detail = f"Batch body exceeds {limit} bytes (BATCH_MAX_ITEMS={settings.BATCH_MAX_ITEMS} x BATCH_MAX_ITEM_BYTES={settings.BATCH_MAX_ITEM_BYTES})"
+    length = request.headers.get("content-length", "")
+    if length.isdigit() and int(length) > limit:
+        raise HTTPException(status_code=413, detail=detail)
+    # Chunked bodies carry no length: stop reading as soon as they pass the bound
+    chunks, size = [], 0
+    async for chunk in request.stream():
+        size += len(chunk)
+        if size > limit:
+            raise HTTPException(status_code=413, detail=detail)
+        chunks.append(chunk)
+    return b"".join(chunks)
+
+@router.post("/generate/batch", response_model=BatchOutput, response_model_exclude_none=True,
+             response_class=FastJSONResponse, openapi_extra=_BATCH_BODY)
+async def generate_batch(
+    request: Request,
+    output: Literal["html", "sections", "full"] = "html",
+    priority: Literal["interactive", "bulk", "background"] = "bulk",
+    x_tenant_id: str = Header("", description="Tenant the request is accounted to for LLM quotas"),
+):
+    """
+    Generate content for a JSON array of listings.
+    
+    The array is validated in one pass; listings that fail validation are
+    listed in `errors` (by position) and do not fail the others. Each valid
+    listing gets a `results` entry with its position and the same payload as
+    /generate, or `error` and `status` when its generation failed. Up to
+    BATCH_CONCURRENCY listings are generated at a time, in the `bulk` lane
+    unless `priority` says otherwise.
+    """
+    mode = settings.GENERATION_MODE
+    received = time.perf_counter()
+    body = await _read_batch_body(request)
+    record_request("/generate/batch", {"output": output, "priority": priority}, x_tenant_id, lambda: body.decode("utf-8", "replace"))
+    try:
+        batch = await run_in_threadpool(validate_batch, body)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    enqueued = time.perf_counter()
+    record_span("validation", received, enqueued, listings=len(batch))
+    if len(batch) > settings.BATCH_MAX_ITEMS:
+        raise HTTPException(status_code=413, detail=f"Batch of {len(batch)} listings exceeds BATCH_MAX_ITEMS={settings.BATCH_MAX_ITEMS}")
+
+    slots = asyncio.Semaphore(max(1, settings.BATCH_CONCURRENCY))
+
+    async def _generate_item(index: int, property_input: PropertyInput) -> Dict[str, Any]:
+        prewarm.observe(property_input)
+        async with slots:
+            started = time.perf_counter()
+            try:
+                result, shared = await _generate_shared(property_input, mode, priority, started)
+                REQUESTS.inc(mode, "success")
+                return {"index": index, **_build_output(result, output, "shared" if shared else None)}
+            except Overloaded as e:
+                REQUESTS.inc(mode, "shed")
+                return {"index": index, "error": str(e), "status": 503}
+            except Exception as e:
+                REQUESTS.inc(mode, "error")
+                return {"index": index, "error": str(e), "status": 500}
+            finally:
+                REQUEST_LATENCY.observe(time.perf_counter() - started, mode)
+
+    IN_FLIGHT.inc("/generate/batch")
+    try:
+        with use_priority(priority, x_tenant_id):
+            results = await asyncio.gather(*(_generate_item(index, item) for index, item in batch.items))
+    finally:
+        IN_FLIGHT.dec("/generate/batch")
+    return FastJSONResponse({"results": results, "errors": batch.errors})
+
+@router.post("/generate/multilingual", response_model=MultilingualOutput, response_model_exclude_none=True,
+             response_class=FastJSONResponse)
+async def generate_multilingual_content(
+    property_input: PropertyInput,
+    languages: str = Query("en,pt,es", description="Comma-separated language codes; the listing's own language is ignored"),
+    translate: bool = Query(False, description="Generate the first language and translate it into the others in one LLM call"),
+    output: Literal["html", "sections", "full"] = "html",
+    priority: Literal["interactive", "bulk", "background"] = "interactive",
+    x_tenant_id: str = Header("", description="Tenant the request is accounted to for LLM quotas"),
+):
+    """
+    Generate one listing in several languages with one request.
+    
+    The listing is validated once; with an LLM backend all language x section
+    calls run concurrently, and with `translate` only the first language is
+    generated and then translated in one batched call. Returns one /generate
+    payload per language under `languages`.
+    """
+    mode = settings.GENERATION_MODE
+    enqueued = time.perf_counter()
+    root = current_span()
+    if root is not None:
+        record_span("validation", root.start, enqueued)
+    language_list = list(dict.fromkeys(language.strip() for language in languages.split(",") if language.strip()))
+    if not language_list:
+        raise HTTPException(status_code=422, detail="languages must name at least one language")
+    record_request("/generate/multilingual", {"languages": languages, "translate": translate, "output": output, "priority": priority},
+                   x_tenant_id, property_input.model_dump_json)
+
+    prewarm.observe(property_input, language_list)
+    IN_FLIGHT.inc("/generate/multilingual")
     try:
-        content = generate_content(property_input)
-        return ContentOutput(content=content)
+        if workers.uses_pool():
+            # Template mode: all languages render in one worker process
+            results = await workers.generate_multilingual_in_pool(property_input, language_list)
+        else:
+            with use_priority(priority, x_tenant_id):
+                results = await _generate(partial(_run_multilingual, property_input, language_list, translate), mode, priority, enqueued)
+        REQUESTS.inc(mode, "success")
+        return FastJSONResponse({"languages": {language: _build_output(result, output) for language, result in results.items()}})
+    except Overloaded as e:
+        REQUESTS.inc(mode, "shed")
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": str(int(e.retry_after))})
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e)) 
\ No newline at end of file
+        REQUESTS.inc(mode, "error")
+        raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        IN_FLIGHT.dec("/generate/multilingual")
+        REQUEST_LATENCY.observe(time.perf_counter() - enqueued, mode)
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import Optional
+from typing import Any, Dict, List, Optional
 
 class Location(BaseModel):
     city: str
@@ -23,5 +23,42 @@ class PropertyInput(BaseModel):
     listing_type: str = Field(..., description="'sale' or 'rent'")
     language: str = Field("en", description="Language code: 'en' or 'pt' or 'es'")
 
+class ContentSections(BaseModel):
+    """One HTML fragment per generated section."""
+    title: str
+    meta_description: str
+    h1: str
+    description: str
+    key_features: str
+    neighborhood: str
+    call_to_action: str
+
+class ContentMetadata(BaseModel):
+    mode: str = Field(..., description="Configured generation mode")
+    backend: str = Field(..., description="Backend that produced the content ('template' after a fallback)")
+    fallback: bool = False
+    cache: Optional[str] = Field(None, description="Cache status, when a cache was consulted")
+    total_ms: float
+    section_ms: Dict[str, float] = Field(default_factory=dict, description="Generation time per section")
+
 class ContentOutput(BaseModel):
-    content: str 
\ No newline at end of file
+    # Which fields are filled depends on the requested output format
+    content: Optional[str] = Field(None, description="All sections joined into one HTML string")
+    sections: Optional[ContentSections] = None
+    metadata: Optional[ContentMetadata] = None 
+
+class BatchItemOutput(ContentOutput):
+    index: int = Field(..., description="Position of the listing in the submitted array")
+    error: Optional[str] = Field(None, description="Why generation failed for this listing")
+    status: Optional[int] = Field(None, description="HTTP status /generate would have answered, when it failed")
+
+class BatchValidationError(BaseModel):
+    index: int = Field(..., description="Position of the listing in the submitted array")
+    errors: List[Dict[str, Any]] = Field(..., description="Validation errors (loc, msg, type) within the listing")
+
+class BatchOutput(BaseModel):
+    results: List[BatchItemOutput] = Field(..., description="One entry per valid listing, in submission order")
+    errors: List[BatchValidationError] = Field(default_factory=list, description="Listings that failed validation")
+
+class MultilingualOutput(BaseModel):
+    languages: Dict[str, ContentOutput] = Field(..., description="Content per requested language, in request order")
@@ -0,0 +1,38 @@
+"""
+Fast JSON responses for the hot /generate path.
+
+Payloads built by the routes themselves (plain dicts of strings and numbers)
+are encoded directly, without FastAPI validating them against the
+response_model and running jsonable_encoder first. orjson is used when it is
+installed, with the standard library as a fallback.
+"""
+
+import json
+from typing import Any, Union
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:  # optional dependency
+    orjson = None
+
+
+def dumps(payload: Any) -> bytes:
+    """Encode a payload of JSON-native types as UTF-8 JSON."""
+    if orjson is not None:
+        return orjson.dumps(payload)
+    return json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def loads(data: Union[bytes, memoryview]) -> Any:
+    """Decode UTF-8 JSON; orjson reads memoryviews (e.g. slices of an mmap) without copying."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(bytes(data))
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse for trusted payloads: no validation, orjson encoding when available."""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
@@ -0,0 +1,83 @@
+"""
+Single-flight deduplication of concurrent identical /generate requests.
+
+Portals resubmit the same listing several times within a second (retries,
+double clicks, thundering herds after an outage). While a generation for a
+listing is in flight, identical requests wait for it instead of starting
+their own seven LLM calls, and every caller receives the same result. Nothing
+is kept once the generation finishes; this is not a cache.
+
+Requests only share a generation within the same scheduling lane and tenant
+(see app/llm/scheduler.py): an interactive request never waits on a bulk or
+background generation, and every tenant's generations count against its own
+LLM quota.
+"""
+
+import asyncio
+import hashlib
+from typing import Any, Awaitable, Callable, Dict, Tuple
+from .config import settings
+from .llm.routing import routing_signature
+from .metrics import record_cache_lookup
+from .schemas import PropertyInput
+
+
+def listing_key(data: PropertyInput) -> str:
+    """
+    Canonical hash of a listing plus the settings that shape its content.
+
+    model_dump_json emits fields in schema order with normalised values
+    (e.g. 120 and 120.0 for area_sqm), so equal listings hash equally
+    regardless of the JSON key order or formatting clients sent.
+    """
+    digest = hashlib.sha256()
+    digest.update(data.model_dump_json().encode("utf-8"))
+    if settings.GENERATION_MODE in ("openai", "ollama"):
+        # The model, or the per-section routing when configured (see app/llm/routing.py)
+        digest.update(f"|{settings.GENERATION_MODE}|{routing_signature(settings.GENERATION_MODE)}".encode("utf-8"))
+    else:
+        digest.update(b"|template")
+    return digest.hexdigest()
+
+
+def flight_key(data: PropertyInput, lane: str, tenant: str) -> str:
+    """Single-flight key: the listing key within one scheduling lane and tenant."""
+    return f"{listing_key(data)}|{lane}|{tenant}"
+
+
+class SingleFlight:
+    """Share one in-flight asyncio task between callers using the same key."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self._inflight: Dict[str, asyncio.Task] = {}
+
+    def __len__(self) -> int:
+        return len(self._inflight)
+
+    async def run(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Tuple[Any, bool]:
+        """
+        Await fn() once per key among concurrent callers.
+
+        Returns (result, shared), where shared is True for callers that joined
+        a generation started by another request. Exceptions reach every caller.
+        """
+        task = self._inflight.get(key)
+        shared = task is not None
+        if task is None:
+            task = asyncio.ensure_future(fn())
+            self._inflight[key] = task
+            task.add_done_callback(lambda done: self._finish(key, done))
+        record_cache_lookup(self.name, shared)
+        # shield: a caller that disconnects must not cancel the generation the
+        # other callers are waiting for
+        return await asyncio.shield(task), shared
+
+    def _finish(self, key: str, task: asyncio.Task) -> None:
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        if not task.cancelled():
+            task.exception()  # mark as retrieved even if every caller went away
+
+
+generation_flights = SingleFlight("singleflight")
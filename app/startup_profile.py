@@ -0,0 +1,110 @@
+"""
+Startup profile: import time per module for a cold server boot.
+
+Runs a fresh interpreter with `-X importtime` that imports app.main and warms
+the active backend exactly like the startup event does, then reports the
+slowest modules (self and cumulative time) and the total per top-level package.
+
+Usage:
+    python -m app.startup_profile                       # uses GENERATION_MODE from the environment/.env
+    python -m app.startup_profile --mode openai --top 30
+    python -m app.startup_profile --json > startup.json
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+from typing import Any, Dict, List
+
+_BOOT_SCRIPT = """
+import json, time
+started = time.perf_counter()
+import app.main
+imported = time.perf_counter()
+from app.generator import warm_up
+warm = warm_up()
+print(json.dumps({"import_app_s": imported - started, "warm_up_s": warm}))
+"""
+
+
+def _parse_importtime(stderr: str) -> List[Dict[str, Any]]:
+    """Parse `-X importtime` lines: 'import time: self | cumulative | name'."""
+    modules = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        name = name[1:]  # drop the separator space; the remaining indent encodes nesting
+        depth = (len(name) - len(name.lstrip())) // 2
+        modules.append({
+            "module": name.strip(),
+            "depth": depth,
+            "self_ms": int(self_us) / 1000,
+            "cumulative_ms": int(cumulative_us) / 1000,
+        })
+    return modules
+
+
+def profile_startup(mode: str = "") -> Dict[str, Any]:
+    """Boot the app in a child interpreter and collect per-module import times."""
+    env = dict(os.environ)
+    if mode:
+        env["GENERATION_MODE"] = mode
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", _BOOT_SCRIPT],
+        env=env, capture_output=True, text=True,
+        cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"Startup failed:\n{result.stderr[-2000:]}")
+
+    modules = _parse_importtime(result.stderr)
+    timings = json.loads(result.stdout.strip().splitlines()[-1])
+    packages: Dict[str, float] = {}
+    for module in modules:
+        root = module["module"].split(".")[0]
+        packages[root] = packages.get(root, 0.0) + module["self_ms"]
+
+    return {
+        "generation_mode": env.get("GENERATION_MODE", ""),
+        "import_app_ms": round(timings["import_app_s"] * 1000, 1),
+        "warm_up_ms": round(timings["warm_up_s"] * 1000, 1),
+        "modules_imported": len(modules),
+        "packages_ms": dict(sorted(((name, round(ms, 1)) for name, ms in packages.items()), key=lambda item: -item[1])),
+        "modules": modules,
+    }
+
+
+def _print_report(report: Dict[str, Any], top: int) -> None:
+    print(f"🚀 Startup profile (GENERATION_MODE={report['generation_mode'] or 'default'})")
+    print(f"   import app.main: {report['import_app_ms']} ms")
+    print(f"   backend warm-up: {report['warm_up_ms']} ms")
+    print(f"   modules imported: {report['modules_imported']}")
+
+    print(f"\nTop {top} packages by total import time:")
+    for name, ms in list(report["packages_ms"].items())[:top]:
+        print(f"   {ms:>9.1f} ms  {name}")
+
+    print(f"\nTop {top} modules by self time:")
+    for module in sorted(report["modules"], key=lambda m: -m["self_ms"])[:top]:
+        print(f"   {module['self_ms']:>9.1f} ms  {module['module']} (cumulative {module['cumulative_ms']:.1f} ms)")
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Report import time per module for a cold server start.")
+    parser.add_argument("--mode", choices=["template", "openai", "ollama"], help="override GENERATION_MODE")
+    parser.add_argument("--top", type=int, default=20)
+    parser.add_argument("--json", action="store_true", help="print the full report as JSON")
+    args = parser.parse_args(argv)
+
+    report = profile_startup(args.mode or "")
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        _print_report(report, args.top)
+
+
+if __name__ == "__main__":
+    main()
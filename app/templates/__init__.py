@@ -1 +1,69 @@
- 
\ No newline at end of file
+"""
+Template language registry.
+
+Every sub-package of app/templates that contains a content.py module is a
+template language (app/templates/<lang>/content.py). Languages are discovered
+from the package directory, preloaded at startup and dispatched with a single
+dict lookup, so adding a locale means dropping in a new module.
+"""
+
+import importlib
+import importlib.util
+import pkgutil
+from types import ModuleType
+from typing import Dict, Iterable, List, Optional
+from ..config import settings
+
+_registry: Dict[str, ModuleType] = {}
+_discovered: Optional[List[str]] = None
+# Unknown language codes already reported, bounded since codes come from clients
+_warned: set = set()
+
+
+def available_languages() -> List[str]:
+    """Language codes with a content module under app/templates."""
+    global _discovered
+    if _discovered is None:
+        _discovered = sorted(
+            info.name for info in pkgutil.iter_modules(__path__)
+            if info.ispkg and importlib.util.find_spec(f"{__name__}.{info.name}.content") is not None
+        )
+    return _discovered
+
+
+def _load(language: str) -> ModuleType:
+    module = importlib.import_module(f"{__name__}.{language}.content")
+    _registry[language] = module
+    return module
+
+
+def preload(languages: Optional[Iterable[str]] = None) -> List[str]:
+    """Import the template modules of the given (default: configured or all) languages."""
+    if languages is None:
+        configured = [code.strip() for code in settings.TEMPLATE_LANGUAGES.split(",") if code.strip()]
+        languages = configured or available_languages()
+    loaded = []
+    for language in languages:
+        if language not in available_languages():
+            raise ValueError(f"No template module for language '{language}' (expected app/templates/{language}/content.py)")
+        if language not in _registry:
+            _load(language)
+        loaded.append(language)
+    return loaded
+
+
+def get_template(language: str) -> ModuleType:
+    """Return the template module for a language, falling back to DEFAULT_LANGUAGE."""
+    module = _registry.get(language)
+    if module is not None:
+        return module
+    if language in available_languages():
+        # Not preloaded (e.g. direct generate_content use outside the server)
+        return _load(language)
+
+    fallback = settings.DEFAULT_LANGUAGE
+    if language not in _warned and len(_warned) < 100:
+        _warned.add(language)
+        print(f"Warning: no templates for language '{language}', using '{fallback}'")
+    module = _registry.get(fallback)
+    return module if module is not None else _load(fallback)
@@ -0,0 +1,199 @@
+import json
+import os
+import sys
+import threading
+import time
+import uuid
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional
+from .config import settings
+
+# Span currently active in this context (request task or worker thread).
+_current_span: ContextVar[Optional["Span"]] = ContextVar("current_span", default=None)
+
+
+class _NoopSpan:
+    """Shared do-nothing span returned while tracing is disabled."""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        pass
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+class Trace:
+    """All spans belonging to one request (or one direct generate_content call)."""
+
+    __slots__ = ("trace_id", "spans", "wall_start", "perf_start")
+
+    def __init__(self):
+        self.trace_id = uuid.uuid4().hex
+        self.spans: List["Span"] = []
+        # Spans are timed with perf_counter; keep one wall clock anchor for export
+        self.wall_start = time.time()
+        self.perf_start = time.perf_counter()
+
+
+class Span:
+    """A timed operation inside a trace, used as a context manager."""
+
+    __slots__ = ("name", "trace", "span_id", "parent_id", "start", "end", "attributes", "_token")
+
+    def __init__(self, name: str, trace: Trace, parent_id: Optional[str], attributes: Dict[str, Any]):
+        self.name = name
+        self.trace = trace
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent_id = parent_id
+        self.start = 0.0
+        self.end = 0.0
+        self.attributes = attributes
+        self._token = None
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        self._token = _current_span.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.end = time.perf_counter()
+        _current_span.reset(self._token)
+        if exc_type is not None:
+            self.attributes["error"] = exc_type.__name__
+        self.trace.spans.append(self)
+        if self.parent_id is None:
+            _exporter.export(self.trace)
+        return False
+
+    @property
+    def duration_ms(self) -> float:
+        end = self.end or time.perf_counter()
+        return (end - self.start) * 1000
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "trace_id": self.trace.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "start": self.trace.wall_start + (self.start - self.trace.perf_start),
+            "duration_ms": round(self.duration_ms, 3),
+            "attributes": self.attributes,
+        }
+
+
+class SpanExporter:
+    """Writes finished traces as JSON lines to stdout or a local file."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._target: Optional[str] = None
+        self._file = None
+
+    def _stream(self):
+        target = settings.TRACE_EXPORTER
+        if target == "stdout":
+            return sys.stdout
+        if target != self._target:
+            if self._file is not None:
+                self._file.close()
+            directory = os.path.dirname(target)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._file = open(target, "a", encoding="utf-8")
+            self._target = target
+        return self._file
+
+    def export(self, trace: Trace) -> None:
+        if not settings.TRACE_EXPORTER:
+            return
+        lines = "".join(json.dumps(span.to_dict(), default=str) + "\n" for span in trace.spans)
+        with self._lock:
+            stream = self._stream()
+            stream.write(lines)
+            stream.flush()
+
+
+_exporter = SpanExporter()
+
+
+def span(name: str, **attributes: Any):
+    """
+    Start a span as a child of the current one (or as a new trace root).
+
+    Returns a shared no-op span when tracing is disabled, so instrumented code
+    costs a single settings lookup on the hot path.
+    """
+    if not settings.TRACING_ENABLED:
+        return _NOOP_SPAN
+    parent = _current_span.get()
+    if parent is None:
+        return Span(name, Trace(), None, attributes)
+    return Span(name, parent.trace, parent.span_id, attributes)
+
+
+def current_span() -> Optional[Span]:
+    """Return the active span, or None when tracing is off or no trace is open."""
+    return _current_span.get()
+
+
+def record_span(name: str, start: float, end: Optional[float] = None, **attributes: Any) -> None:
+    """Record an already elapsed interval (perf_counter timestamps) under the current span."""
+    parent = _current_span.get()
+    if parent is None:
+        return
+    finished = Span(name, parent.trace, parent.span_id, attributes)
+    finished.start = start
+    finished.end = end if end is not None else time.perf_counter()
+    parent.trace.spans.append(finished)
+
+
+def server_timing(root: Span) -> str:
+    """Build a Server-Timing header value, summing spans that share a name."""
+    totals: Dict[str, List[float]] = {}
+    for finished in root.trace.spans:
+        entry = totals.setdefault(finished.name, [0.0, 0])
+        entry[0] += finished.duration_ms
+        entry[1] += 1
+    parts = [f"total;dur={root.duration_ms:.3f}"]
+    for name, (duration, calls) in totals.items():
+        if name == root.name:
+            continue
+        part = f"{name};dur={duration:.3f}"
+        if calls > 1:
+            part += f';desc="{calls} calls"'
+        parts.append(part)
+    return ", ".join(parts)
+
+
+class TracingMiddleware:
+    """ASGI middleware opening the request span and adding a Server-Timing header."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not settings.TRACING_ENABLED:
+            await self.app(scope, receive, send)
+            return
+
+        with span("request", method=scope["method"], path=scope["path"]) as root:
+            async def send_with_timing(message):
+                if message["type"] == "http.response.start":
+                    headers = list(message.get("headers", []))
+                    headers.append((b"server-timing", server_timing(root).encode("latin-1")))
+                    message = {**message, "headers": headers}
+                await send(message)
+
+            await self.app(scope, receive, send_with_timing)
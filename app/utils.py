@@ -1,6 +1,19 @@
+import html
+import math
 import re
 from typing import Dict, Any
 
+# Character limits per section (SEO requirements); description minimum is 500
+SECTION_LIMITS = {
+    'title': 60,
+    'meta_description': 155,
+    'description': 700,
+}
+
+# Compiled once: validate_content_limits runs on every generated page
+_TAG = re.compile(r'<[^>]+>')
+_META_CONTENT = re.compile(r'content="([^"]*)"')
+
 def format_price(price: float, currency: str = "EUR", language: str = "en") -> str:
     """Format price according to language and currency."""
     if language == "pt":
@@ -21,12 +34,39 @@ def truncate_text(text: str, max_chars: int) -> str:
     if len(text) <= max_chars:
         return text
     
-    truncated = text[:max_chars]
+    # Reserve room for the ellipsis so the result stays within max_chars
+    truncated = text[:max_chars - 3]
     last_space = truncated.rfind(' ')
     if last_space > max_chars * 0.8:  # Only truncate at word boundary if close to limit
         return truncated[:last_space] + "..."
     return truncated + "..."
 
+def smart_truncate(text: str, max_chars: int) -> str:
+    """
+    Shorten text to max_chars, preferring a sentence end, then a word boundary.
+    
+    Used for LLM output that is still over its limit after a re-ask: cutting at
+    a full sentence reads naturally; otherwise the last whole word is kept
+    without an ellipsis (titles and meta descriptions should not end in "...").
+    """
+    text = text.strip()
+    if len(text) <= max_chars:
+        return text
+    window = text[:max_chars + 1]
+    sentence_end = max(window.rfind('. '), window.rfind('! '), window.rfind('? '))
+    if window[-1] in '.!?':
+        sentence_end = max(sentence_end, len(window) - 1)
+    if sentence_end >= max_chars * 0.6:
+        return window[:sentence_end + 1].strip()
+    last_space = window.rfind(' ')
+    if last_space > 0:
+        return window[:last_space].rstrip(' ,;:-–—')
+    return text[:max_chars]
+
+def token_budget(max_chars: int) -> int:
+    """Max completion tokens for a character limit (~3 chars/token in pt/es, plus slack)."""
+    return math.ceil(max_chars / 3) + 10
+
 def get_seo_keywords(data: Dict[str, Any], language: str) -> Dict[str, str]:
     """Generate SEO keywords based on property data and language."""
     location = data.get('location', {})
@@ -65,21 +105,20 @@ def get_seo_keywords(data: Dict[str, Any], language: str) -> Dict[str, str]:
     
     return keywords
 
+def visible_length(html_text: str) -> int:
+    """Number of characters a reader sees: tags removed, entities such as &amp; count as one."""
+    return len(html.unescape(_TAG.sub('', html_text)))
+
 def validate_content_limits(content_dict: Dict[str, str]) -> Dict[str, bool]:
     """Validate that content sections meet character limits."""
-    limits = {
-        'title': 60,
-        'meta_description': 155,
-        'description': 700  # Max limit, minimum is 500
-    }
-    
     results = {}
-    for section, limit in limits.items():
+    for section, limit in SECTION_LIMITS.items():
         if section in content_dict:
-            # Extract text content without HTML tags for accurate counting
-            text_content = re.sub(r'<[^>]+>', '', content_dict[section])
-            results[section] = len(text_content) <= limit
+            html_text = content_dict[section]
+            # The meta description's visible text lives in its content attribute
+            content_attr = _META_CONTENT.search(html_text) if section == 'meta_description' else None
+            results[section] = visible_length(content_attr.group(1) if content_attr else html_text) <= limit
         else:
             results[section] = True
     
-    return results 
\ No newline at end of file
+    return results
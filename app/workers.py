@@ -0,0 +1,110 @@
+import asyncio
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from .config import settings
+from .generator import GeneratedContent, generate_multilingual, generate_structured
+from .metrics import QUEUE_WAIT, WORKER_POOL_RESTARTS, drain_forwarded, registry, start_forwarding
+from .schemas import PropertyInput
+from .templates import preload
+
+# Process pool used when WORKER_MODE=process. Template rendering and HTML
+# assembly are pure Python, so one uvicorn worker is bound to one core; the
+# pool spreads that CPU work across all cores of the node while LLM modes keep
+# their network I/O on the event loop's threadpool.
+_pool: Optional[ProcessPoolExecutor] = None
+
+def _init_worker(overrides: Dict[str, Any]) -> None:
+    """Worker initializer: mirror runtime settings and forward metrics to the parent."""
+    for key, value in overrides.items():
+        setattr(settings, key, value)
+    preload()
+    start_forwarding()
+
+
+def _render(data: PropertyInput) -> Tuple[GeneratedContent, float, List[Tuple[str, str, Tuple[str, ...], float]]]:
+    """Worker entry point: generate content and return it with the start time and metric updates."""
+    started = time.monotonic()
+    result = generate_structured(data)
+    return result, started, drain_forwarded()
+
+
+def _render_multilingual(data: PropertyInput, languages: List[str]) -> Tuple[Dict[str, GeneratedContent], float, List[Tuple[str, str, Tuple[str, ...], float]]]:
+    """Worker entry point for /generate/multilingual: all languages of one listing in one task."""
+    started = time.monotonic()
+    result = generate_multilingual(data, languages)
+    return result, started, drain_forwarded()
+
+
+def _noop() -> None:
+    """Used to spawn every worker process before the first request."""
+
+
+def pool_size() -> int:
+    return settings.WORKER_PROCESSES or os.cpu_count() or 1
+
+
+def start_pool() -> None:
+    """Create the process pool and start all of its workers."""
+    global _pool
+    if _pool is not None:
+        return
+    # Settings changed at runtime live on the instance; ship them to the workers
+    overrides = dict(vars(settings))
+    _pool = ProcessPoolExecutor(max_workers=pool_size(), initializer=_init_worker, initargs=(overrides,))
+    for future in [_pool.submit(_noop) for _ in range(pool_size())]:
+        future.result()
+
+
+def shutdown_pool() -> None:
+    """Let queued work finish, then stop the worker processes."""
+    global _pool
+    if _pool is None:
+        return
+    _pool.shutdown(wait=True)
+    _pool = None
+
+
+def pool_enabled() -> bool:
+    return _pool is not None
+
+
+def uses_pool() -> bool:
+    """Only CPU-bound template generation is sent to the pool; LLM modes stay on the event loop."""
+    return _pool is not None and settings.GENERATION_MODE not in ("openai", "ollama")
+
+
+async def generate_in_pool(data: PropertyInput) -> GeneratedContent:
+    """Run generate_structured in a worker process, recording queue wait and worker metrics."""
+    return await _run_in_pool(_render, data)
+
+
+async def generate_multilingual_in_pool(data: PropertyInput, languages: List[str]) -> Dict[str, GeneratedContent]:
+    """Run generate_multilingual in a worker process; the languages of a listing stay in one task."""
+    return await _run_in_pool(_render_multilingual, data, languages)
+
+
+async def _run_in_pool(render: Callable[..., Tuple[Any, float, list]], *args: Any) -> Any:
+    global _pool
+    submitted = time.monotonic()
+    loop = asyncio.get_running_loop()
+    pool = _pool
+    try:
+        result, started, updates = await loop.run_in_executor(pool, render, *args)
+    except BrokenProcessPool:
+        # A worker died (e.g. OOM-killed): rebuild the pool and retry once.
+        # Requests that failed on the same broken pool rebuild it only once.
+        if _pool is pool:
+            print(f"Warning: process pool broken, restarting {pool_size()} workers")
+            WORKER_POOL_RESTARTS.inc()
+            # Stops the broken pool's management thread and any surviving workers
+            pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
+            start_pool()
+        submitted = time.monotonic()
+        result, started, updates = await loop.run_in_executor(_pool, render, *args)
+    QUEUE_WAIT.observe(max(0.0, started - submitted), "process_pool")
+    registry.replay(updates)
+    return result
@@ -0,0 +1,174 @@
+"""
+Replay the requests recorded in a cassette at their recorded pace.
+
+A server running with LLM_REPLAY=record appends every /generate,
+/generate/batch and /generate/multilingual request to its cassette with its
+arrival time (see app/llm/replay.py). This driver re-issues them, keeping
+their recorded spacing times --pace (1 keeps the recorded pace, 0.5 replays
+twice as fast, 0 sends everything at once), and reports latency, lag behind
+the schedule, status codes, failed batch items, template fallbacks and
+cassette misses.
+
+By default the requests go to this app in-process, with LLM_REPLAY=replay on
+the same cassette, so recorded production traffic runs offline against the
+current code: the LLM answers come from the cassette and take their
+recorded latency times --latency-scale. Run it with the settings of the
+recorded server (GENERATION_MODE, models, sampling profiles): calls are
+keyed by them, and calls that do not match are reported as misses. With
+--url the requests go to a running server instead, which should itself run
+with LLM_REPLAY=replay.
+
+Exits with status 1 when any LLM call missed the cassette.
+
+Usage:
+    python -m benchmarks.replay llm_recording.jsonl.gz
+    python -m benchmarks.replay llm_recording.jsonl.gz --pace 0.5 --latency-scale 1 --strict
+    python -m benchmarks.replay llm_recording.jsonl.gz --url http://localhost:8000
+"""
+
+import argparse
+import asyncio
+import json
+import re
+import sys
+import time
+from collections import Counter
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+from app.config import settings
+from app.llm.replay import read_cassette, read_requests
+from app.main import app
+from .run import _percentiles
+
+_REPLAY_CALLS = re.compile(r'^llm_replay_calls_total\{backend="[^"]*",result="(?P<result>[^"]*)"\} (?P<value>\S+)$')
+_FALLBACKS = re.compile(r'^content_template_fallbacks_total\{[^}]*\} (?P<value>\S+)$')
+
+
+async def _counters(client: httpx.AsyncClient) -> Counter:
+    """Replayed LLM calls by result and template fallbacks, from /metrics."""
+    counters: Counter = Counter()
+    response = await client.get("/metrics")
+    for line in response.text.splitlines():
+        match = _REPLAY_CALLS.match(line)
+        if match:
+            counters[match["result"]] += float(match["value"])
+            continue
+        match = _FALLBACKS.match(line)
+        if match:
+            counters["template_fallbacks"] += float(match["value"])
+    return counters
+
+
+def _fallback_pages(payload: Any) -> int:
+    """Pages of a response whose metadata reports a template fallback (output=sections or full)."""
+    if isinstance(payload, list):
+        return sum(_fallback_pages(item) for item in payload)
+    if not isinstance(payload, dict):
+        return 0
+    metadata = payload.get("metadata")
+    if isinstance(metadata, dict):
+        return int(bool(metadata.get("fallback")))
+    return sum(_fallback_pages(value) for value in payload.values())
+
+
+async def drive(requests: List[Dict[str, Any]], client: httpx.AsyncClient, pace: float) -> Dict[str, Any]:
+    """Send the recorded requests on their recorded schedule (scaled by `pace`) and collect the outcomes."""
+    loop = asyncio.get_running_loop()
+    latencies: List[float] = []
+    lags: List[float] = []
+    statuses: Counter = Counter()
+    fallback_pages = failed_items = 0
+    first = requests[0]["ts"] if requests else 0.0
+    before = await _counters(client)
+    started = loop.time()
+
+    async def one(entry: Dict[str, Any]) -> None:
+        nonlocal fallback_pages, failed_items
+        due = started + (entry["ts"] - first) * pace
+        await asyncio.sleep(max(0.0, due - loop.time()))
+        lags.append(max(0.0, loop.time() - due))
+        sent = time.perf_counter()
+        headers = {"content-type": "application/json"}
+        if entry.get("tenant"):
+            headers["x-tenant-id"] = entry["tenant"]
+        try:
+            response = await client.post(entry["request"], params=entry.get("params") or {}, content=entry["body"],
+                                         headers=headers)
+        except httpx.HTTPError as e:
+            statuses[type(e).__name__] += 1
+            return
+        latencies.append(time.perf_counter() - sent)
+        statuses[str(response.status_code)] += 1
+        if response.status_code == 200:
+            payload = response.json()
+            fallback_pages += _fallback_pages(payload)
+            # Listings of a batch fail on their own, inside a 200 response
+            failed_items += sum(1 for result in payload.get("results", ()) if "error" in result)
+
+    await asyncio.gather(*(one(entry) for entry in requests))
+    elapsed = loop.time() - started
+    after = await _counters(client)
+    return {
+        "requests": len(requests),
+        "recorded_span_seconds": round(requests[-1]["ts"] - first, 3) if requests else 0.0,
+        "replayed_span_seconds": round(elapsed, 3),
+        "status": dict(sorted(statuses.items())),
+        "failed_batch_items": failed_items,
+        **_percentiles(latencies),
+        "max_lag_ms": round(max(lags, default=0.0) * 1000, 3),
+        "fallback_pages": fallback_pages,
+        "template_fallbacks": int(after["template_fallbacks"] - before["template_fallbacks"]),
+        "llm_calls": {result: int(after[result] - before[result]) for result in ("hit", "prompt_changed", "miss")},
+    }
+
+
+def _recorded_mode(path: str) -> Optional[str]:
+    """The LLM backend most calls of the cassette were made to."""
+    backends = Counter(call.get("backend") for call in read_cassette(path))
+    return backends.most_common(1)[0][0] if backends else None
+
+
+async def _run(args: argparse.Namespace, requests: List[Dict[str, Any]]) -> Dict[str, Any]:
+    if args.url:
+        async with httpx.AsyncClient(base_url=args.url, timeout=args.timeout) as client:
+            return await drive(requests, client, args.pace)
+    settings.LLM_REPLAY = "replay"
+    settings.LLM_REPLAY_FILE = args.cassette
+    settings.LLM_REPLAY_STRICT = args.strict or settings.LLM_REPLAY_STRICT
+    if args.latency_scale is not None:
+        settings.LLM_REPLAY_LATENCY_SCALE = args.latency_scale
+    settings.GENERATION_MODE = args.mode or _recorded_mode(args.cassette) or settings.GENERATION_MODE
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://replay", timeout=args.timeout) as client:
+        return await drive(requests, client, args.pace)
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Re-issue the requests of a cassette (LLM_REPLAY=record) at their recorded pace.")
+    parser.add_argument("cassette", nargs="?", default=settings.LLM_REPLAY_FILE, help="JSON Lines file, optionally .gz")
+    parser.add_argument("--pace", type=float, default=1.0, help="time between requests = recorded x pace (0 = all at once)")
+    parser.add_argument("--url", help="send the requests to this server instead of the app in-process")
+    parser.add_argument("--mode", choices=["openai", "ollama"], help="in-process GENERATION_MODE (default: the recorded backend)")
+    parser.add_argument("--latency-scale", type=float, help="in-process LLM_REPLAY_LATENCY_SCALE")
+    parser.add_argument("--strict", action="store_true", help="in-process LLM_REPLAY_STRICT: a missed call fails its request")
+    parser.add_argument("--limit", type=int, help="replay only the first N requests")
+    parser.add_argument("--timeout", type=float, default=300.0, help="seconds per request")
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    requests = list(read_requests(args.cassette))[:args.limit]
+    if not requests:
+        print(f"No recorded requests in {args.cassette}; record them with LLM_REPLAY=record")
+        return 1
+    report = asyncio.run(_run(args, requests))
+    json.dump(report, sys.stdout, indent=2)
+    print()
+    return 1 if report["llm_calls"]["miss"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,490 @@
+"""
+Benchmark suite for the Real Estate Content Generator.
+
+Measures, for the three generation modes:
+- template-mode throughput of generate_content (listings/second per language)
+- LLM output post-processing throughput (sanitize + escape + limit check per page)
+- /generate response encoding: FastAPI response_model path vs the fast JSON path
+- batch input validation: one PropertyInput per item vs bulk TypeAdapter
+- pre-generated content lookups by listing ID in the memory-mapped content store
+- single-listing latency through the FastAPI app (sequential /generate calls)
+- batch throughput through the FastAPI app at several concurrency levels
+
+OpenAI and Ollama modes run against the bundled mock LLM server (mock_llm)
+with a seeded latency/error model, so no API key, network access or GPU is
+needed. Results are written as JSON and can
+be compared against a previous report to catch regressions before deploy.
+
+Usage:
+    python -m benchmarks.run
+    python -m benchmarks.run --quick --output benchmarks/results/current.json
+    python -m benchmarks.run --compare benchmarks/results/baseline.json --threshold 0.15
+"""
+
+import argparse
+import asyncio
+import copy
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, List
+
+import httpx
+
+from app.batch import validate_batch
+from app.config import settings
+from app.content_store import ContentStore, content_record
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from app.generator import generate_content, generate_structured
+from app.main import app
+from app.metrics import TEMPLATE_FALLBACKS
+from app.llm.sanitize import clean_lines, clean_text, escape_attr, escape_text
+from app.routes import _build_output
+from app.schemas import ContentOutput, PropertyInput
+from app.serialization import FastJSONResponse
+from app.utils import validate_content_limits
+from app import workers
+from mock_llm import MockConfig, MockLLMServer
+from mock_llm.responses import CANNED
+
+ROOT = Path(__file__).resolve().parent.parent
+RESULTS_DIR = Path(__file__).resolve().parent / "results"
+LANGUAGES = ("en", "pt", "es")
+NEIGHBORHOODS = (
+    ("Lisbon", "Campo de Ourique"), ("Lisbon", "Chiado"), ("Lisbon", "Alfama"),
+    ("Porto", "Cedofeita"), ("Porto", "Foz do Douro"), ("Madrid", "Salamanca"), ("Madrid", "Chamberí"),
+)
+
+
+def make_listings(count: int, seed: int = 7) -> List[Dict[str, Any]]:
+    """Build a reproducible set of listing payloads derived from the example data."""
+    rng = random.Random(seed)
+    base = json.loads((ROOT / "example_data_en.json").read_text())
+    listings = []
+    for i in range(count):
+        listing = copy.deepcopy(base)
+        city, neighborhood = NEIGHBORHOODS[i % len(NEIGHBORHOODS)]
+        listing["location"] = {"city": city, "neighborhood": neighborhood}
+        features = listing["features"]
+        features["bedrooms"] = rng.randint(0, 5)
+        features["bathrooms"] = rng.randint(1, 3)
+        features["area_sqm"] = rng.randint(35, 250)
+        features["balcony"] = rng.random() < 0.5
+        features["parking"] = rng.random() < 0.4
+        features["elevator"] = rng.random() < 0.6
+        listing["price"] = rng.randint(80, 1500) * 1000
+        listing["listing_type"] = rng.choice(("sale", "rent"))
+        listing["language"] = LANGUAGES[i % len(LANGUAGES)]
+        listings.append(listing)
+    return listings
+
+
+def _percentiles(samples: List[float]) -> Dict[str, float]:
+    """Latency summary in milliseconds."""
+    if not samples:
+        return {}
+    ordered = sorted(samples)
+
+    def pick(q: float) -> float:
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))] * 1000
+
+    return {
+        "p50_ms": round(pick(0.50), 3),
+        "p95_ms": round(pick(0.95), 3),
+        "p99_ms": round(pick(0.99), 3),
+        "mean_ms": round(sum(ordered) / len(ordered) * 1000, 3),
+        "max_ms": round(ordered[-1] * 1000, 3),
+    }
+
+
+def _configure_mode(mode: str, mock_url: str = "") -> None:
+    """Point the shared settings at the requested mode (and mock server)."""
+    settings.GENERATION_MODE = mode
+    if mode == "openai":
+        settings.OPENAI_API_KEY = settings.OPENAI_API_KEY or "benchmark-key"
+        settings.OPENAI_BASE_URL = f"{mock_url}/v1"
+    elif mode == "ollama":
+        settings.OLLAMA_BASE_URL = mock_url
+
+
+def bench_template_throughput(iterations: int, repeat: int = 3) -> List[Dict[str, Any]]:
+    """Call generate_content directly in template mode, per language (best of `repeat` runs)."""
+    _configure_mode("template")
+    results = []
+    for language in LANGUAGES:
+        inputs = [PropertyInput(**{**listing, "language": language}) for listing in make_listings(iterations)]
+        for data in inputs[:10]:  # warm up imports and caches
+            generate_content(data)
+        elapsed = float("inf")
+        for _ in range(repeat):
+            started = time.perf_counter()
+            for data in inputs:
+                generate_content(data)
+            elapsed = min(elapsed, time.perf_counter() - started)
+        results.append({
+            "name": "template_throughput",
+            "mode": "template",
+            "params": {"language": language, "iterations": iterations},
+            "metrics": {
+                "listings_per_second": round(iterations / elapsed, 1),
+                "us_per_listing": round(elapsed / iterations * 1e6, 2),
+            },
+        })
+    return results
+
+
+def _raw_llm_pages(count: int, seed: int = 7) -> List[Dict[str, str]]:
+    """Canned LLM answers decorated with the markdown, quotes and entities real models emit."""
+    rng = random.Random(seed)
+    decorations = (
+        lambda text: text,
+        lambda text: f'"{text}"',
+        lambda text: f"**{text}**",
+        lambda text: f"  {text.replace(' and ', ' & ')}\n",
+    )
+    pages = []
+    for index in range(count):
+        canned = CANNED[LANGUAGES[index % len(LANGUAGES)]]
+        page = {section: rng.choice(decorations)(text) for section, text in canned.items()}
+        page["key_features"] = "Key features:\n" + canned["key_features"].replace("• ", rng.choice(("- ", "* ", "• ", "1. ")))
+        pages.append(page)
+    return pages
+
+
+def bench_sanitize_throughput(iterations: int, repeat: int = 3) -> Dict[str, Any]:
+    """Post-process raw LLM answers into the 7 HTML sections and check limits (best of `repeat` runs)."""
+    pages = _raw_llm_pages(iterations)
+    elapsed = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for page in pages:
+            sections = {
+                "title": f"<title>{escape_text(clean_text(page['title']))}</title>",
+                "meta_description": f'<meta name="description" content="{escape_attr(clean_text(page["meta_description"]))}">',
+                "h1": f"<h1>{escape_text(clean_text(page['h1']))}</h1>",
+                "description": f"<section id=\"description\"><p>{escape_text(clean_text(page['description']))}</p></section>",
+                "key_features": "\n".join(f"  <li>{escape_text(item)}</li>" for item in clean_lines(page["key_features"])),
+                "neighborhood": f"<section id=\"neighborhood\"><p>{escape_text(clean_text(page['neighborhood']))}</p></section>",
+                "call_to_action": f"<p class=\"call-to-action\">{escape_text(clean_text(page['call_to_action']))}</p>",
+            }
+            validate_content_limits(sections)
+        elapsed = min(elapsed, time.perf_counter() - started)
+    return {
+        "name": "sanitize_throughput",
+        "mode": "llm",
+        "params": {"iterations": iterations},
+        "metrics": {
+            "pages_per_second": round(iterations / elapsed, 1),
+            "us_per_page": round(elapsed / iterations * 1e6, 2),
+        },
+    }
+
+
+def bench_response_serialization(iterations: int, repeat: int = 3) -> List[Dict[str, Any]]:
+    """
+    Encode /generate responses per output format, two ways (best of `repeat` runs):
+    - response_model: what FastAPI does for a returned model (validate against
+      ContentOutput, jsonable_encoder, stdlib JSONResponse)
+    - fast: the payload dict straight into FastJSONResponse
+    """
+    _configure_mode("template")
+    result = generate_structured(PropertyInput(**make_listings(1)[0]))
+
+    def response_model(output: str) -> bytes:
+        validated = ContentOutput.model_validate(_build_output(result, output))
+        return JSONResponse(jsonable_encoder(validated, exclude_none=True)).body
+
+    def fast(output: str) -> bytes:
+        return FastJSONResponse(_build_output(result, output)).body
+
+    results = []
+    for output in ("html", "sections", "full"):
+        for path, encode in (("response_model", response_model), ("fast", fast)):
+            elapsed = float("inf")
+            for _ in range(repeat):
+                started = time.perf_counter()
+                for _ in range(iterations):
+                    encode(output)
+                elapsed = min(elapsed, time.perf_counter() - started)
+            results.append({
+                "name": "response_serialization",
+                "mode": "template",
+                "params": {"output": output, "path": path, "iterations": iterations},
+                "metrics": {
+                    "responses_per_second": round(iterations / elapsed, 1),
+                    "us_per_response": round(elapsed / iterations * 1e6, 2),
+                },
+            })
+    return results
+
+
+def bench_batch_validation(items: int, repeat: int = 3) -> List[Dict[str, Any]]:
+    """Validate a JSON array of `items` listings: parse + PropertyInput per item vs bulk validate_batch."""
+    raw = json.dumps(make_listings(items)).encode("utf-8")
+    validators = (
+        ("per_item", lambda: [PropertyInput(**item) for item in json.loads(raw)]),
+        ("bulk", lambda: validate_batch(raw)),
+    )
+    results = []
+    for path, validate in validators:
+        elapsed = float("inf")
+        for _ in range(repeat):
+            started = time.perf_counter()
+            validate()
+            elapsed = min(elapsed, time.perf_counter() - started)
+        results.append({
+            "name": "batch_validation",
+            "mode": "template",
+            "params": {"path": path, "items": items},
+            "metrics": {"listings_per_second": round(items / elapsed, 1)},
+        })
+    return results
+
+
+def bench_content_store_lookup(entries: int, lookups: int, repeat: int = 3) -> List[Dict[str, Any]]:
+    """Random lookups by listing ID in a content store of `entries` listings: raw view and decoded record."""
+    _configure_mode("template")
+    data = PropertyInput(**make_listings(1)[0])
+    record = content_record(data, generate_structured(data))
+    rng = random.Random(42)
+    keys = [f"listing-{rng.randrange(entries)}" for _ in range(lookups)]
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "content")
+        writer = ContentStore(path, writable=True)
+        for number in range(entries):
+            writer.put(f"listing-{number}", record)
+        writer.close()
+        reader = ContentStore(path)
+        for access, lookup in (("bytes", reader.get_bytes), ("decoded", reader.get)):
+            elapsed = float("inf")
+            for _ in range(repeat):
+                started = time.perf_counter()
+                for key in keys:
+                    lookup(key)
+                elapsed = min(elapsed, time.perf_counter() - started)
+            results.append({
+                "name": "content_store_lookup",
+                "mode": "template",
+                "params": {"entries": entries, "access": access, "lookups": lookups},
+                "metrics": {
+                    "lookups_per_second": round(lookups / elapsed, 1),
+                    "us_per_lookup": round(elapsed / lookups * 1e6, 2),
+                },
+            })
+    return results
+
+
+async def _post_all(listings: List[Dict[str, Any]], concurrency: int) -> Dict[str, Any]:
+    """POST every listing to /generate through the ASGI app with bounded concurrency."""
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies: List[float] = []
+    errors = 0
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://benchmark", timeout=300) as client:
+        async def one(listing):
+            nonlocal errors
+            async with semaphore:
+                started = time.perf_counter()
+                response = await client.post("/generate", json=listing)
+                latencies.append(time.perf_counter() - started)
+                if response.status_code != 200:
+                    errors += 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(one(listing) for listing in listings))
+        elapsed = time.perf_counter() - started
+    return {"latencies": latencies, "errors": errors, "elapsed": elapsed}
+
+
+def bench_single_latency(mode: str, requests: int) -> Dict[str, Any]:
+    """Sequential /generate calls: per-listing latency with no contention."""
+    fallbacks_before = TEMPLATE_FALLBACKS.value(mode)
+    outcome = asyncio.run(_post_all(make_listings(requests), concurrency=1))
+    return {
+        "name": "single_latency",
+        "mode": mode,
+        "params": {"requests": requests, "worker_mode": settings.WORKER_MODE},
+        "metrics": {
+            **_percentiles(outcome["latencies"]),
+            "errors": outcome["errors"],
+            "template_fallbacks": int(TEMPLATE_FALLBACKS.value(mode) - fallbacks_before),
+        },
+    }
+
+
+def bench_batch_throughput(mode: str, requests: int, concurrency: int) -> Dict[str, Any]:
+    """Concurrent /generate calls: throughput and tail latency under load."""
+    fallbacks_before = TEMPLATE_FALLBACKS.value(mode)
+    outcome = asyncio.run(_post_all(make_listings(requests, seed=concurrency), concurrency))
+    return {
+        "name": "batch_throughput",
+        "mode": mode,
+        "params": {"requests": requests, "concurrency": concurrency, "worker_mode": settings.WORKER_MODE},
+        "metrics": {
+            "requests_per_second": round(requests / outcome["elapsed"], 2),
+            **_percentiles(outcome["latencies"]),
+            "errors": outcome["errors"],
+            "template_fallbacks": int(TEMPLATE_FALLBACKS.value(mode) - fallbacks_before),
+        },
+    }
+
+
+def run_suite(args: argparse.Namespace) -> Dict[str, Any]:
+    """Run every benchmark and return the report."""
+    results: List[Dict[str, Any]] = []
+    results.extend(bench_template_throughput(args.iterations, args.repeat))
+    results.append(bench_sanitize_throughput(args.iterations * 5, args.repeat))
+    results.extend(bench_response_serialization(args.iterations * 5, args.repeat))
+    results.extend(bench_batch_validation(args.iterations * 10, args.repeat))
+    results.extend(bench_content_store_lookup(args.iterations * 50, args.iterations * 10, args.repeat))
+
+    # The ASGI transport does not run startup events, so manage the pool here
+    if args.worker_mode == "process":
+        settings.WORKER_MODE = "process"
+        workers.start_pool()
+    try:
+        results.extend(_run_app_benchmarks(args))
+    finally:
+        workers.shutdown_pool()
+    return {"meta": _metadata(args), "results": results}
+
+
+def _run_app_benchmarks(args: argparse.Namespace) -> List[Dict[str, Any]]:
+    """Latency and throughput through the FastAPI app for every requested mode."""
+    results: List[Dict[str, Any]] = []
+
+    for mode in args.modes:
+        if mode == "template":
+            _configure_mode("template")
+            results.append(bench_single_latency(mode, args.requests))
+            for concurrency in args.concurrency:
+                results.append(bench_batch_throughput(mode, args.requests * 4, concurrency))
+            continue
+
+        config = MockConfig(
+            latency_distribution=args.mock_latency_distribution,
+            latency_ms=args.mock_latency_ms,
+            latency_spread=args.mock_latency_spread,
+            tokens_per_second=args.mock_tokens_per_second,
+            error_rate_429=args.mock_error_rate_429,
+            error_rate_5xx=args.mock_error_rate_5xx,
+            retry_after=0.0,
+            seed=args.seed,
+        )
+        with MockLLMServer(config) as mock:
+            _configure_mode(mode, mock.url)
+            results.append(bench_single_latency(mode, args.requests))
+            for concurrency in args.concurrency:
+                results.append(bench_batch_throughput(mode, args.requests, concurrency))
+    return results
+
+
+def _metadata(args: argparse.Namespace) -> Dict[str, Any]:
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True).stdout.strip()
+    except OSError:
+        commit = ""
+    return {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "git_commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "args": {key: value for key, value in vars(args).items() if key not in ("compare", "output")},
+    }
+
+
+def _result_key(result: Dict[str, Any]) -> str:
+    params = ",".join(f"{key}={value}" for key, value in sorted(result["params"].items()))
+    return f"{result['name']}[{result['mode']}]({params})"
+
+
+def compare_reports(current: Dict[str, Any], baseline: Dict[str, Any], threshold: float) -> List[str]:
+    """Return a description of every result that regressed by more than the threshold."""
+    # Throughput metrics must not drop; latency metrics must not grow
+    higher_is_better = ("listings_per_second", "pages_per_second", "responses_per_second", "requests_per_second",
+                        "lookups_per_second")
+    lower_is_better = ("p50_ms", "p95_ms")
+    baseline_results = {_result_key(result): result for result in baseline.get("results", [])}
+    regressions = []
+    for result in current["results"]:
+        previous = baseline_results.get(_result_key(result))
+        if previous is None:
+            continue
+        for metric in higher_is_better + lower_is_better:
+            new, old = result["metrics"].get(metric), previous["metrics"].get(metric)
+            if not new or not old:
+                continue
+            change = (new - old) / old
+            if (metric in higher_is_better and change < -threshold) or (metric in lower_is_better and change > threshold):
+                regressions.append(f"{_result_key(result)} {metric}: {old} -> {new} ({change:+.1%})")
+    return regressions
+
+
+def _print_summary(report: Dict[str, Any]) -> None:
+    for result in report["results"]:
+        metrics = ", ".join(f"{key}={value}" for key, value in result["metrics"].items())
+        print(f"{_result_key(result):<70} {metrics}")
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmark the content generator in all generation modes.")
+    parser.add_argument("--modes", nargs="+", default=["template", "openai", "ollama"], choices=["template", "openai", "ollama"])
+    parser.add_argument("--iterations", type=int, default=2000, help="listings per language for template throughput")
+    parser.add_argument("--repeat", type=int, default=3, help="template throughput runs; the best one is reported")
+    parser.add_argument("--requests", type=int, default=50, help="requests per latency/batch run")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--mock-latency-distribution", default="normal",
+                        choices=["constant", "uniform", "normal", "lognormal", "exponential"])
+    parser.add_argument("--mock-latency-ms", type=float, default=20.0, help="mock time to first token")
+    parser.add_argument("--mock-latency-spread", type=float, default=5.0)
+    parser.add_argument("--mock-tokens-per-second", type=float, default=0.0)
+    parser.add_argument("--mock-error-rate-429", type=float, default=0.0)
+    parser.add_argument("--mock-error-rate-5xx", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--worker-mode", choices=["thread", "process"], default="thread",
+                        help="run template generation on the threadpool or the process pool")
+    parser.add_argument("--quick", action="store_true", help="small iteration counts for a smoke run")
+    parser.add_argument("--output", type=Path, help="report path (default: benchmarks/results/<timestamp>.json)")
+    parser.add_argument("--compare", type=Path, help="baseline report to compare against")
+    parser.add_argument("--threshold", type=float, default=0.10, help="allowed relative regression (0.10 = 10%%)")
+    args = parser.parse_args(argv)
+    if args.quick:
+        args.iterations = min(args.iterations, 200)
+        args.requests = min(args.requests, 10)
+        args.concurrency = [c for c in args.concurrency if c <= 8] or [1]
+    return args
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    report = run_suite(args)
+    _print_summary(report)
+
+    output = args.output or RESULTS_DIR / f"{time.strftime('%Y%m%d-%H%M%S')}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2))
+    print(f"\nReport written to {output}")
+
+    if args.compare:
+        regressions = compare_reports(report, json.loads(args.compare.read_text()), args.threshold)
+        if regressions:
+            print(f"\n❌ {len(regressions)} regression(s) above {args.threshold:.0%}:")
+            for line in regressions:
+                print(f"   {line}")
+            return 1
+        print(f"\n✅ No regressions above {args.threshold:.0%} against {args.compare}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
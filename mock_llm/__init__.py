@@ -0,0 +1,5 @@
+"""Offline stand-in for the OpenAI and Ollama APIs used by the generators."""
+
+from .server import MockConfig, MockLLMServer, create_app
+
+__all__ = ["MockConfig", "MockLLMServer", "create_app"]
@@ -0,0 +1,49 @@
+"""
+Run the mock LLM server.
+
+Usage:
+    python -m mock_llm --port 11434 --latency-ms 300 --tokens-per-second 40
+    python -m mock_llm --port 8001 --error-rate-429 0.05 --error-rate-5xx 0.01
+
+Then point the app at it:
+    OLLAMA_BASE_URL=http://localhost:11434
+    OPENAI_BASE_URL=http://localhost:8001/v1 OPENAI_API_KEY=mock
+"""
+
+import argparse
+
+import uvicorn
+
+from .server import LATENCY_DISTRIBUTIONS, MockConfig, create_app
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Mock OpenAI/Ollama server for offline load testing.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11434)
+    parser.add_argument("--latency-distribution", choices=LATENCY_DISTRIBUTIONS, default="lognormal")
+    parser.add_argument("--latency-ms", type=float, default=200.0, help="median/mean time to first token")
+    parser.add_argument("--latency-spread", type=float, default=0.5,
+                        help="sigma (lognormal), std dev in ms (normal) or half-width in ms (uniform)")
+    parser.add_argument("--tokens-per-second", type=float, default=0.0, help="generation speed after the first token (0 = instant)")
+    parser.add_argument("--error-rate-429", type=float, default=0.0)
+    parser.add_argument("--error-rate-5xx", type=float, default=0.0)
+    parser.add_argument("--retry-after", type=float, default=1.0, help="Retry-After seconds sent with 429 responses")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args(argv)
+
+    config = MockConfig(
+        latency_distribution=args.latency_distribution,
+        latency_ms=args.latency_ms,
+        latency_spread=args.latency_spread,
+        tokens_per_second=args.tokens_per_second,
+        error_rate_429=args.error_rate_429,
+        error_rate_5xx=args.error_rate_5xx,
+        retry_after=args.retry_after,
+        seed=args.seed,
+    )
+    uvicorn.run(create_app(config), host=args.host, port=args.port, log_level="info")
+
+
+if __name__ == "__main__":
+    main()
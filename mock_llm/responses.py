@@ -0,0 +1,114 @@
+"""
+Canned multilingual outputs for the mock LLM server.
+
+The section and language are inferred from the prompts in app/llm/prompts.py
+and the inline prompts of the generators, so each call gets an answer of the
+right shape and a realistic length (title < 60 chars, meta < 155 chars,
+description 500-700 chars, bullet list for key features). Batched translation
+prompts get a well-formed JSON answer that repeats the source texts for every
+target language.
+"""
+
+import json
+import re
+from typing import Tuple
+
+# Batched translation prompts (app/llm/prompts.get_translation_prompt)
+_TRANSLATION = re.compile(r"into each of these languages: (?P<targets>[^\n]*?)\.\n.*?\(JSON array of \d+ strings\):\n(?P<texts>[^\n]*)", re.S)
+# Language codes open the list or follow ", "; names can hold parentheses, e.g. "Spanish (Spain)"
+_TARGET = re.compile(r"(?:^|, )([a-z]{2,3}) \(")
+
+CANNED = {
+    "en": {
+        "title": "Bright T3 Apartment for Sale in Campo de Ourique",
+        "meta_description": "Spacious 3-bedroom apartment in Lisbon with balcony and elevator, in the heart of Campo de Ourique. Ideal for families.",
+        "h1": "Sunlit Family Home with Balcony in Campo de Ourique",
+        "description": (
+            "Set on a quiet, tree-lined street in Campo de Ourique, this bright 3-bedroom apartment offers 120 sqm "
+            "of thoughtfully designed living space on the second floor of a well-kept building with elevator. The "
+            "generous living room opens onto a sunny balcony, while the modern kitchen and two full bathrooms make "
+            "daily life effortless. Built in 2005, the home combines solid construction with contemporary finishes. "
+            "Cafés, markets, schools and green parks are all a short walk away, and the city centre is minutes by "
+            "tram. A rare opportunity in one of Lisbon's most loved neighborhoods."
+        ),
+        "key_features": "• 120 sqm of bright living space\n• 3 bedrooms and 2 bathrooms\n• Private sunny balcony\n• Elevator access\n• Walking distance to markets and parks",
+        "neighborhood": "Campo de Ourique blends village charm with city convenience: lively cafés, a famous food market, good schools and quick tram links to central Lisbon.",
+        "call_to_action": "Book your viewing today and make this Lisbon home yours!",
+    },
+    "pt": {
+        "title": "T3 com Varanda para Venda em Campo de Ourique",
+        "meta_description": "Apartamento T3 em Lisboa com varanda e elevador, no coração de Campo de Ourique. Espaçoso e luminoso. Ideal para famílias.",
+        "h1": "T3 Luminoso com Varanda em Campo de Ourique",
+        "description": (
+            "Numa rua tranquila de Campo de Ourique, este apartamento T3 luminoso oferece 120 m² de área bem "
+            "distribuída no segundo andar de um edifício cuidado com elevador. A sala ampla abre para uma varanda "
+            "soalheira, e a cozinha equipada e as duas casas de banho completas garantem conforto no dia a dia. "
+            "Construído em 2005, alia boa construção a acabamentos atuais. Cafés, mercado, escolas e jardins ficam "
+            "a poucos passos, e o centro de Lisboa está a minutos de elétrico. Uma oportunidade rara num dos "
+            "bairros mais desejados da cidade."
+        ),
+        "key_features": "• 120 m² de área habitacional\n• 3 quartos e 2 casas de banho\n• Varanda soalheira\n• Acesso por elevador\n• Perto do mercado e de jardins",
+        "neighborhood": "Campo de Ourique combina o ambiente de bairro com a conveniência da cidade: cafés animados, mercado emblemático, boas escolas e elétrico para o centro.",
+        "call_to_action": "Marque já a sua visita e descubra o seu novo lar em Lisboa!",
+    },
+    "es": {
+        "title": "Piso de 3 habitaciones en venta en Campo de Ourique",
+        "meta_description": "Apartamento de 3 habitaciones en Lisboa con balcón y ascensor, en pleno Campo de Ourique. Amplio y luminoso. Ideal para familias.",
+        "h1": "Luminoso hogar familiar con balcón en Campo de Ourique",
+        "description": (
+            "En una calle tranquila de Campo de Ourique, este luminoso apartamento de 3 habitaciones ofrece 120 m² "
+            "bien distribuidos en la segunda planta de un edificio cuidado con ascensor. El amplio salón se abre a "
+            "un balcón soleado, y la cocina equipada y los dos baños completos aportan comodidad en el día a día. "
+            "Construido en 2005, combina una construcción sólida con acabados actuales. Cafeterías, mercado, "
+            "colegios y parques están a pocos pasos, y el centro de Lisboa a minutos en tranvía. Una oportunidad "
+            "única en uno de los barrios más queridos de la ciudad."
+        ),
+        "key_features": "• 120 m² de superficie habitable\n• 3 habitaciones y 2 baños\n• Balcón soleado\n• Acceso por ascensor\n• Cerca del mercado y de parques",
+        "neighborhood": "Campo de Ourique une ambiente de barrio y comodidad urbana: cafeterías animadas, un mercado emblemático, buenos colegios y tranvía directo al centro.",
+        "call_to_action": "¡Reserva tu visita hoy y haz tuyo este hogar en Lisboa!",
+    },
+}
+
+
+def detect_language(prompt: str) -> str:
+    """Guess the output language from the prompt wording."""
+    lowered = prompt.lower()
+    if "português" in lowered or "responde apenas" in lowered or "cria um" in lowered or "lista 4-5 características principais" in lowered:
+        return "pt"
+    if "español" in lowered or "responde solo" in lowered or "crear un" in lowered or "características clave" in lowered:
+        return "es"
+    return "en"
+
+
+def detect_section(prompt: str) -> str:
+    """Guess which of the 7 sections the prompt asks for."""
+    lowered = prompt.lower()
+    if "h1" in lowered:
+        return "h1"
+    if "meta" in lowered:
+        return "meta_description"
+    if "•" in prompt:
+        return "key_features"
+    if "500-700" in lowered:
+        return "description"
+    if "call-to-action" in lowered or "llamada a la acción" in lowered or "chamada para ação" in lowered:
+        return "call_to_action"
+    if "bairro" in lowered or "barrio" in lowered or "neighborhood" in lowered:
+        return "neighborhood"
+    return "title"
+
+
+def translation_response(prompt: str) -> str:
+    """Answer a batched translation prompt: the source texts, unchanged, for every target language."""
+    match = _TRANSLATION.search(prompt)
+    texts = json.loads(match.group("texts"))
+    return json.dumps({language: texts for language in _TARGET.findall(match.group("targets"))}, ensure_ascii=False)
+
+
+def canned_response(prompt: str) -> Tuple[str, str, str]:
+    """Return (language, section, text) for a prompt."""
+    if _TRANSLATION.search(prompt):
+        return "en", "translation", translation_response(prompt)
+    language = detect_language(prompt)
+    section = detect_section(prompt)
+    return language, section, CANNED[language][section]
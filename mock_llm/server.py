@@ -0,0 +1,311 @@
+"""
+Mock OpenAI / Ollama server for offline load and capacity testing.
+
+Implements the subset of the APIs used by the generators:
+- POST /v1/chat/completions   (OpenAI, streaming via SSE or single JSON)
+- POST /api/generate          (Ollama, NDJSON streaming or single JSON)
+- POST /api/chat              (Ollama, NDJSON streaming or single JSON)
+- GET  /v1/models, GET /api/tags (health checks)
+- GET  /mock/stats            (request and injected-error counters)
+
+Latency is modelled as time-to-first-token drawn from a configurable
+distribution plus completion tokens divided by a token rate. 429 and 5xx
+responses are injected at configurable rates. All randomness comes from a
+seeded RNG so load-test runs are reproducible.
+"""
+
+import asyncio
+import json
+import math
+import random
+import socket
+import threading
+import time
+import uuid
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+from .responses import canned_response
+
+LATENCY_DISTRIBUTIONS = ("constant", "uniform", "normal", "lognormal", "exponential")
+
+
+class MockConfig:
+    """Behaviour of the mock server."""
+
+    def __init__(
+        self,
+        latency_distribution: str = "lognormal",
+        latency_ms: float = 200.0,
+        latency_spread: float = 0.5,
+        tokens_per_second: float = 0.0,
+        error_rate_429: float = 0.0,
+        error_rate_5xx: float = 0.0,
+        retry_after: float = 1.0,
+        seed: int = 42,
+    ):
+        if latency_distribution not in LATENCY_DISTRIBUTIONS:
+            raise ValueError(f"latency_distribution must be one of {LATENCY_DISTRIBUTIONS}")
+        # Median (lognormal) or mean (others) time to first token
+        self.latency_distribution = latency_distribution
+        self.latency_ms = latency_ms
+        # Standard deviation in ms for normal, half-width in ms for uniform, sigma for lognormal
+        self.latency_spread = latency_spread
+        # Completion tokens generated per second after the first token (0 = instant)
+        self.tokens_per_second = tokens_per_second
+        self.error_rate_429 = error_rate_429
+        self.error_rate_5xx = error_rate_5xx
+        self.retry_after = retry_after
+        self.seed = seed
+
+
+def _estimate_tokens(text: str) -> int:
+    """Roughly 4 characters per token, as for English BPE vocabularies."""
+    return max(1, math.ceil(len(text) / 4))
+
+
+def _split_tokens(text: str) -> List[str]:
+    """Split text into word-sized streaming chunks, keeping whitespace."""
+    chunks, current = [], ""
+    for char in text:
+        current += char
+        if char in (" ", "\n"):
+            chunks.append(current)
+            current = ""
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+class MockLLM:
+    """Shared state: seeded RNG, counters and the latency model."""
+
+    def __init__(self, config: MockConfig):
+        self.config = config
+        self._rng = random.Random(config.seed)
+        self._lock = threading.Lock()
+        self.stats: Dict[str, int] = {"requests": 0, "injected_429": 0, "injected_5xx": 0, "streamed": 0}
+
+    def _first_token_delay(self) -> float:
+        config = self.config
+        rng = self._rng
+        if config.latency_distribution == "constant":
+            delay = config.latency_ms
+        elif config.latency_distribution == "uniform":
+            delay = rng.uniform(config.latency_ms - config.latency_spread, config.latency_ms + config.latency_spread)
+        elif config.latency_distribution == "normal":
+            delay = rng.gauss(config.latency_ms, config.latency_spread)
+        elif config.latency_distribution == "lognormal":
+            delay = config.latency_ms * rng.lognormvariate(0.0, config.latency_spread)
+        else:  # exponential
+            delay = rng.expovariate(1.0 / config.latency_ms) if config.latency_ms else 0.0
+        return max(0.0, delay) / 1000
+
+    def draw(self) -> Dict[str, Any]:
+        """Draw the fate of one request: injected error (if any) and first-token delay."""
+        with self._lock:
+            self.stats["requests"] += 1
+            roll = self._rng.random()
+            delay = self._first_token_delay()
+            if roll < self.config.error_rate_429:
+                self.stats["injected_429"] += 1
+                return {"error": 429, "delay": delay}
+            if roll < self.config.error_rate_429 + self.config.error_rate_5xx:
+                self.stats["injected_5xx"] += 1
+                return {"error": self._rng.choice((500, 502, 503)), "delay": delay}
+        return {"error": None, "delay": delay}
+
+    def token_delay(self) -> float:
+        return 1.0 / self.config.tokens_per_second if self.config.tokens_per_second else 0.0
+
+    def generation_time(self, text: str) -> float:
+        return _estimate_tokens(text) * self.token_delay()
+
+
+def _openai_error(status: int, retry_after: float) -> JSONResponse:
+    if status == 429:
+        return JSONResponse(
+            status_code=429,
+            headers={"retry-after": str(retry_after)},
+            content={"error": {"message": "Rate limit reached (mock)", "type": "rate_limit_exceeded", "code": "rate_limit_exceeded"}},
+        )
+    return JSONResponse(status_code=status, content={"error": {"message": "Upstream error (mock)", "type": "server_error"}})
+
+
+def _ollama_error(status: int, retry_after: float) -> JSONResponse:
+    headers = {"retry-after": str(retry_after)} if status == 429 else {}
+    return JSONResponse(status_code=status, headers=headers, content={"error": "server busy (mock)" if status == 429 else "internal error (mock)"})
+
+
+def create_app(config: Optional[MockConfig] = None) -> FastAPI:
+    """Build the mock server application."""
+    mock = MockLLM(config or MockConfig())
+    app = FastAPI(title="Mock LLM server", description="Offline stand-in for OpenAI and Ollama")
+    app.state.mock = mock
+
+    async def _stream_chunks(text: str, render) -> AsyncIterator[bytes]:
+        token_delay = mock.token_delay()
+        for chunk in _split_tokens(text):
+            if token_delay:
+                await asyncio.sleep(token_delay)
+            yield render(chunk, False)
+        yield render("", True)
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        fate = mock.draw()
+        await asyncio.sleep(fate["delay"])
+        if fate["error"]:
+            return _openai_error(fate["error"], mock.config.retry_after)
+
+        prompt = body["messages"][-1]["content"]
+        _, _, text = canned_response(prompt)
+        model = body.get("model", "mock")
+        max_tokens = body.get("max_tokens")
+        finish_reason = "stop"
+        if max_tokens and _estimate_tokens(text) > max_tokens:
+            text = text[: max_tokens * 4]
+            finish_reason = "length"
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:24]}"
+        created = int(time.time())
+
+        if body.get("stream"):
+            with mock._lock:
+                mock.stats["streamed"] += 1
+
+            include_usage = (body.get("stream_options") or {}).get("include_usage")
+
+            def render(chunk: str, done: bool) -> bytes:
+                if done:
+                    final = {"id": completion_id, "object": "chat.completion.chunk", "created": created, "model": model,
+                             "choices": [{"index": 0, "delta": {}, "finish_reason": finish_reason}]}
+                    events = f"data: {json.dumps(final)}\n\n"
+                    if include_usage:
+                        prompt_tokens, completion_tokens = _estimate_tokens(prompt), _estimate_tokens(text)
+                        usage = {"id": completion_id, "object": "chat.completion.chunk", "created": created, "model": model, "choices": [],
+                                 "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+                                           "total_tokens": prompt_tokens + completion_tokens}}
+                        events += f"data: {json.dumps(usage)}\n\n"
+                    return f"{events}data: [DONE]\n\n".encode()
+                payload = {"id": completion_id, "object": "chat.completion.chunk", "created": created, "model": model,
+                           "choices": [{"index": 0, "delta": {"content": chunk}, "finish_reason": None}]}
+                return f"data: {json.dumps(payload)}\n\n".encode()
+
+            return StreamingResponse(_stream_chunks(text, render), media_type="text/event-stream")
+
+        await asyncio.sleep(mock.generation_time(text))
+        prompt_tokens, completion_tokens = _estimate_tokens(prompt), _estimate_tokens(text)
+        return {
+            "id": completion_id,
+            "object": "chat.completion",
+            "created": created,
+            "model": model,
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": text}, "finish_reason": finish_reason}],
+            "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens, "total_tokens": prompt_tokens + completion_tokens},
+        }
+
+    async def _ollama_reply(body: Dict[str, Any], prompt: str, chat: bool):
+        fate = mock.draw()
+        await asyncio.sleep(fate["delay"])
+        if fate["error"]:
+            return _ollama_error(fate["error"], mock.config.retry_after)
+
+        _, _, text = canned_response(prompt)
+        num_predict = (body.get("options") or {}).get("num_predict")
+        if num_predict and num_predict > 0 and _estimate_tokens(text) > num_predict:
+            text = text[: num_predict * 4]
+        model = body.get("model", "mock")
+        created_at = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
+        stats = {"prompt_eval_count": _estimate_tokens(prompt), "eval_count": _estimate_tokens(text),
+                 "total_duration": int((fate["delay"] + mock.generation_time(text)) * 1e9)}
+
+        def message(content: str, done: bool) -> Dict[str, Any]:
+            payload: Dict[str, Any] = {"model": model, "created_at": created_at, "done": done}
+            if chat:
+                payload["message"] = {"role": "assistant", "content": content}
+            else:
+                payload["response"] = content
+            if done:
+                payload.update(stats, done_reason="stop")
+            return payload
+
+        # Ollama streams by default
+        if body.get("stream", True):
+            with mock._lock:
+                mock.stats["streamed"] += 1
+
+            def render(chunk: str, done: bool) -> bytes:
+                return (json.dumps(message(chunk, done)) + "\n").encode()
+
+            return StreamingResponse(_stream_chunks(text, render), media_type="application/x-ndjson")
+
+        await asyncio.sleep(mock.generation_time(text))
+        return message(text, True)
+
+    @app.post("/api/generate")
+    async def ollama_generate(request: Request):
+        body = await request.json()
+        return await _ollama_reply(body, body.get("prompt", ""), chat=False)
+
+    @app.post("/api/chat")
+    async def ollama_chat(request: Request):
+        body = await request.json()
+        messages = body.get("messages") or [{"content": ""}]
+        return await _ollama_reply(body, messages[-1].get("content", ""), chat=True)
+
+    @app.get("/v1/models")
+    def list_models():
+        return {"object": "list", "data": [{"id": "mock", "object": "model", "owned_by": "mock"}]}
+
+    @app.get("/api/tags")
+    def list_tags():
+        return {"models": [{"name": "mock:latest", "model": "mock:latest"}]}
+
+    @app.get("/mock/stats")
+    def get_stats():
+        return dict(mock.stats)
+
+    return app
+
+
+def _free_port() -> int:
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+class MockLLMServer:
+    """Run the mock server with uvicorn on a background thread (context manager)."""
+
+    def __init__(self, config: Optional[MockConfig] = None, host: str = "127.0.0.1", port: Optional[int] = None):
+        self.host = host
+        self.port = port or _free_port()
+        self.app = create_app(config)
+        self._server = uvicorn.Server(uvicorn.Config(self.app, host=host, port=self.port, log_level="warning"))
+        self._thread = threading.Thread(target=self._server.run, daemon=True)
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        return dict(self.app.state.mock.stats)
+
+    def __enter__(self):
+        self._thread.start()
+        deadline = time.time() + 10
+        while not self._server.started:
+            if time.time() > deadline:
+                raise RuntimeError("Mock LLM server did not start within 10 seconds")
+            time.sleep(0.01)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._server.should_exit = True
+        self._thread.join(timeout=5)
+        return False
@@ -0,0 +1,100 @@
+import asyncio
+import json
+from pathlib import Path
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app import admission
+from app.admission import DECREASE_FACTOR, AdmissionController, Overloaded
+from app.config import settings
+
+
+def controller(max_limit=4, max_queue=2, queue_timeout=1.0):
+    return AdmissionController("test", "interactive", max_limit, max_queue, queue_timeout)
+
+
+def test_full_queue_is_shed_at_once():
+    async def run():
+        limited = controller(max_limit=1, max_queue=1)
+        await limited.acquire()
+        queued = asyncio.create_task(limited.acquire())
+        await asyncio.sleep(0)
+        with pytest.raises(Overloaded, match="queue is full"):
+            await limited.acquire()
+        queued.cancel()
+
+    asyncio.run(run())
+
+
+def test_wait_beyond_the_queue_timeout_is_shed():
+    async def run():
+        limited = controller(max_limit=1, queue_timeout=0.05)
+        await limited.acquire()
+        with pytest.raises(Overloaded, match="within 0.05s") as shed:
+            await limited.acquire()
+        assert shed.value.retry_after >= 1
+        assert not limited._waiters
+
+    asyncio.run(run())
+
+
+def test_overloaded_request_gets_a_503(monkeypatch):
+    from app.main import app
+
+    monkeypatch.setattr(settings, "GENERATION_MODE", "ollama")
+    monkeypatch.setattr(settings, "ADMISSION_OVERLOAD_ACTION", "reject")
+    full = controller(max_limit=1, max_queue=0)
+    full.in_flight = 1
+    monkeypatch.setattr(admission, "_controllers", {("ollama", "interactive"): full})
+    listing = json.loads((Path(__file__).resolve().parent.parent / "example_data_en.json").read_text())
+    response = TestClient(app).post("/generate", json=listing)
+    assert response.status_code == 503
+    assert response.headers["retry-after"] == "1"
+
+
+def test_slow_or_degraded_generations_lower_the_limit():
+    async def run():
+        adaptive = controller(max_limit=8)
+        for _ in range(2):
+            await adaptive.acquire()
+        adaptive.release(0.1, False)  # sets the baseline
+        adaptive.release(1.0, False)  # 10x the baseline
+        assert adaptive.limit == pytest.approx(8 * DECREASE_FACTOR)
+
+        degraded = controller(max_limit=8)
+        await degraded.acquire()
+        degraded.release(0.01, True)
+        assert degraded.limit == pytest.approx(8 * DECREASE_FACTOR)
+
+    asyncio.run(run())
+
+
+def test_burst_of_slow_generations_lowers_the_limit_once():
+    async def run():
+        adaptive = controller(max_limit=8)
+        for _ in range(4):
+            await adaptive.acquire()
+        adaptive.release(0.5, False)
+        for _ in range(3):
+            adaptive.release(5.0, False)
+        assert adaptive.limit == pytest.approx(8 * DECREASE_FACTOR)
+
+    asyncio.run(run())
+
+
+def test_slot_granted_to_a_cancelled_request_is_handed_on():
+    async def run():
+        limited = controller(max_limit=1)
+        await limited.acquire()
+        gone = asyncio.create_task(limited.acquire())
+        next_in_line = asyncio.create_task(limited.acquire())
+        await asyncio.sleep(0)
+        limited.release(0.01, False)  # grants the slot to `gone`...
+        gone.cancel()  # ...whose client disconnects before it runs
+        with pytest.raises(asyncio.CancelledError):
+            await gone
+        await asyncio.wait_for(next_in_line, 1)
+        assert limited.in_flight == 1 and not limited._waiters
+
+    asyncio.run(run())
@@ -0,0 +1,111 @@
+import contextvars
+import time
+
+import pytest
+
+from app.llm.breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker
+
+
+@pytest.fixture
+def breaker():
+    return CircuitBreaker("test", window=4, min_calls=4, error_rate=0.5, slow_call_seconds=0.05, open_seconds=0.05)
+
+
+def in_request(fn, *args):
+    """Run `fn` in a request context of its own, as FastAPI's threadpool does."""
+    return contextvars.copy_context().run(fn, *args)
+
+
+def call(breaker, failure=False):
+    try:
+        with breaker.track():
+            if failure:
+                raise RuntimeError("backend down")
+    except RuntimeError:
+        pass
+
+
+def trip(breaker):
+    for _ in range(4):
+        call(breaker, failure=True)
+    assert breaker.state == OPEN
+
+
+def test_opens_once_the_failure_rate_is_reached(breaker):
+    call(breaker, failure=True)
+    call(breaker, failure=True)
+    call(breaker)
+    assert breaker.state == CLOSED  # fewer than min_calls
+    call(breaker, failure=True)
+    assert breaker.state == OPEN
+    assert breaker.is_open() and not breaker.allow_request()
+
+
+def test_slow_calls_count_as_failures(breaker):
+    for _ in range(4):
+        with breaker.track():
+            time.sleep(0.06)
+    assert breaker.state == OPEN
+
+
+def test_failed_answer_counts_as_failure(breaker):
+    for _ in range(4):
+        with breaker.track() as tracked:
+            tracked.failed()
+    assert breaker.state == OPEN
+
+
+def test_successful_probe_closes(breaker):
+    trip(breaker)
+    time.sleep(0.06)
+
+    def probe():
+        assert breaker.allow_request()
+        assert breaker.state == HALF_OPEN
+        assert not in_request(breaker.allow_request)  # one probe at a time
+        call(breaker)
+
+    in_request(probe)
+    assert breaker.state == CLOSED
+    assert in_request(breaker.allow_request)
+
+
+def test_failed_probe_reopens(breaker):
+    trip(breaker)
+    time.sleep(0.06)
+
+    def probe():
+        assert breaker.allow_request()
+        call(breaker, failure=True)
+
+    in_request(probe)
+    assert breaker.state == OPEN
+    assert not in_request(breaker.allow_request)
+
+
+def test_late_call_from_before_the_probe_does_not_decide(breaker):
+    late = breaker.track()
+    late.__enter__()  # e.g. a long timeout started while the breaker was closed
+    trip(breaker)
+    time.sleep(0.06)
+    probe_context = contextvars.copy_context()
+    assert probe_context.run(breaker.allow_request)
+    late.__exit__(None, None, None)  # finishes slow, during half-open
+    assert breaker.state == HALF_OPEN
+    probe_context.run(call, breaker)
+    assert breaker.state == CLOSED
+
+
+def test_expired_probe_is_replaced_and_ignored(breaker):
+    trip(breaker)
+    time.sleep(0.06)
+    stale = contextvars.copy_context()
+    assert stale.run(breaker.allow_request)  # never reports back in time
+    assert not in_request(breaker.allow_request)
+    time.sleep(0.06)
+    fresh = contextvars.copy_context()
+    assert fresh.run(breaker.allow_request)
+    stale.run(call, breaker, True)
+    assert breaker.state == HALF_OPEN
+    fresh.run(call, breaker)
+    assert breaker.state == CLOSED
@@ -0,0 +1,56 @@
+import pytest
+
+from app.config import settings
+from app.listing import ListingView
+from app.llm.replay import Recording, ReplayMiss, call_key, read_requests, use_subject
+from app.llm.sampling import get_profile
+
+
+def listing(**changes):
+    values = dict(language="en", city="Lisbon", neighborhood="Alfama", listing_type="sale", price=300000.0,
+                  bedrooms=2, bathrooms=1, area_sqm=80.0)
+    values.update(changes)
+    return ListingView(**values)
+
+
+def key(prompt, model="m", section="title"):
+    return call_key("ollama", model, section, get_profile("balanced"), prompt, max_chars=60)
+
+
+@pytest.fixture
+def cassette(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "LLM_REPLAY_LATENCY_SCALE", 0.0)
+    path = str(tmp_path / "calls.jsonl.gz")
+    recording = Recording(path, "record")
+    with use_subject(listing()):
+        recording.record("ollama", key("Title for Alfama"), "m", "title", "Title for Alfama", "Alfama flat", 0.1)
+    recording.record_request("/generate", {"output": "html"}, "t1", '{"title": "x"}')
+    recording.close()
+    return path
+
+
+def test_unchanged_prompt_replays_its_answer(cassette):
+    replay = Recording(cassette, "replay")
+    assert replay.answer("ollama", key("Title for Alfama"), "m", "title", "Title for Alfama") == "Alfama flat"
+
+
+def test_changed_prompt_replays_the_listings_answer(cassette):
+    replay = Recording(cassette, "replay")
+    with use_subject(listing()):
+        assert replay.answer("ollama", key("New title prompt"), "m", "title", "New title prompt") == "Alfama flat"
+
+
+def test_other_listing_or_model_misses(cassette):
+    replay = Recording(cassette, "replay")
+    with use_subject(listing(bedrooms=3)), pytest.raises(ReplayMiss):
+        replay.answer("ollama", key("New title prompt"), "m", "title", "New title prompt")
+    with use_subject(listing()), pytest.raises(ReplayMiss):
+        replay.answer("ollama", key("New title prompt", model="other"), "other", "title", "New title prompt")
+    with pytest.raises(ReplayMiss):
+        replay.answer("ollama", key("New title prompt"), "m", "title", "New title prompt")
+
+
+def test_requests_are_recorded_apart_from_calls(cassette):
+    assert len(Recording(cassette, "replay")) == 1
+    [request] = read_requests(cassette)
+    assert (request["request"], request["params"], request["tenant"], request["body"]) == ("/generate", {"output": "html"}, "t1", '{"title": "x"}')
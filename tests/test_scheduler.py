@@ -0,0 +1,79 @@
+import threading
+
+import pytest
+
+from app.llm.scheduler import LLMScheduler, SlotTimeout, _parse_weights, _Ticket
+
+
+def scheduler(capacity, weights="interactive=1,bulk=1,background=1", reserve=0, tenant_limit=0, wait_timeout=None):
+    return LLMScheduler("test", capacity, _parse_weights(weights), reserve, tenant_limit, wait_timeout)
+
+
+def request(scheduler, lane, tenant=""):
+    """Queue a call without blocking; its event is set once it holds a slot."""
+    ticket = _Ticket(lane, tenant)
+    with scheduler._lock:
+        scheduler._enqueue(ticket)
+        scheduler._dispatch()
+    return ticket
+
+
+def test_reserve_is_never_given_to_bulk_or_background():
+    llm = scheduler(4, reserve=2)
+    calls = [request(llm, lane) for lane in ("bulk", "background", "bulk", "background", "bulk")]
+    assert [call.event.is_set() for call in calls] == [True, True, False, False, False]
+    interactive = [request(llm, "interactive") for _ in range(3)]
+    assert [call.event.is_set() for call in interactive] == [True, True, False]
+    # A freed shared slot goes to a waiting call again, the reserve stays with interactive calls
+    llm._release("interactive", "")
+    assert interactive[2].event.is_set()
+    assert not any(call.event.is_set() for call in calls[2:])
+
+
+def test_tenant_at_its_quota_is_skipped_for_other_tenants_in_the_lane():
+    llm = scheduler(3, tenant_limit=1)
+    first = request(llm, "bulk", "acme")
+    second = request(llm, "bulk", "acme")
+    other = request(llm, "bulk", "globex")
+    assert first.event.is_set() and other.event.is_set()
+    assert not second.event.is_set()
+    llm._release("bulk", "acme")
+    assert second.event.is_set()
+
+
+def test_lane_shares_follow_the_weights():
+    llm = scheduler(1, weights="interactive=3,bulk=1,background=1")
+    held = request(llm, "background")
+    waiting = [request(llm, lane) for lane in ("interactive",) * 12 + ("bulk",) * 12]
+    granted = []
+    lane = held.lane
+    for _ in range(16):
+        llm._release(lane, "")
+        ticket = next(ticket for ticket in waiting if ticket.event.is_set() and ticket not in granted)
+        granted.append(ticket)
+        lane = ticket.lane
+    shares = [ticket.lane for ticket in granted]
+    assert shares.count("interactive") == 12 and shares.count("bulk") == 4
+
+
+def test_wait_for_a_slot_is_bounded_and_leaves_the_queue():
+    llm = scheduler(1, wait_timeout=0.05)
+    release = threading.Event()
+    holding = threading.Event()
+
+    def hold():
+        with llm.slot("bulk", ""):
+            holding.set()
+            release.wait()
+
+    holder = threading.Thread(target=hold)
+    holder.start()
+    assert holding.wait(1)
+    with pytest.raises(SlotTimeout):
+        with llm.slot("interactive", ""):
+            pass
+    assert llm.busy_slots() == 1  # only the holder; the expired call is gone from the queue
+    release.set()
+    holder.join()
+    with llm.slot("interactive", ""):
+        assert llm.busy_slots() == 1
@@ -0,0 +1,80 @@
+import pytest
+
+pytest.importorskip("numpy")
+
+from app.config import settings
+from app.listing import ListingView
+from app.llm import semantic_cache
+from app.llm.routing import section_routes
+from app.llm.semantic_cache import SemanticCache, cache_partition
+
+
+@pytest.fixture
+def cache(monkeypatch):
+    monkeypatch.setattr(settings, "SEMANTIC_CACHE", True)
+    monkeypatch.setattr(semantic_cache, "_cache", None)
+    assert semantic_cache.get_semantic_cache() is not None  # imports NumPy
+    return SemanticCache(0.95, 10000, ["neighborhood", "call_to_action", "key_features"])
+
+
+def listing(neighborhood="Alfama", **changes):
+    values = dict(language="en", city="Lisbon", neighborhood=neighborhood, listing_type="sale", price=300000.0,
+                  bedrooms=2, bathrooms=2, area_sqm=80.0, balcony=True, parking=False, elevator=True,
+                  floor=2, year_built=1990)
+    values.update(changes)
+    return ListingView(**values)
+
+
+def test_other_neighborhood_never_hits(cache):
+    # Enough names for several of them to share hash slots in a hashed vector
+    names = [f"bairro {number}" for number in range(200)]
+    for name in names:
+        for section in cache.sections:
+            cache.store(section, listing(name), "ollama:m", f"{section} text for {name}")
+    for number, name in enumerate(names):
+        other = listing(f"bairro {number + 200}")
+        for section in cache.sections:
+            assert cache.lookup(section, other, "ollama:m") is None
+        assert cache.lookup("neighborhood", listing(name), "ollama:m") == f"neighborhood text for {name}"
+
+
+def test_other_categorical_values_never_hit(cache):
+    cache.store("key_features", listing(), "ollama:m", "Bright flat")
+    assert cache.lookup("key_features", listing(bedrooms=3), "ollama:m") is None
+    assert cache.lookup("key_features", listing(balcony=None), "ollama:m") is None
+    assert cache.lookup("key_features", listing(), "openai:m") is None
+    assert cache.lookup("key_features", listing(language="pt"), "ollama:m") is None
+    assert cache.lookup("key_features", listing(area_sqm=81.0), "ollama:m") == "Bright flat"
+
+
+def test_only_the_sections_own_numbers_are_substituted(cache):
+    cache.store("key_features", listing(), "ollama:m", "• 80 sqm\n• Elevator")
+    assert cache.lookup("key_features", listing(area_sqm=81.0), "ollama:m") == "• 81 sqm\n• Elevator"
+
+
+def test_text_quoting_a_changed_number_is_not_reused(cache):
+    cache.store("key_features", listing(), "ollama:m", "2 bedrooms and 2 bathrooms")
+    cache.store("neighborhood", listing(), "ollama:m", "The metro is 2 minutes away.")
+    # The floor is no feature of either section: its old value must not be rewritten into the text
+    assert cache.lookup("key_features", listing(floor=3), "ollama:m") is None
+    assert cache.lookup("neighborhood", listing(floor=3), "ollama:m") is None
+    assert cache.lookup("neighborhood", listing(bathrooms=1), "ollama:m") is None
+    # Numbers the text does not quote may differ
+    assert cache.lookup("neighborhood", listing(year_built=2020, price=250000.0), "ollama:m") == "The metro is 2 minutes away."
+
+
+def test_changed_price_in_reused_call_to_action_is_not_reused(cache):
+    cache.store("call_to_action", listing(), "ollama:m", "Yours for €300,000. Call today!")
+    assert cache.lookup("call_to_action", listing(price=305000.0), "ollama:m") is None
+    assert cache.lookup("call_to_action", listing(), "ollama:m") == "Yours for €300,000. Call today!"
+
+
+def test_other_sampling_profile_or_seed_never_hits(cache, monkeypatch):
+    monkeypatch.setattr(settings, "OLLAMA_SAMPLING_PROFILE", "deterministic")
+    deterministic = cache_partition("ollama", section_routes("ollama")["neighborhood"])
+    cache.store("neighborhood", listing(), deterministic, "Quiet streets")
+    assert cache.lookup("neighborhood", listing(), cache_partition("ollama", section_routes("ollama")["neighborhood"])) == "Quiet streets"
+    monkeypatch.setattr(settings, "LLM_SEED", 7)
+    assert cache.lookup("neighborhood", listing(), cache_partition("ollama", section_routes("ollama")["neighborhood"])) is None
+    monkeypatch.setattr(settings, "OLLAMA_SAMPLING_PROFILE", "creative")
+    assert cache.lookup("neighborhood", listing(), cache_partition("ollama", section_routes("ollama")["neighborhood"])) is None